@@ -1,207 +1,493 @@
-<<<<<<< HEAD
-# This file sets up a Flask web server for the AI microservice.
-# It loads pre-trained machine learning models and provides an API endpoint for crop and fertilizer predictions.
-
-# Import Flask for creating the web server
-from flask import Flask, request, jsonify
-# Import numpy for numerical operations and array handling
-import numpy as np
-# Import joblib for loading saved machine learning models
-import joblib
-# Import os for file path operations
-import os
-=======
 
 # This file sets up a Flask web server for the AI microservice.
 # It loads pre-trained machine learning models and provides API endpoints.
 
 import os
 import io
+import json
+import hashlib
+import time
+import threading
 
 # Set Keras backend
 os.environ["KERAS_BACKEND"] = "tensorflow"
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import joblib
-import keras
 from PIL import Image
->>>>>>> 513ced589ae307e964e6765f94a681e3871f69e7
+
+import metrics
+import wire_formats
+from fertilizer_tree import build_code_lookup, build_label_index, decode_labels
+from image_inference import MicroBatcher, load_image_model, serving_model
+from model_registry import ModelRegistry, current_rss_bytes
+from response_cache import ResponseCache, SQLiteCache
 
 # Create a Flask application instance
 app = Flask(__name__)
 
-<<<<<<< HEAD
-# Define the base directory as the directory of this script
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-# Define the models directory path
-MODEL_DIR = os.path.join(BASE_DIR, "Models")
-
-# Define paths to all the model and encoder files
-=======
 # Enable CORS for all routes
 CORS(app)
 
+# --- Metrics (served at /metrics) ---
+
+REQUESTS_TOTAL = metrics.Counter(
+    "skyacre_requests_total", "HTTP requests served", ["endpoint", "method", "status"])
+REQUEST_ERRORS_TOTAL = metrics.Counter(
+    "skyacre_request_errors_total", "HTTP requests answered with a 4xx/5xx status", ["endpoint", "status"])
+REQUEST_SECONDS = metrics.Histogram(
+    "skyacre_request_seconds", "Time to produce a response (first byte for streamed responses)", ["endpoint"])
+STAGE_SECONDS = metrics.Histogram(
+    "skyacre_stage_seconds", "Time spent per request stage (decode, resize, serialize)", ["stage"])
+INFERENCE_SECONDS = metrics.Histogram(
+    "skyacre_inference_seconds", "Time spent in model inference per call", ["model"])
+metrics.Gauge("process_resident_memory_bytes", "Resident memory of this process", function=current_rss_bytes)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Records how long jsonify() spends serializing response bodies."""
+
+    def response(self, *args, **kwargs):
+        with STAGE_SECONDS.time(stage="serialize"):
+            return super().response(*args, **kwargs)
+
+
+app.json = TimedJSONProvider(app)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    # Route templates (not raw paths) as labels, so /models/<name>/reload is one series
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    status = str(response.status_code)
+    REQUESTS_TOTAL.inc(endpoint=endpoint, method=request.method, status=status)
+    if response.status_code >= 400:
+        REQUEST_ERRORS_TOTAL.inc(endpoint=endpoint, status=status)
+    started = g.get("request_started")
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+    return response
+
 # --- Fertilizer & Crop Prediction Model Loading ---
 
 # Define paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_DIR = os.path.join(BASE_DIR, "Models")
->>>>>>> 513ced589ae307e964e6765f94a681e3871f69e7
 MODEL_PATH = os.path.join(MODEL_DIR, "skyacre_fertilizer_model.pkl")
 ENCODER_DISTRICT_PATH = os.path.join(MODEL_DIR, "encoder_district.pkl")
 ENCODER_SOIL_PATH = os.path.join(MODEL_DIR, "encoder_soil.pkl")
 MAP_CROPS_PATH = os.path.join(MODEL_DIR, "map_crops.pkl")
 MAP_FERT_PATH = os.path.join(MODEL_DIR, "map_fertilizers.pkl")
+COMPILED_TREE_PATH = os.path.join(MODEL_DIR, "skyacre_fertilizer_tree.npz")
 
-<<<<<<< HEAD
-# Print the models directory for debugging
-print("Loading models from:", MODEL_DIR)
+# "compiled" serves the NumPy node arrays from fertilizer_tree.py instead of the sklearn pickle
+FERTILIZER_BACKEND = os.environ.get("SKYACRE_FERTILIZER_BACKEND", "sklearn")
 
-# Load all required models, encoders, and mappings
-try:
-    dt_model = joblib.load(MODEL_PATH)  # Load the decision tree model
-    encoder_district = joblib.load(ENCODER_DISTRICT_PATH)  # Load district encoder
-    encoder_soil = joblib.load(ENCODER_SOIL_PATH)  # Load soil color encoder
-    map_crops = joblib.load(MAP_CROPS_PATH)  # Load crop name mappings
-    map_fertilizers = joblib.load(MAP_FERT_PATH)  # Load fertilizer name mappings
-    print("All models loaded successfully!")
-except Exception as e:
-    print(f"Error loading models: {e}")
-    raise e  # Re-raise the exception if loading fails
+FERTILIZER_FEATURES = [
+    'District', 'Soil_color', 'Nitrogen', 'Phosphorus',
+    'Potassium', 'pH', 'Rainfall', 'Temperature'
+]
+MAX_BATCH_RECORDS = int(os.environ.get("SKYACRE_MAX_BATCH_RECORDS", 100000))
 
 
-# Define the root route that returns a status message
-@app.route('/')
-def index():
-    return "SkyAcre Fertilizer & Crop Prediction API is running!"
+class FertilizerModels:
+    """The fertilizer tree, its encoders and label mappings, and the lookup tables built from them."""
 
+    def __init__(self, dt_model, encoder_district, encoder_soil, map_crops, map_fertilizers):
+        self.dt_model = dt_model
+        self.encoder_district = encoder_district
+        self.encoder_soil = encoder_soil
+        self.map_crops = map_crops
+        self.map_fertilizers = map_fertilizers
 
-# Define the prediction route that accepts POST requests
-@app.route('/farmer/predict', methods=['POST'])
-def predict():
-    try:
-        # Get JSON data from the request
-        data = request.json
-        print(data)  # Print data for debugging
-
-        # List of required features for prediction
-=======
-print("Loading fertilizer and crop models...")
-dt_model = None
-encoder_district = None
-encoder_soil = None
-map_crops = None
-map_fertilizers = None
-
-try:
-    if os.path.exists(MODEL_PATH):
-        dt_model = joblib.load(MODEL_PATH)
-        print(f"  - Loaded fertilizer model from {MODEL_PATH}")
-    else:
-        print(f"  - WARNING: Model file not found: {MODEL_PATH}")
-except Exception as e:
-    print(f"  - ERROR loading fertilizer model: {e}")
-
-try:
-    if os.path.exists(ENCODER_DISTRICT_PATH):
-        encoder_district = joblib.load(ENCODER_DISTRICT_PATH)
-        print(f"  - Loaded district encoder from {ENCODER_DISTRICT_PATH}")
-    else:
-        print(f"  - WARNING: Encoder file not found: {ENCODER_DISTRICT_PATH}")
-except Exception as e:
-    print(f"  - ERROR loading district encoder: {e}")
-
-try:
-    if os.path.exists(ENCODER_SOIL_PATH):
-        encoder_soil = joblib.load(ENCODER_SOIL_PATH)
-        print(f"  - Loaded soil encoder from {ENCODER_SOIL_PATH}")
-    else:
-        print(f"  - WARNING: Encoder file not found: {ENCODER_SOIL_PATH}")
-except Exception as e:
-    print(f"  - ERROR loading soil encoder: {e}")
-
-try:
-    if os.path.exists(MAP_CROPS_PATH):
-        map_crops = joblib.load(MAP_CROPS_PATH)
-        print(f"  - Loaded crops mapping from {MAP_CROPS_PATH}")
-    else:
-        print(f"  - WARNING: Crops mapping file not found: {MAP_CROPS_PATH}")
-except Exception as e:
-    print(f"  - ERROR loading crops mapping: {e}")
-
-try:
-    if os.path.exists(MAP_FERT_PATH):
-        map_fertilizers = joblib.load(MAP_FERT_PATH)
-        print(f"  - Loaded fertilizers mapping from {MAP_FERT_PATH}")
+        # Lookup tables used by the batch endpoints, built once so no request pays for them
+        self.district_codes = build_code_lookup(encoder_district)
+        self.soil_codes = build_code_lookup(encoder_soil)
+        self.crop_labels = build_label_index(map_crops)
+        self.fertilizer_labels = build_label_index(map_fertilizers)
+
+
+def load_fertilizer_artifact(description, path):
+    """Loads one fertilizer/crop artifact (joblib pickle or compiled .npz tree)."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{description} file not found: {path}")
+    if path.endswith(".npz"):
+        from fertilizer_tree import CompiledFertilizerTree
+        artifact = CompiledFertilizerTree.load(path)
     else:
-        print(f"  - WARNING: Fertilizers mapping file not found: {MAP_FERT_PATH}")
-except Exception as e:
-    print(f"  - ERROR loading fertilizers mapping: {e}")
+        artifact = joblib.load(path)
+    print(f"  - Loaded {description} from {path}")
+    return artifact
+
+
+def load_fertilizer_models():
+    """Loads the five fertilizer/crop artifacts concurrently."""
+    print("Loading fertilizer and crop models...")
+    use_compiled = FERTILIZER_BACKEND == "compiled" and os.path.exists(COMPILED_TREE_PATH)
+    if use_compiled:
+        # Encoders and label maps exported into the .npz: no scikit-learn import, nothing unpickled
+        from fertilizer_tree import load_lookups
+        lookups = load_lookups(COMPILED_TREE_PATH)
+        if lookups is not None:
+            dt_model = load_fertilizer_artifact("fertilizer model", COMPILED_TREE_PATH)
+            print("Fertilizer and crop models loaded successfully (compiled tree and lookups)!")
+            return FertilizerModels(dt_model=dt_model, **lookups)
+        print(f"WARNING: {COMPILED_TREE_PATH} has no encoders/label maps; re-run fertilizer_tree.py. "
+              "Loading them from the pickles.")
+    artifacts = {
+        "dt_model": ("fertilizer model", COMPILED_TREE_PATH if use_compiled else MODEL_PATH),
+        "encoder_district": ("district encoder", ENCODER_DISTRICT_PATH),
+        "encoder_soil": ("soil encoder", ENCODER_SOIL_PATH),
+        "map_crops": ("crops mapping", MAP_CROPS_PATH),
+        "map_fertilizers": ("fertilizers mapping", MAP_FERT_PATH),
+    }
+    with ThreadPoolExecutor(max_workers=len(artifacts)) as pool:
+        futures = {
+            name: pool.submit(load_fertilizer_artifact, description, path)
+            for name, (description, path) in artifacts.items()
+        }
+        loaded = {name: future.result() for name, future in futures.items()}
 
-if dt_model is not None and encoder_district is not None and encoder_soil is not None and map_crops is not None and map_fertilizers is not None:
     print("Fertilizer and crop models loaded successfully!")
-else:
-    print("WARNING: Some fertilizer/crop models failed to load. Endpoint may return 503.")
+    return FertilizerModels(**loaded)
+
+
+# Response cache for /farmer/predict; any change to the model files empties it
+fertilizer_cache = ResponseCache(
+    max_size=int(os.environ.get("SKYACRE_PREDICT_CACHE_SIZE", 10000)),
+    ttl_seconds=float(os.environ.get("SKYACRE_PREDICT_CACHE_TTL", 3600)),
+    watched_paths=[MODEL_PATH, COMPILED_TREE_PATH, ENCODER_DISTRICT_PATH, ENCODER_SOIL_PATH,
+                   MAP_CROPS_PATH, MAP_FERT_PATH]
+)
+
+
+def fertilizer_cache_key(data):
+    """Normalized 8-feature tuple for the response cache, or None if the payload can't be keyed."""
+    try:
+        key = (data['District'], data['Soil_color']) + tuple(float(data[f]) for f in FERTILIZER_FEATURES[2:])
+        hash(key)
+        return key
+    except (KeyError, TypeError, ValueError):
+        return None
+
 
 # --- Cow Disease Classification Model Loading ---
 
 COW_DISEASE_REPO_ID = "Storm00212/SkyAcre_cow_model"
 COW_DISEASE_CLASS_LABELS = {0: 'foot-and-mouth', 1: 'lumpy', 2: 'healthy'}
-cow_disease_model = None
 
-print(f"Loading cow disease model...")
+# Local model in SkyAcre_cow_model/ (new location), then the old location for backwards compatibility
+COW_MODEL_PATH = os.path.join(BASE_DIR, "SkyAcre_cow_model", "best_model.keras")
+LEGACY_COW_MODEL_PATH = os.path.join(BASE_DIR, "best_model.keras")
 
-# First, check for local model in SkyAcre_cow_model/ directory (new location)
-local_model_path = os.path.join(BASE_DIR, "SkyAcre_cow_model", "best_model.keras")
+# "keras" serves best_model.keras; the other backends serve the files export_model.py writes next to it
+COW_BACKEND = os.environ.get("SKYACRE_COW_BACKEND", "keras")
+COW_EXPORT_PATHS = {
+    "tflite-dynamic": os.path.join(BASE_DIR, "SkyAcre_cow_model", "best_model_dynamic.tflite"),
+    "tflite-int8": os.path.join(BASE_DIR, "SkyAcre_cow_model", "best_model_int8.tflite"),
+    "onnx": os.path.join(BASE_DIR, "SkyAcre_cow_model", "best_model.onnx"),
+}
 
-# Fallback to old location for backwards compatibility
-old_local_model_path = os.path.join(BASE_DIR, "best_model.keras")
+IMAGE_SIZE = (224, 224)
 
-model_loaded = False
 
-# Try loading from local path first (new location)
-if os.path.exists(local_model_path):
-    try:
-        cow_disease_model = keras.saving.load_model(local_model_path)
-        print(f"Cow disease model loaded successfully from local: {local_model_path}")
-        cow_disease_model.summary()
-        model_loaded = True
-    except Exception as e:
-        print(f"Error loading from local path: {e}")
+def load_cow_disease_model():
+    """Loads the cow CNN from the local paths, falling back to HuggingFace.
 
-# Try old local path if new location failed
-if not model_loaded and os.path.exists(old_local_model_path):
-    try:
-        cow_disease_model = keras.saving.load_model(old_local_model_path)
-        print(f"Cow disease model loaded successfully from local (legacy): {old_local_model_path}")
-        cow_disease_model.summary()
-        model_loaded = True
-    except Exception as e:
-        print(f"Error loading from legacy local path: {e}")
+    Keras (and with it TensorFlow) is imported here, on first use, so
+    deployments that only serve /farmer/predict never pay for it.
+    With SKYACRE_COW_BACKEND set to an exported variant, that file is served instead.
+    """
+    if COW_BACKEND != "keras":
+        if COW_BACKEND not in COW_EXPORT_PATHS:
+            raise ValueError(f"Unknown SKYACRE_COW_BACKEND: {COW_BACKEND} (use keras, {', '.join(COW_EXPORT_PATHS)})")
+        path = COW_EXPORT_PATHS[COW_BACKEND]
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found; run export_model.py first")
+        model = load_image_model(path)
+        print(f"Cow disease model loaded successfully ({COW_BACKEND}): {path}")
+        return model
+
+    import keras
 
-# Last resort: try HuggingFace (requires authentication for private repos)
-if not model_loaded:
+    print("Loading cow disease model...")
+    for description, path in (("local", COW_MODEL_PATH), ("local (legacy)", LEGACY_COW_MODEL_PATH)):
+        if not os.path.exists(path):
+            continue
+        try:
+            model = keras.saving.load_model(path)
+            print(f"Cow disease model loaded successfully from {description}: {path} ({model.count_params():,} parameters)")
+            return model
+        except Exception as e:
+            print(f"Error loading from {description} path: {e}")
+
+    # Last resort: try HuggingFace (requires authentication for private repos)
     print(f"Attempting to load from HuggingFace repo: {COW_DISEASE_REPO_ID}...")
+    from huggingface_hub import hf_hub_download
+    # Download the model file from the Space's model folder
+    model_path = hf_hub_download(
+        repo_id=COW_DISEASE_REPO_ID,
+        filename="best_model.keras",
+        repo_type="space"
+    )
+    model = keras.saving.load_model(model_path)
+    print("Cow disease model loaded successfully from HuggingFace!")
+    return model
+
+
+# --- Poultry Disease Classification Model Loading ---
+
+# Fecal-image classifier trained by train_poultry.py. Its OUTPUT_DIR ('AI-Models/Output/poultry') is
+# relative to the working directory, so it lands in AI-Models/AI-Models/... when run from AI-Models/
+POULTRY_DISEASE_CLASS_LABELS = {0: 'cocci', 1: 'healthy', 2: 'ncd', 3: 'salmo'}
+POULTRY_MODEL_DIRS = [os.path.join(BASE_DIR, "Output", "poultry"), os.path.join(BASE_DIR, "AI-Models", "Output", "poultry")]
+POULTRY_MODEL_PATH = os.environ.get(
+    "SKYACRE_POULTRY_MODEL_PATH", os.path.join(POULTRY_MODEL_DIRS[0], "poultry_disease_model.keras"))
+# Final model, then the best-epoch checkpoint (kept when training stopped before the final save)
+POULTRY_MODEL_PATHS = [POULTRY_MODEL_PATH] + [
+    os.path.join(directory, name) for directory in POULTRY_MODEL_DIRS
+    for name in ("poultry_disease_model.keras", "best_poultry_disease_model.keras")
+    if os.path.join(directory, name) != POULTRY_MODEL_PATH
+]
+
+
+def load_poultry_disease_model():
+    """Loads the poultry CNN (.keras, or an export_model.py .tflite/.onnx via SKYACRE_POULTRY_MODEL_PATH)."""
+    for path in POULTRY_MODEL_PATHS:
+        if os.path.exists(path):
+            model = load_image_model(path)
+            print(f"Poultry disease model loaded successfully: {path}")
+            return model
+    raise FileNotFoundError(f"{POULTRY_MODEL_PATH} not found; run train_poultry.py first")
+
+
+# Image classifiers served through the shared image path (decode/resize, micro-batching, warmup, cache);
+# "backend" is what serves the model's files, part of its response cache keys
+IMAGE_MODELS = {
+    "cow-disease": {"description": "Cow disease", "labels": COW_DISEASE_CLASS_LABELS, "backend": COW_BACKEND},
+    "poultry-disease": {"description": "Poultry disease", "labels": POULTRY_DISEASE_CLASS_LABELS, "backend": "keras"},
+}
+
+
+# --- Livestock Health Models (RandomForests from train_livestock.py) ---
+
+LIVESTOCK_SPECIES = ("poultry", "dairy", "beef")
+# Trees scored in parallel per predict_proba call; serve.py already runs one worker per core
+LIVESTOCK_JOBS = int(os.environ.get("SKYACRE_LIVESTOCK_JOBS", 1))
+
+
+def livestock_model_path(species):
+    return os.path.join(MODEL_DIR, f"skyacre_{species}_health_model.pkl")
+
+
+def load_livestock_model(species):
+    """Loads a train_livestock.py artifact: the fitted forest, its feature order and class names."""
+    path = livestock_model_path(species)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found; run train_livestock.py {species} first")
+    artifact = joblib.load(path)
+    artifact["model"].n_jobs = LIVESTOCK_JOBS
+    artifact["classes"] = np.asarray(artifact["classes"], dtype=object)
+    print(f"{species.capitalize()} health model loaded successfully: {path} "
+          f"({len(artifact['model'].estimators_)} trees, classes: {', '.join(artifact['classes'])})")
+    return artifact
+
+
+# --- Warmup ---
+
+# Every (re)loaded model runs synthetic batches of these sizes before it is served, so Keras
+# builds its predict function and TensorFlow traces its graphs before any user request.
+# 1 is a single upload; 32 is Keras' predict batch size, used by every larger tensor batch.
+WARMUP_ENABLED = os.environ.get("SKYACRE_WARMUP", "1") != "0"
+WARMUP_BATCH_SIZES = [
+    int(size) for size in os.environ.get("SKYACRE_WARMUP_BATCH_SIZES", "1,32").split(",") if size.strip()
+]
+
+
+def warm_fertilizer_models(fert):
+    """Runs dummy rows through the tree at each warmup batch size (single-row and vectorized paths)."""
+    for batch_size in WARMUP_BATCH_SIZES:
+        fert.dt_model.predict(np.zeros((batch_size, len(FERTILIZER_FEATURES))))
+
+
+def warm_livestock_model(artifact):
+    """Runs zero rows through the forest at each warmup batch size."""
+    for batch_size in WARMUP_BATCH_SIZES:
+        artifact["model"].predict_proba(np.zeros((batch_size, len(artifact["features"])), dtype=np.float32))
+
+
+def warm_image_model(model):
+    """Runs blank images through an image CNN at each warmup batch size."""
+    for batch_size in WARMUP_BATCH_SIZES:
+        model.predict(np.zeros((batch_size, IMAGE_SIZE[1], IMAGE_SIZE[0], 3), dtype=np.float32), verbose=0)
+
+
+# --- Model Registry ---
+
+# Models load on demand; once their total memory passes the budget, the least recently used are unloaded
+registry = ModelRegistry(
+    memory_budget_bytes=int(float(os.environ.get("SKYACRE_MODEL_MEMORY_BUDGET_MB", 0)) * 2**20)
+)
+registry.register("fertilizer", load_fertilizer_models, warmup=warm_fertilizer_models if WARMUP_ENABLED else None,
+                  paths=[MODEL_PATH, COMPILED_TREE_PATH, ENCODER_DISTRICT_PATH, ENCODER_SOIL_PATH,
+                         MAP_CROPS_PATH, MAP_FERT_PATH])
+# Keras models are served through a traced tf.function (image_inference.py) rather than model.predict
+registry.register("cow-disease", lambda: serving_model(load_cow_disease_model()), warmup=warm_image_model if WARMUP_ENABLED else None,
+                  paths=[COW_MODEL_PATH, LEGACY_COW_MODEL_PATH] + list(COW_EXPORT_PATHS.values()))
+# Same process, same TensorFlow runtime as the cow model (load_image_model wraps .keras in ServingModel)
+registry.register("poultry-disease", load_poultry_disease_model, warmup=warm_image_model if WARMUP_ENABLED else None,
+                  paths=POULTRY_MODEL_PATHS)
+for species in LIVESTOCK_SPECIES:
+    registry.register(f"{species}-health", lambda species=species: load_livestock_model(species),
+                      warmup=warm_livestock_model if WARMUP_ENABLED else None,
+                      paths=[livestock_model_path(species)])
+
+# Optional manifest registering further models/versions (see model_registry.py)
+MODEL_MANIFEST_PATH = os.environ.get("SKYACRE_MODEL_MANIFEST", os.path.join(MODEL_DIR, "model_registry.json"))
+if os.path.exists(MODEL_MANIFEST_PATH):
     try:
-        from huggingface_hub import hf_hub_download
-        # Download the model file from the Space's model folder
-        model_path = hf_hub_download(
-            repo_id=COW_DISEASE_REPO_ID,
-            filename="best_model.keras",
-            repo_type="space"
-        )
-        cow_disease_model = keras.saving.load_model(model_path)
-        print("Cow disease model loaded successfully from HuggingFace!")
-        cow_disease_model.summary()
-        model_loaded = True
+        registry.register_manifest(MODEL_MANIFEST_PATH, warmup_batch_sizes=WARMUP_BATCH_SIZES if WARMUP_ENABLED else ())
     except Exception as e:
-        print(f"Error loading from HuggingFace: {e}")
-        print("HuggingFace model not available. Cow disease prediction will use fallback.")
+        print(f"ERROR reading model manifest {MODEL_MANIFEST_PATH}: {e}")
+
+# Models loaded in background threads at startup; the others load on their first request
+PRELOAD_MODELS = [
+    name.strip() for name in os.environ.get("SKYACRE_PRELOAD_MODELS", "fertilizer").split(",")
+    if name.strip()
+]
+for name in list(PRELOAD_MODELS):
+    try:
+        registry.preload(name)
+    except KeyError:
+        print(f"WARNING: Unknown model in SKYACRE_PRELOAD_MODELS: {name}")
+        PRELOAD_MODELS.remove(name)
+
+
+def model_status_values(field):
+    """
+    {(model, version): value} for one field of the registry's per-model status,
+    for scrape-time gauges. The model label is the registry name, as in
+    skyacre_inference_seconds, so the series of one model join up.
+    """
+    values = {}
+    for key, model in registry.status()["models"].items():
+        name, version = key.rsplit(":", 1)
+        values[(name, version)] = model[field]
+    return values
 
-if cow_disease_model is None:
-    print("WARNING: Cow disease model is not available. /predict/cow-disease endpoint will return 503.")
+
+metrics.Gauge("skyacre_model_load_seconds", "Duration of the model's last (re)load", ["model", "version"],
+              function=lambda: model_status_values("load_seconds"))
+metrics.Gauge("skyacre_model_warmup_seconds", "Duration of the model's last warmup pass", ["model", "version"],
+              function=lambda: model_status_values("warmup_seconds"))
+metrics.Gauge("skyacre_model_memory_bytes", "Estimated memory held by the loaded model", ["model", "version"],
+              function=lambda: model_status_values("memory_bytes"))
+metrics.Gauge("skyacre_model_loads", "Successful loads of the model, including reloads", ["model", "version"],
+              function=lambda: model_status_values("loads"))
+
+
+def on_model_reloaded(name, version):
+    """Drops cached responses computed by the model that was just replaced."""
+    if name == "fertilizer":
+        fertilizer_cache.clear()
+
+
+def start_model_watcher():
+    """Hot reload: new artifacts dropped into Models/, SkyAcre_cow_model/ or Output/poultry/
+    are loaded, warmed and swapped in without a restart."""
+    return registry.watch(interval=float(os.environ.get("SKYACRE_WATCH_INTERVAL", 2.0)),
+                          on_reload=on_model_reloaded)
+
+
+# serve.py starts the watcher in each worker instead (set SKYACRE_WATCH_MODELS=0 to disable)
+if os.environ.get("SKYACRE_WATCH_MODELS", "1") != "0":
+    start_model_watcher()
+
+# Shared secret for the admin endpoints; unset means they are open (local development)
+ADMIN_TOKEN = os.environ.get("SKYACRE_ADMIN_TOKEN")
+
+
+# --- Request Size Limits ---
+
+# Largest /farmer/predict/batch and /predict/<species>-health/batch body, and the most its binary
+# columns may decode to (.npz members and Arrow buffers can be compressed)
+MAX_BATCH_BYTES = int(os.environ.get("SKYACRE_MAX_BATCH_MB", 64)) * 1024 * 1024
+
+
+class BoundedStream(io.RawIOBase):
+    """Request body wrapper that raises 413 once more than max_bytes have been read."""
+
+    def __init__(self, stream, max_bytes):
+        self._stream = stream
+        self._remaining = max_bytes
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        # Ask for one byte more than allowed, so a body of exactly max_bytes still passes
+        data = self._stream.read(min(len(buffer), self._remaining + 1))
+        self._remaining -= len(data)
+        if self._remaining < 0:
+            raise RequestEntityTooLarge()
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def upload_limit(max_bytes):
+    """
+    Route decorator capping the request body at max_bytes (or at max_bytes(),
+    called per request). Bodies declaring a larger Content-Length are refused
+    with 413 before anything is read; chunked bodies once they pass the cap.
+    """
+    def decorate(view):
+        view.max_upload_bytes = max_bytes
+        return view
+    return decorate
+
+
+@app.before_request
+def enforce_upload_limit():
+    limit = getattr(app.view_functions.get(request.endpoint), "max_upload_bytes", None)
+    if callable(limit):
+        limit = limit()
+    if limit is None:
+        return None
+    if request.content_length is not None:
+        if request.content_length > limit:
+            return jsonify({"error": f"Request too large. Maximum is {limit / (1024*1024):.2f}MB"}), 413
+    else:
+        # Must happen before anything touches request.stream / request.files
+        request.environ["wsgi.input"] = io.BufferedReader(BoundedStream(request.environ["wsgi.input"], limit))
+    return None
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    return jsonify({"error": "Request too large."}), 413
+
+
+def read_batch_columns(request_format):
+    """
+    Decodes a binary batch body into columns, refusing (with PayloadTooLarge) payloads
+    that decode past MAX_BATCH_BYTES or hold more than MAX_BATCH_RECORDS rows.
+    """
+    columns = wire_formats.decode_columns(request.get_data(), request_format, max_bytes=MAX_BATCH_BYTES)
+    n_rows = max((len(np.atleast_1d(column)) for column in columns.values()), default=0)
+    if n_rows > MAX_BATCH_RECORDS:
+        raise wire_formats.PayloadTooLarge(
+            f"Too many records. Maximum batch size is {MAX_BATCH_RECORDS}, got {n_rows}")
+    return columns
 
 
 # --- API Routes ---
@@ -211,55 +497,82 @@ def index():
     return "SkyAcre AI Prediction API is running!"
 
 
+@app.route('/ready', methods=['GET'])
+def readiness():
+    """Ready once every preloaded model has loaded and warmed up; also lists the state of lazily loaded ones."""
+    ready = all(registry.has_loaded(name) for name in PRELOAD_MODELS)
+    return jsonify({
+        "ready": ready,
+        "preload": PRELOAD_MODELS,
+        "models": {name: model["state"] for name, model in registry.status()["models"].items()}
+    }), 200 if ready else 503
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request, stage, model and process metrics in the Prometheus text format."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route('/models', methods=['GET'])
+def list_models():
+    """Registered models with their load state, memory use and the registry's budget."""
+    return jsonify(registry.status())
+
+
+@app.route('/models/<name>/reload', methods=['POST'])
+def reload_model(name):
+    """
+    Reloads a model from its files in the background and swaps it in once warm.
+
+    Requests keep being served by the current model meanwhile; progress shows
+    up as "reloading"/"reloads" in /models. A model whose last load failed is
+    loaded now rather than after its retry backoff.
+    """
+    if ADMIN_TOKEN and request.headers.get("X-Admin-Token") != ADMIN_TOKEN:
+        return jsonify({"error": "Invalid or missing X-Admin-Token."}), 403
+    version = request.args.get("version")
+    try:
+        # Failed models are reloaded too (e.g. once their missing artifact is in place)
+        if not (registry.is_ready(name, version) or registry.is_failed(name, version)):
+            return jsonify({"error": f"Model {name} is not loaded; its next request loads the current files."}), 409
+    except KeyError as e:
+        return jsonify({"error": str(e.args[0])}), 404
+
+    def run():
+        if registry.reload(name, version):
+            on_model_reloaded(name, version)
+
+    threading.Thread(target=run, name=f"reload-{name}", daemon=True).start()
+    return jsonify({"reloading": name, "version": version}), 202
+
+
 @app.route('/farmer/predict', methods=['POST'])
 def predict_fertilizer_crop():
-    if not dt_model:
+    fert = registry.get("fertilizer")
+    if fert is None:
         return jsonify({"error": "Fertilizer/crop model is not available."}), 503
         
     try:
         data = request.json
->>>>>>> 513ced589ae307e964e6765f94a681e3871f69e7
         required_features = [
             'District', 'Soil_color', 'Nitrogen', 'Phosphorus',
             'Potassium', 'pH', 'Rainfall', 'Temperature'
         ]
 
-<<<<<<< HEAD
-        # Check if all required features are present in the data
-        if not all(f in data for f in required_features):
-            return jsonify({"error": "Missing features"}), 400
-
-        # Encode categorical inputs (District and Soil_color) to numerical values
-        district_encoded = int(encoder_district.transform([data['District']]))
-        soil_encoded = int(encoder_soil.transform([data['Soil_color']]))
-
-        # Build the feature array for the model input
-        features = np.array([
-            district_encoded,
-            soil_encoded,
-            data['Nitrogen'],
-            data['Phosphorus'],
-            data['Potassium'],
-            data['pH'],
-            data['Rainfall'],
-            data['Temperature']
-        ]).reshape(1, -1)  # Reshape to 2D array for model input
-
-        # Make prediction using the loaded model
-        pred_numeric = dt_model.predict(features)[0]
-
-        # Map the numerical predictions back to crop and fertilizer names
-        predicted_crop = next(i[0] for i in map_crops if int(i[1]) == pred_numeric[0])
-        predicted_fertilizer = next(i[0] for i in map_fertilizers if int(i[1]) == pred_numeric[1])
-
-        # Return the predictions as JSON
-=======
         if not all(f in data for f in required_features):
             return jsonify({"error": "Missing features for fertilizer/crop prediction"}), 400
 
+        # Repeated soil profiles skip the encoders, the tree and the label lookups
+        cache_key = fertilizer_cache_key(data)
+        if cache_key is not None:
+            cached = fertilizer_cache.get(cache_key)
+            if cached is not None:
+                return jsonify(cached)
+
         # Validate and transform district
         try:
-            district_encoded = int(encoder_district.transform([data['District']])[0])
+            district_encoded = int(fert.encoder_district.transform([data['District']])[0])
         except ValueError:
             return jsonify({
                 "error": f"Invalid District value: '{data['District']}'. Must be a value seen during training."
@@ -267,7 +580,7 @@ def predict_fertilizer_crop():
         
         # Validate and transform soil color
         try:
-            soil_encoded = int(encoder_soil.transform([data['Soil_color']])[0])
+            soil_encoded = int(fert.encoder_soil.transform([data['Soil_color']])[0])
         except ValueError:
             return jsonify({
                 "error": f"Invalid Soil_color value: '{data['Soil_color']}'. Must be a value seen during training."
@@ -278,55 +591,819 @@ def predict_fertilizer_crop():
             data['Potassium'], data['pH'], data['Rainfall'], data['Temperature']
         ]).reshape(1, -1)
 
-        pred_numeric = dt_model.predict(features)[0]
+        with INFERENCE_SECONDS.time(model="fertilizer"):
+            pred_numeric = fert.dt_model.predict(features)[0]
 
         # Map predictions to labels with fallback for unknown values
         predicted_crop = next(
-            (i[0] for i in map_crops if int(i[1]) == pred_numeric[0]),
+            (i[0] for i in fert.map_crops if int(i[1]) == pred_numeric[0]),
             f"Unknown (code: {pred_numeric[0]})"
         )
         predicted_fertilizer = next(
-            (i[0] for i in map_fertilizers if int(i[1]) == pred_numeric[1]),
+            (i[0] for i in fert.map_fertilizers if int(i[1]) == pred_numeric[1]),
             f"Unknown (code: {pred_numeric[1]})"
         )
 
->>>>>>> 513ced589ae307e964e6765f94a681e3871f69e7
-        return jsonify({
+        result = {
             "predicted_crop": predicted_crop,
             "predicted_fertilizer": predicted_fertilizer
+        }
+        if cache_key is not None:
+            fertilizer_cache.put(cache_key, result)
+        return jsonify(result)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({"fertilizer": fertilizer_cache.stats(), "images": image_cache.stats()})
+
+
+def encode_fertilizer_records(fert, records):
+    """
+    Validates and encodes a list of fertilizer/crop records in one pass.
+
+    Returns the (n_valid, 8) feature array, the positions of the valid rows in
+    `records`, and a {position: error message} dict for the rejected ones.
+    """
+    features = np.empty((len(records), len(FERTILIZER_FEATURES)), dtype=np.float64)
+    valid = np.zeros(len(records), dtype=bool)
+    errors = {}
+
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors[i] = "Record must be a JSON object."
+            continue
+
+        missing = [f for f in FERTILIZER_FEATURES if f not in record]
+        if missing:
+            errors[i] = f"Missing features for fertilizer/crop prediction: {', '.join(missing)}"
+            continue
+
+        try:
+            district_encoded = fert.district_codes.get(record['District'])
+            soil_encoded = fert.soil_codes.get(record['Soil_color'])
+        except TypeError:
+            district_encoded = soil_encoded = None
+        if district_encoded is None:
+            errors[i] = f"Invalid District value: '{record['District']}'. Must be a value seen during training."
+            continue
+        if soil_encoded is None:
+            errors[i] = f"Invalid Soil_color value: '{record['Soil_color']}'. Must be a value seen during training."
+            continue
+
+        try:
+            features[i, 2:] = [float(record[f]) for f in FERTILIZER_FEATURES[2:]]
+        except (TypeError, ValueError):
+            errors[i] = f"Numeric features must be numbers: {', '.join(FERTILIZER_FEATURES[2:])}"
+            continue
+        # Python's JSON parser accepts NaN and Infinity; the tree can't score them
+        if not np.isfinite(features[i, 2:]).all():
+            errors[i] = "Features must be finite numbers."
+            continue
+
+        features[i, 0] = district_encoded
+        features[i, 1] = soil_encoded
+        valid[i] = True
+
+    return features[valid], np.flatnonzero(valid), errors
+
+
+def encode_fertilizer_columns(fert, columns):
+    """
+    Validates and encodes columnar input (District/Soil_color as integer codes
+    into the encoders' classes, the rest numeric) for the batch endpoint.
+
+    Returns the same (features, valid_rows, errors) triple as encode_fertilizer_records.
+    """
+    missing = [f for f in FERTILIZER_FEATURES if f not in columns]
+    if missing:
+        raise ValueError(f"Missing columns for fertilizer/crop prediction: {', '.join(missing)}")
+
+    arrays = [np.asarray(columns[f]).reshape(-1) for f in FERTILIZER_FEATURES]
+    n_rows = len(arrays[0])
+    if any(len(array) != n_rows for array in arrays):
+        raise ValueError("All columns must have the same length")
+    try:
+        features = np.column_stack([array.astype(np.float64) for array in arrays])
+    except (TypeError, ValueError):
+        raise ValueError("Columns must be numeric; encode District/Soil_color as codes (see /farmer/predict/schema)")
+
+    finite = np.isfinite(features).all(axis=1)
+    valid_district = finite & (features[:, 0] == np.round(features[:, 0])) & \
+        (features[:, 0] >= 0) & (features[:, 0] < len(fert.district_codes))
+    valid_soil = finite & (features[:, 1] == np.round(features[:, 1])) & \
+        (features[:, 1] >= 0) & (features[:, 1] < len(fert.soil_codes))
+    valid = valid_district & valid_soil
+
+    errors = {}
+    for i in np.flatnonzero(~valid):
+        if not finite[i]:
+            errors[int(i)] = "Features must be finite numbers."
+        elif not valid_district[i]:
+            errors[int(i)] = f"Invalid District code: {features[i, 0]:g}."
+        else:
+            errors[int(i)] = f"Invalid Soil_color code: {features[i, 1]:g}."
+
+    return features[valid], np.flatnonzero(valid), errors
+
+
+def build_fertilizer_results(fert, n_rows, valid_rows, errors, pred_numeric):
+    """Per-row JSON results, in input order, from encoded rows and their predictions."""
+    results = [None] * n_rows
+    for i, message in errors.items():
+        results[i] = {"error": message}
+
+    crops = decode_labels(fert.crop_labels, pred_numeric[:, 0])
+    fertilizers = decode_labels(fert.fertilizer_labels, pred_numeric[:, 1])
+    for row, crop, fertilizer in zip(valid_rows, crops, fertilizers):
+        results[row] = {
+            "predicted_crop": crop,
+            "predicted_fertilizer": fertilizer
+        }
+    return results
+
+
+@app.route('/farmer/predict/schema', methods=['GET'])
+def fertilizer_schema():
+    """Code tables binary clients need to pack categorical inputs and read predictions."""
+    fert = registry.get("fertilizer")
+    if fert is None:
+        return jsonify({"error": "Fertilizer/crop model is not available."}), 503
+    return jsonify({
+        "features": FERTILIZER_FEATURES,
+        "District": list(fert.district_codes),
+        "Soil_color": list(fert.soil_codes),
+        "crops": fert.crop_labels.tolist(),
+        "fertilizers": fert.fertilizer_labels.tolist()
+    })
+
+
+@app.route('/farmer/predict/batch', methods=['POST'])
+@upload_limit(MAX_BATCH_BYTES)
+def predict_fertilizer_crop_batch():
+    fert = registry.get("fertilizer")
+    if fert is None:
+        return jsonify({"error": "Fertilizer/crop model is not available."}), 503
+
+    try:
+        request_format = wire_formats.normalize_mime(request.content_type)
+        response_format = wire_formats.negotiate(request.accept_mimetypes, wire_formats.COLUMN_FORMATS)
+
+        if request_format in wire_formats.COLUMN_FORMATS:
+            columns = read_batch_columns(request_format)
+            features, valid_rows, errors = encode_fertilizer_columns(fert, columns)
+            n_rows = len(valid_rows) + len(errors)
+        else:
+            data = request.get_json(silent=True)
+            # Accept either a bare list of records or {"records": [...]}
+            records = data.get('records') if isinstance(data, dict) else data
+            if not isinstance(records, list):
+                return jsonify({"error": "Expected a non-empty list of records (or {\"records\": [...]})."}), 400
+            n_rows = len(records)
+            if n_rows <= MAX_BATCH_RECORDS:
+                features, valid_rows, errors = encode_fertilizer_records(fert, records)
+
+        if n_rows == 0:
+            return jsonify({"error": "Expected a non-empty list of records (or {\"records\": [...]})."}), 400
+        if n_rows > MAX_BATCH_RECORDS:
+            return jsonify({
+                "error": f"Too many records. Maximum batch size is {MAX_BATCH_RECORDS}, got {n_rows}"
+            }), 413
+
+        # One tree traversal for the whole batch
+        with INFERENCE_SECONDS.time(model="fertilizer"):
+            pred_numeric = fert.dt_model.predict(features) if len(valid_rows) else np.empty((0, 2), dtype=int)
+
+        if response_format != wire_formats.JSON_MIME:
+            # Codes index into /farmer/predict/schema; -1 marks rejected rows
+            crop_codes = np.full(n_rows, -1, dtype=np.int32)
+            fertilizer_codes = np.full(n_rows, -1, dtype=np.int32)
+            crop_codes[valid_rows] = pred_numeric[:, 0]
+            fertilizer_codes[valid_rows] = pred_numeric[:, 1]
+            with STAGE_SECONDS.time(stage="serialize"):
+                body = wire_formats.encode_columns({
+                    "crop_code": crop_codes,
+                    "fertilizer_code": fertilizer_codes,
+                    "valid": crop_codes >= 0
+                }, response_format)
+            return Response(body, mimetype=response_format)
+
+        results = build_fertilizer_results(fert, n_rows, valid_rows, errors, pred_numeric)
+
+        return jsonify({
+            "predictions": results,
+            "count": n_rows,
+            "failed": len(errors)
         })
 
+    except wire_formats.UnsupportedFormat as e:
+        return jsonify({"error": str(e)}), 415
+
+    except wire_formats.PayloadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+
+    except ValueError as e:
+        return jsonify({"error": f"Invalid batch payload: {str(e)}"}), 400
+
+    except RequestEntityTooLarge:
+        # A chunked body read past its upload limit; request_too_large answers it with a 413
+        raise
+
     except Exception as e:
-<<<<<<< HEAD
-        # Return error message if something goes wrong
         return jsonify({"error": str(e)}), 500
 
 
-# Run the Flask app if this script is executed directly
-if __name__ == "__main__":
-    app.run(host='127.0.0.1', port=5000, debug=True)  # Run on localhost port 5000 with debug mode
-=======
+STREAM_CHUNK_ROWS = int(os.environ.get("SKYACRE_STREAM_CHUNK_ROWS", 1000))
+STREAM_MAX_LINE_BYTES = 64 * 1024
+
+
+def read_ndjson_lines(stream, max_line_bytes=STREAM_MAX_LINE_BYTES):
+    """
+    Yields the lines of an NDJSON body as they arrive, never buffering more
+    than one line. Lines longer than max_line_bytes are skipped and yielded as None.
+    """
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        if len(line) > max_line_bytes and not line.endswith(b'\n'):
+            # Drain the rest of the oversized line without keeping it
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(max_line_bytes)
+            yield None
+        else:
+            yield line
+
+
+def score_ndjson_chunk(fert, chunk):
+    """
+    Scores a list of (line number, record, error) with one tree traversal and yields NDJSON lines.
+
+    The response headers are already sent, so a chunk that fails to score
+    answers each of its lines with an error instead of cutting the stream short.
+    """
+    try:
+        records = [record if error is None else None for _, record, error in chunk]
+        features, valid_rows, errors = encode_fertilizer_records(fert, records)
+        for i, (_, _, error) in enumerate(chunk):
+            if error is not None:
+                errors[i] = error
+
+        with INFERENCE_SECONDS.time(model="fertilizer"):
+            pred_numeric = fert.dt_model.predict(features) if len(valid_rows) else np.empty((0, 2), dtype=int)
+        results = build_fertilizer_results(fert, len(chunk), valid_rows, errors, pred_numeric)
+    except Exception as e:
+        print(f"ERROR scoring NDJSON lines {chunk[0][0]}-{chunk[-1][0]}: {e}")
+        results = [{"error": error or f"Prediction failed: {e}"} for _, _, error in chunk]
+    for (line_number, _, _), result in zip(chunk, results):
+        yield json.dumps({"line": line_number, **result}, separators=(',', ':')) + "\n"
+
+
+@app.route('/farmer/predict/stream', methods=['POST'])
+def predict_fertilizer_crop_stream():
+    """
+    Scores a newline-delimited JSON upload (one record per line) incrementally.
+
+    Records are read as they arrive and scored in chunks of STREAM_CHUNK_ROWS;
+    each chunk's results are streamed back as NDJSON before the next chunk is
+    read, so memory stays flat whatever the upload size.
+    """
+    fert = registry.get("fertilizer")
+    if fert is None:
+        return jsonify({"error": "Fertilizer/crop model is not available."}), 503
+
+    def generate():
+        chunk = []
+        for line_number, line in enumerate(read_ndjson_lines(request.stream), 1):
+            if line is None:
+                chunk.append((line_number, None, f"Line exceeds {STREAM_MAX_LINE_BYTES} bytes."))
+            elif line.strip():
+                try:
+                    chunk.append((line_number, json.loads(line), None))
+                except ValueError:
+                    chunk.append((line_number, None, "Invalid JSON."))
+            else:
+                continue
+
+            if len(chunk) >= STREAM_CHUNK_ROWS:
+                yield from score_ndjson_chunk(fert, chunk)
+                chunk = []
+
+        if chunk:
+            yield from score_ndjson_chunk(fert, chunk)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+# --- Livestock Health Batch Scoring ---
+
+def livestock_model_or_error(species):
+    """(artifact, None), or (None, error response) for an unknown species or version, or a missing model."""
+    if species not in LIVESTOCK_SPECIES:
+        return None, (jsonify({"error": f"Unknown species '{species}'. Use one of: {', '.join(LIVESTOCK_SPECIES)}"}), 404)
+    try:
+        # ?version= picks a specific registered version of the model
+        artifact = registry.get(f"{species}-health", request.args.get("version"))
+    except KeyError as e:
+        return None, (jsonify({"error": str(e.args[0])}), 404)
+    if artifact is None:
+        return None, (jsonify({"error": f"{species.capitalize()} health model is not available."}), 503)
+    return artifact, None
+
+
+def encode_livestock_records(features, records):
+    """
+    Validates a list of daily sensor records and packs them into one float32
+    feature array (the dtype the forest predicts on).
+
+    Returns the (n_valid, n_features) array, the positions of the valid rows in
+    `records`, and a {position: error message} dict for the rejected ones.
+    """
+    try:
+        # Fast path: every record has every feature as a number
+        X = np.array([[record[f] for f in features] for record in records], dtype=np.float32)
+        errors = {}
+    except (TypeError, KeyError, ValueError):
+        X = np.zeros((len(records), len(features)), dtype=np.float32)
+        errors = {}
+        for i, record in enumerate(records):
+            if not isinstance(record, dict):
+                errors[i] = "Record must be a JSON object."
+                continue
+            missing = [f for f in features if f not in record]
+            if missing:
+                errors[i] = f"Missing features: {', '.join(missing)}"
+                continue
+            try:
+                X[i] = [float(record[f]) for f in features]
+            except (TypeError, ValueError):
+                errors[i] = f"Features must be numbers: {', '.join(features)}"
+
+    valid = np.isfinite(X).all(axis=1)
+    for i in np.flatnonzero(~valid):
+        errors.setdefault(int(i), "Features must be finite numbers.")
+    valid[list(errors)] = False
+    return X[valid], np.flatnonzero(valid), errors
+
+
+def encode_livestock_columns(features, columns):
+    """Columnar input (one numeric array per feature); returns the same triple as encode_livestock_records."""
+    missing = [f for f in features if f not in columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    arrays = [np.asarray(columns[f]).reshape(-1) for f in features]
+    if any(len(array) != len(arrays[0]) for array in arrays):
+        raise ValueError("All columns must have the same length")
+    try:
+        X = np.column_stack([array.astype(np.float32) for array in arrays])
+    except (TypeError, ValueError):
+        raise ValueError("Columns must be numeric")
+    valid = np.isfinite(X).all(axis=1)
+    errors = {int(i): "Features must be finite numbers." for i in np.flatnonzero(~valid)}
+    return X[valid], np.flatnonzero(valid), errors
+
+
+@app.route('/predict/<species>-health/schema', methods=['GET'])
+def livestock_health_schema(species):
+    """Feature order and class names (class_code indexes `classes`) for binary clients."""
+    artifact, error = livestock_model_or_error(species)
+    if error is not None:
+        return error
+    return jsonify({"features": list(artifact["features"]), "classes": artifact["classes"].tolist()})
+
+
+@app.route('/predict/<species>-health/batch', methods=['POST'])
+@upload_limit(MAX_BATCH_BYTES)
+def predict_livestock_health_batch(species):
+    """
+    Scores many farm-days at once: a JSON list of daily sensor records (or
+    {"records": [...]}), or binary columns, all passed to the forest in one
+    predict_proba call. Results are in input order; invalid rows get an
+    `error` entry instead of failing the batch.
+    """
+    artifact, error = livestock_model_or_error(species)
+    if error is not None:
+        return error
+    features = artifact["features"]
+    classes = artifact["classes"]
+
+    try:
+        request_format = wire_formats.normalize_mime(request.content_type)
+        response_format = wire_formats.negotiate(request.accept_mimetypes, wire_formats.COLUMN_FORMATS)
+
+        if request_format in wire_formats.COLUMN_FORMATS:
+            columns = read_batch_columns(request_format)
+            X, valid_rows, errors = encode_livestock_columns(features, columns)
+            n_rows = len(valid_rows) + len(errors)
+        else:
+            data = request.get_json(silent=True)
+            records = data.get('records') if isinstance(data, dict) else data
+            if not isinstance(records, list):
+                return jsonify({"error": "Expected a non-empty list of records (or {\"records\": [...]})."}), 400
+            n_rows = len(records)
+            if n_rows <= MAX_BATCH_RECORDS:
+                X, valid_rows, errors = encode_livestock_records(features, records)
+
+        if n_rows == 0:
+            return jsonify({"error": "Expected a non-empty list of records (or {\"records\": [...]})."}), 400
+        if n_rows > MAX_BATCH_RECORDS:
+            return jsonify({
+                "error": f"Too many records. Maximum batch size is {MAX_BATCH_RECORDS}, got {n_rows}"
+            }), 413
+
+        # One vectorized pass of the whole forest over every valid row
+        with INFERENCE_SECONDS.time(model=f"{species}-health"):
+            probabilities = artifact["model"].predict_proba(X) if len(valid_rows) else np.empty((0, len(classes)))
+        codes = np.argmax(probabilities, axis=1)
+        confidence = probabilities[np.arange(len(codes)), codes]
+
+        if response_format != wire_formats.JSON_MIME:
+            # Codes index into the schema's classes; -1 marks rejected rows
+            class_codes = np.full(n_rows, -1, dtype=np.int32)
+            confidences = np.zeros(n_rows, dtype=np.float32)
+            class_codes[valid_rows] = codes
+            confidences[valid_rows] = confidence
+            with STAGE_SECONDS.time(stage="serialize"):
+                body = wire_formats.encode_columns({
+                    "class_code": class_codes,
+                    "confidence": confidences,
+                    "valid": class_codes >= 0
+                }, response_format)
+            return Response(body, mimetype=response_format)
+
+        results = [None] * n_rows
+        for i, message in errors.items():
+            results[i] = {"error": message}
+        labels = classes.tolist()
+        for row, code, conf, row_probabilities in zip(valid_rows.tolist(), codes.tolist(), confidence.tolist(),
+                                                      probabilities.tolist()):
+            results[row] = {
+                "predicted_condition": labels[code],
+                "confidence": round(conf, 4),
+                "all_predictions": dict(zip(labels, row_probabilities))
+            }
+
+        return jsonify({"predictions": results, "count": n_rows, "failed": len(errors)})
+
+    except wire_formats.UnsupportedFormat as e:
+        return jsonify({"error": str(e)}), 415
+
+    except wire_formats.PayloadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+
+    except ValueError as e:
+        return jsonify({"error": f"Invalid batch payload: {str(e)}"}), 400
+
+    except RequestEntityTooLarge:
+        # A chunked body read past its upload limit; request_too_large answers it with a 413
+        raise
+
+    except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-def preprocess_image(image_bytes, target_size=(224, 224)):
-    """Preprocesses a single image for the cow disease model."""
+# Micro-batching: single-image uploads arriving within SKYACRE_BATCH_MAX_WAIT_MS of each other share
+# one forward pass of up to SKYACRE_BATCH_MAX_SIZE images (SKYACRE_MICRO_BATCHING=0 disables it)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+IMAGE_BATCH_SIZE = metrics.Histogram(
+    "skyacre_image_batch_size", "Images per micro-batched forward pass", ["model"], buckets=BATCH_SIZE_BUCKETS)
+
+
+def record_image_batch(batch_size, seconds, name):
+    """MicroBatcher callback recording each forward pass's size and duration."""
+    IMAGE_BATCH_SIZE.observe(batch_size, model=name)
+    INFERENCE_SECONDS.observe(seconds, model=name)
+
+
+# One batching thread for every image model, so cow and poultry forward passes take turns on the
+# cores instead of competing for them
+image_batcher = None
+if os.environ.get("SKYACRE_MICRO_BATCHING", "1") != "0":
+    image_batcher = MicroBatcher(
+        max_batch_size=int(os.environ.get("SKYACRE_BATCH_MAX_SIZE", 32)),
+        max_wait_seconds=float(os.environ.get("SKYACRE_BATCH_MAX_WAIT_MS", 5)) / 1000,
+        on_batch=record_image_batch
+    )
+    metrics.Gauge("skyacre_image_batch_queue_depth", "Images waiting for a micro-batched forward pass",
+                  function=lambda: image_batcher.queue_depth)
+
+MAX_TENSOR_IMAGES = int(os.environ.get("SKYACRE_MAX_TENSOR_IMAGES", 256))
+# Raw pixels plus generous room for the container headers
+MAX_TENSOR_BYTES = MAX_TENSOR_IMAGES * IMAGE_SIZE[0] * IMAGE_SIZE[1] * 3 + 64 * 1024
+
+
+# JPEGs are decoded straight at a reduced scale (1/2, 1/4 or 1/8) that still covers the target size,
+# instead of at full resolution (SKYACRE_JPEG_DRAFT=0 turns this off)
+JPEG_DRAFT_DECODE = os.environ.get("SKYACRE_JPEG_DRAFT", "1") != "0"
+
+
+# Reusable (1, H, W, 3) float32 input buffer per request thread, for single-image requests
+_image_buffers = threading.local()
+
+
+def image_buffer(target_size=IMAGE_SIZE):
+    """This thread's single-image input buffer; its contents are only valid until the thread's next request."""
+    buffer = getattr(_image_buffers, "buffer", None)
+    if buffer is None or buffer.shape[1:3] != (target_size[1], target_size[0]):
+        buffer = _image_buffers.buffer = np.empty((1, target_size[1], target_size[0], 3), dtype=np.float32)
+    return buffer
+
+
+def preprocess_image(image_bytes, target_size=IMAGE_SIZE, out=None):
+    """
+    Preprocesses a single image for the cow disease model.
+
+    The [0, 1] float32 pixels are written straight into `out` (an (H, W, 3)
+    float32 array, e.g. one row of a batch buffer) when given, else into a new
+    array. Returns them with a batch dimension, as a view of `out` (no copy).
+    """
     try:
-        img = Image.open(io.BytesIO(image_bytes))
-        img = img.convert('RGB')
-        img = img.resize(target_size)
-        img_array = np.array(img)
-        img_array = img_array / 255.0  # Normalize to [0, 1]
-        img_array = np.expand_dims(img_array, axis=0)  # Add batch dimension
-        return img_array
+        with STAGE_SECONDS.time(stage="decode"):
+            img = Image.open(io.BytesIO(image_bytes))
+            if JPEG_DRAFT_DECODE:
+                # DCT scaling in the JPEG decoder; a no-op for formats that can't do it (full decode)
+                img.draft('RGB', target_size)
+            img = img.convert('RGB')
+        with STAGE_SECONDS.time(stage="resize"):
+            img = img.resize(target_size)
+        if out is None:
+            out = np.empty((target_size[1], target_size[0], 3), dtype=np.float32)
+        # Normalize to [0, 1] straight from the uint8 pixels into the float32 buffer
+        np.divide(np.asarray(img), np.float32(255.0), out=out)
+        return out[np.newaxis]  # Add batch dimension
     except Exception as e:
         raise ValueError(f"Invalid or corrupt image: {str(e)}")
 
 
-@app.route('/predict/cow-disease', methods=['POST'])
-def predict_cow_disease():
-    if not cow_disease_model:
-        return jsonify({"error": "Cow disease model is not available."}), 503
+def format_image_prediction(probabilities, class_labels=COW_DISEASE_CLASS_LABELS):
+    """JSON body for one image's class probabilities."""
+    predicted_class_index = int(np.argmax(probabilities))
+    return {
+        "predicted_class": class_labels[predicted_class_index],
+        "confidence": round(float(probabilities[predicted_class_index]), 4),
+        "all_predictions": {label: float(conf) for label, conf in zip(class_labels.values(), probabilities)}
+    }
+
+
+def predict_image_tensor(model_name, model, request_format):
+    """Scores pre-decoded uint8 (N, 224, 224, 3) images, skipping image decode entirely."""
+    body = request.get_data()
+    if len(body) > MAX_TENSOR_BYTES:
+        return jsonify({
+            "error": f"Payload too large. Maximum is {MAX_TENSOR_IMAGES} images of {IMAGE_SIZE[0]}x{IMAGE_SIZE[1]}x3"
+        }), 413
+
+    try:
+        # Compressed .npz members could otherwise decode to far more than the body's size
+        images = wire_formats.decode_tensor(body, request_format, max_bytes=MAX_TENSOR_BYTES)
+        if images.ndim == 3:
+            images = images[np.newaxis]
+        if images.dtype != np.uint8 or images.shape[1:] != (IMAGE_SIZE[1], IMAGE_SIZE[0], 3) or not len(images):
+            return jsonify({
+                "error": f"Expected a uint8 tensor of shape (N, {IMAGE_SIZE[1]}, {IMAGE_SIZE[0]}, 3), "
+                         f"got {images.dtype} {images.shape}"
+            }), 400
+
+        # Same [0, 1] scaling as preprocess_image, in one float32 pass
+        batch = np.divide(images, np.float32(255.0), out=np.empty(images.shape, dtype=np.float32))
+        with INFERENCE_SECONDS.time(model=model_name):
+            predictions = model.predict(batch, verbose=0)
+
+        response_format = wire_formats.negotiate(request.accept_mimetypes, [wire_formats.NPZ_MIME, wire_formats.MSGPACK_MIME])
+        if response_format != wire_formats.JSON_MIME:
+            with STAGE_SECONDS.time(stage="serialize"):
+                body = wire_formats.encode_arrays({
+                    "probabilities": predictions.astype(np.float32),
+                    "predicted_class": np.argmax(predictions, axis=1).astype(np.int32)
+                }, response_format)
+            return Response(body, mimetype=response_format)
+
+        class_labels = IMAGE_MODELS[model_name]["labels"]
+        return jsonify({"predictions": [format_image_prediction(p, class_labels) for p in predictions]})
+
+    except wire_formats.UnsupportedFormat as e:
+        return jsonify({"error": str(e)}), 415
+
+    except wire_formats.PayloadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+
+    except ValueError as e:
+        return jsonify({"error": f"Invalid image tensor: {str(e)}"}), 400
+
+    except Exception as e:
+        return jsonify({"error": f"An error occurred during prediction: {str(e)}"}), 500
+
+
+ALLOWED_IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp'}
+MAX_IMAGE_BYTES = 10 * 1024 * 1024  # 10 MB per file
+UPLOAD_CHUNK_BYTES = 64 * 1024
+# Multipart boundaries and part headers on top of the file itself
+UPLOAD_OVERHEAD_BYTES = 64 * 1024
+# Whole herd screening request; bounds what one request can hold in memory and temp files
+MAX_HERD_UPLOAD_BYTES = int(os.environ.get("SKYACRE_MAX_HERD_UPLOAD_MB", 256)) * 1024 * 1024
+
+# Leading bytes of each allowed image format
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+]
+
+
+def sniff_image_format(header):
+    """The image format named by a file's first bytes, or None if it isn't one of the allowed formats."""
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    for signature, image_format in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    return None
+
+
+def upload_size(stream):
+    """Size of a spooled upload without reading it, or None if the stream can't tell."""
+    try:
+        position = stream.tell()
+        size = stream.seek(0, io.SEEK_END)
+        stream.seek(position)
+        return size - position
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def image_upload_limit():
+    """Tensor bodies may be up to MAX_TENSOR_BYTES; an image upload is one file plus multipart overhead."""
+    if wire_formats.normalize_mime(request.content_type) in wire_formats.TENSOR_FORMATS:
+        return MAX_TENSOR_BYTES
+    return MAX_IMAGE_BYTES + UPLOAD_OVERHEAD_BYTES
+
+
+# Herd screening uploads: file count limit and threads decoding/resizing them in parallel
+MAX_UPLOAD_IMAGES = int(os.environ.get("SKYACRE_MAX_UPLOAD_IMAGES", 256))
+image_decode_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("SKYACRE_DECODE_THREADS", min(8, os.cpu_count() or 1))),
+    thread_name_prefix="decode"
+)
+
+
+# Repeated uploads of the same photo are answered from a cache keyed by a hash of the raw bytes and the
+# loaded model's fingerprint. SKYACRE_IMAGE_CACHE_DB adds a SQLite tier shared by all workers on the host.
+IMAGE_CACHE_DB = os.environ.get("SKYACRE_IMAGE_CACHE_DB")
+image_cache = ResponseCache(
+    max_size=int(os.environ.get("SKYACRE_IMAGE_CACHE_SIZE", 1000)),
+    ttl_seconds=float(os.environ.get("SKYACRE_IMAGE_CACHE_TTL", 86400)),
+    backing=SQLiteCache(
+        IMAGE_CACHE_DB,
+        max_size=int(os.environ.get("SKYACRE_IMAGE_CACHE_DB_SIZE", 100000)),
+        ttl_seconds=float(os.environ.get("SKYACRE_IMAGE_CACHE_TTL", 86400))
+    ) if IMAGE_CACHE_DB else None
+)
+
+
+def image_cache_key(model_name, image_bytes):
+    """Cache key for an upload: model, loaded artifact, serving backend and a hash of the raw bytes."""
+    fingerprint = registry.fingerprint(model_name, request.args.get("version"))
+    digest = hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+    return f"{model_name}:{fingerprint}:{IMAGE_MODELS[model_name]['backend']}:{digest}"
+
+
+def read_image_upload(file):
+    """
+    Checks an uploaded file's type and size; returns (image_bytes, None) or (None, error message).
+
+    The upload is read in chunks into a buffer capped at MAX_IMAGE_BYTES: an
+    oversized file is rejected before its content is read (or once the cap is
+    passed, when its size isn't known up front), and a file whose first bytes
+    are not a supported image format after the first chunk.
+    """
+    # Validate file type
+    file_ext = file.filename.rsplit('.', 1)[-1].lower() if '.' in file.filename else ''
+    if file_ext not in ALLOWED_IMAGE_EXTENSIONS:
+        return None, f"Invalid file type. Allowed types: {', '.join(ALLOWED_IMAGE_EXTENSIONS)}"
+
+    stream = file.stream
+    size = upload_size(stream)
+    if size is not None and size > MAX_IMAGE_BYTES:
+        return None, f"File too large. Maximum size is 10MB, got {size / (1024*1024):.2f}MB"
+
+    chunk = stream.read(UPLOAD_CHUNK_BYTES)
+    if sniff_image_format(chunk) is None:
+        return None, f"File content is not a supported image. Allowed types: {', '.join(ALLOWED_IMAGE_EXTENSIONS)}"
+
+    buffer = io.BytesIO()
+    while chunk:
+        if buffer.tell() + len(chunk) > MAX_IMAGE_BYTES:
+            return None, "File too large. Maximum size is 10MB"
+        buffer.write(chunk)
+        chunk = stream.read(UPLOAD_CHUNK_BYTES)
+    return buffer.getvalue(), None
+
+
+def unique_filenames(files):
+    """Upload filenames as result keys; repeated names get a #2, #3, ... suffix."""
+    seen = {}
+    keys = []
+    for file in files:
+        name = file.filename or "image"
+        seen[name] = seen.get(name, 0) + 1
+        keys.append(name if seen[name] == 1 else f"{name}#{seen[name]}")
+    return keys
+
+
+def predict_image_batch(model_name):
+    """
+    Herd/flock screening: scores many images sent in one multipart request as
+    repeated `images` fields. Files are checked one by one, decoded and
+    resized in parallel, and the valid ones go through the model as one batch.
+    Results are keyed by filename; rejected files get an `error` entry.
+    """
+    try:
+        model = registry.get(model_name, request.args.get("version"))
+    except KeyError as e:
+        return jsonify({"error": str(e.args[0])}), 404
+    if model is None:
+        return jsonify({"error": f"{IMAGE_MODELS[model_name]['description']} model is not available."}), 503
+
+    files = [file for file in request.files.getlist('images') + request.files.getlist('image') if file.filename]
+    if not files:
+        return jsonify({"error": "No image files provided. Send them as repeated 'images' fields."}), 400
+    if len(files) > MAX_UPLOAD_IMAGES:
+        return jsonify({
+            "error": f"Too many images. Maximum is {MAX_UPLOAD_IMAGES} per request, got {len(files)}"
+        }), 413
+
+    keys = unique_filenames(files)
+    results = {}
+    uploads = {}
+    cache_keys = {}
+    for key, file in zip(keys, files):
+        image_bytes, error = read_image_upload(file)
+        if error is not None:
+            results[key] = {"error": error}
+            continue
+        cache_keys[key] = image_cache_key(model_name, image_bytes)
+        cached = image_cache.get(cache_keys[key])
+        if cached is not None:
+            results[key] = cached
+        else:
+            uploads[key] = image_bytes
+
+    # Each decode thread writes its image straight into its row of the batch buffer
+    batch = np.empty((len(uploads), IMAGE_SIZE[1], IMAGE_SIZE[0], 3), dtype=np.float32)
+    decoding = {
+        key: image_decode_pool.submit(preprocess_image, image_bytes, out=batch[row])
+        for row, (key, image_bytes) in enumerate(uploads.items())
+    }
+    decoded = []
+    for key, future in decoding.items():
+        try:
+            future.result()
+            decoded.append(key)
+        except ValueError as e:
+            results[key] = {"error": str(e)}
+    if len(decoded) < len(uploads):
+        # Drop the rows of images that failed to decode (the only case that copies the batch)
+        decoded_keys = set(decoded)
+        batch = batch[[row for row, key in enumerate(uploads) if key in decoded_keys]]
+
+    try:
+        if decoded:
+            # One batch for the whole upload (the serving model chunks it to its batch size)
+            with INFERENCE_SECONDS.time(model=model_name):
+                predictions = model.predict(batch, verbose=0)
+            class_labels = IMAGE_MODELS[model_name]["labels"]
+            for key, probabilities in zip(decoded, predictions):
+                results[key] = format_image_prediction(probabilities, class_labels)
+                image_cache.put(cache_keys[key], results[key])
+    except Exception as e:
+        return jsonify({"error": f"An error occurred during prediction: {str(e)}"}), 500
+
+    return jsonify({
+        "predictions": {key: results[key] for key in keys},
+        "count": len(keys),
+        "failed": sum("error" in result for result in results.values())
+    })
+
+
+def predict_image(model_name):
+    """Scores one uploaded `image` file (or a raw uint8 tensor body) with the named image model."""
+    try:
+        # ?version= picks a specific registered version of the model
+        model = registry.get(model_name, request.args.get("version"))
+    except KeyError as e:
+        return jsonify({"error": str(e.args[0])}), 404
+    if model is None:
+        return jsonify({"error": f"{IMAGE_MODELS[model_name]['description']} model is not available."}), 503
+
+    # Clients that already resized can send raw uint8 tensors instead of an image file
+    request_format = wire_formats.normalize_mime(request.content_type)
+    if request_format in wire_formats.TENSOR_FORMATS:
+        return predict_image_tensor(model_name, model, request_format)
 
     if 'image' not in request.files:
         return jsonify({"error": "No image file provided."}), 400
@@ -336,40 +1413,29 @@ def predict_cow_disease():
     if file.filename == '':
         return jsonify({"error": "No selected file."}), 400
 
-    # Validate file type
-    allowed_extensions = {'jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp'}
-    file_ext = file.filename.rsplit('.', 1)[-1].lower() if '.' in file.filename else ''
-    if file_ext not in allowed_extensions:
-        return jsonify({
-            "error": f"Invalid file type. Allowed types: {', '.join(allowed_extensions)}"
-        }), 400
+    image_bytes, error = read_image_upload(file)
+    if error is not None:
+        return jsonify({"error": error}), 400
 
-    # Read file content for size validation
-    image_bytes = file.read()
-    
-    # Validate file size (max 10MB)
-    max_size = 10 * 1024 * 1024  # 10 MB
-    if len(image_bytes) > max_size:
-        return jsonify({
-            "error": f"File too large. Maximum size is 10MB, got {len(image_bytes) / (1024*1024):.2f}MB"
-        }), 400
+    # The same photo sent again skips decoding and inference
+    cache_key = image_cache_key(model_name, image_bytes)
+    cached = image_cache.get(cache_key)
+    if cached is not None:
+        return jsonify(cached)
 
     try:
-        processed_image = preprocess_image(image_bytes)
-        
-        # Make prediction
-        predictions = cow_disease_model.predict(processed_image)
+        processed_image = preprocess_image(image_bytes, out=image_buffer()[0])
         
-        # Get the class with the highest probability
-        predicted_class_index = np.argmax(predictions[0])
-        predicted_class_name = COW_DISEASE_CLASS_LABELS[predicted_class_index]
-        confidence = float(predictions[0][predicted_class_index])
+        # Make prediction (batched with concurrent uploads when micro-batching is on)
+        if image_batcher is not None:
+            predictions = image_batcher.predict(model, processed_image, name=model_name)
+        else:
+            with INFERENCE_SECONDS.time(model=model_name):
+                predictions = model.predict(processed_image)
         
-        return jsonify({
-            "predicted_class": predicted_class_name,
-            "confidence": round(confidence, 4),
-            "all_predictions": {label: float(conf) for label, conf in zip(COW_DISEASE_CLASS_LABELS.values(), predictions[0])}
-        })
+        result = format_image_prediction(predictions[0], IMAGE_MODELS[model_name]["labels"])
+        image_cache.put(cache_key, result)
+        return jsonify(result)
 
     except ValueError as e:
         # Handle invalid/corrupt image errors
@@ -379,6 +1445,29 @@ def predict_cow_disease():
         return jsonify({"error": f"An error occurred during prediction: {str(e)}"}), 500
 
 
+@app.route('/predict/cow-disease/batch', methods=['POST'])
+@upload_limit(MAX_HERD_UPLOAD_BYTES)
+def predict_cow_disease_batch():
+    return predict_image_batch("cow-disease")
+
+
+@app.route('/predict/cow-disease', methods=['POST'])
+@upload_limit(image_upload_limit)
+def predict_cow_disease():
+    return predict_image("cow-disease")
+
+
+@app.route('/predict/poultry-disease/batch', methods=['POST'])
+@upload_limit(MAX_HERD_UPLOAD_BYTES)
+def predict_poultry_disease_batch():
+    return predict_image_batch("poultry-disease")
+
+
+@app.route('/predict/poultry-disease', methods=['POST'])
+@upload_limit(image_upload_limit)
+def predict_poultry_disease():
+    return predict_image("poultry-disease")
+
+
 if __name__ == "__main__":
     app.run(host='127.0.0.1', port=5000, debug=True)
->>>>>>> 513ced589ae307e964e6765f94a681e3871f69e7
@@ -0,0 +1,336 @@
+"""
+ASGI Serving Mode for the AI Microservice
+
+Serves the routes of app.py from an asyncio event loop. Under Flask's sync
+workers a thread is held for the whole request, including the seconds a
+mobile client spends uploading a photo, so the worker count ends up sized by
+network time rather than by CPU. Here the event loop reads request bodies
+(spooled to a temporary file past 1 MB) and writes responses, holding any
+number of slow connections at the cost of a buffer each. Only a complete
+request is handed to the Flask app, on a bounded pool of handler threads
+(SKYACRE_ASGI_THREADS) where decoding, preprocessing and inference run; the
+herd endpoint's decode pool and the micro-batcher sit behind it as before.
+Routes, payloads and status codes are exactly those of app.py.
+
+The event loop only moves bytes. Parsing the JSON request body and
+serializing the response still happen in the Flask views, and so on the
+handler threads, along with the rest of the request's CPU work.
+
+/farmer/predict/stream is passed through incrementally instead: its handler
+thread reads NDJSON lines as they arrive and its results are sent back as
+each chunk is scored. At most STREAM_QUEUE_CHUNKS chunks wait for the handler;
+past that the event loop stops reading the connection until it catches up.
+
+A client that disconnects before its body is complete aborts the request: a
+buffered request never reaches the Flask app, and a streaming handler's next
+read raises ClientDisconnected instead of seeing a short body.
+
+Usage:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000     # one process
+    python asgi_app.py --bind 0.0.0.0:5000
+    python serve.py --asgi --workers 4                   # pre-forked, models preloaded
+
+Needs uvicorn (pip install uvicorn); any ASGI 3 server can serve `app`.
+"""
+
+import io
+import os
+import sys
+import json
+import queue
+import asyncio
+import argparse
+import tempfile
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import app as service
+
+# Handler threads per process: requests decoding images or running inference at the same time
+HANDLER_THREADS = int(os.environ.get("SKYACRE_ASGI_THREADS", 0)) or min(32, 4 * (os.cpu_count() or 1))
+# Largest request body accepted; bigger uploads get a 413 as soon as the size is known
+MAX_REQUEST_BYTES = int(os.environ.get("SKYACRE_MAX_REQUEST_MB", 256)) * 1024 * 1024
+# Bodies up to this size stay in memory while they are read, larger ones go to a temporary file
+SPOOL_BYTES = 1024 * 1024
+# Paths whose body is handed to the handler while it is still arriving
+STREAMED_PATHS = {"/farmer/predict/stream"}
+# Body chunks buffered ahead of a streaming handler before the event loop stops reading
+STREAM_QUEUE_CHUNKS = 64
+
+
+class ClientDisconnected(OSError):
+    """Raised when the client goes away before the request body is complete."""
+
+
+class QueueReader(io.RawIOBase):
+    """
+    Blocking file object over body chunks the event loop puts on a queue
+    (b"" marks the end, None a disconnect). on_take is called for every
+    chunk taken off the queue, so the event loop can read the next one.
+    """
+
+    def __init__(self, chunks, on_take=None):
+        self._chunks = chunks
+        self._on_take = on_take
+        self._pending = b""
+        self._finished = False
+        self._disconnected = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._disconnected:
+            raise ClientDisconnected("Client disconnected before the request body was complete")
+        if not self._pending and not self._finished:
+            chunk = self._chunks.get()
+            if self._on_take is not None:
+                self._on_take()
+            if chunk is None:
+                self._disconnected = True
+                raise ClientDisconnected("Client disconnected before the request body was complete")
+            self._pending = chunk
+            self._finished = not self._pending
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+class WSGIBridge:
+    """
+    ASGI 3 application running a WSGI app on a bounded thread pool.
+
+    The event loop does the network I/O: it reads the request body before
+    any handler thread is involved, and sends the response chunks the
+    handler produces. Handler threads only run the WSGI app itself.
+    """
+
+    def __init__(self, wsgi_app, max_workers=HANDLER_THREADS, max_body_bytes=MAX_REQUEST_BYTES,
+                 streamed_paths=STREAMED_PATHS, stream_queue_chunks=STREAM_QUEUE_CHUNKS):
+        """
+        Args:
+            wsgi_app: The WSGI application (the Flask app)
+            max_workers: Handler threads, i.e. requests processed at the same time
+            max_body_bytes: Request bodies above this size are answered with 413
+            streamed_paths: Paths whose body is read by the handler while it arrives
+            stream_queue_chunks: Body chunks read ahead of a streaming handler
+        """
+        self.wsgi_app = wsgi_app
+        self.max_workers = max_workers
+        self.max_body_bytes = max_body_bytes
+        self.streamed_paths = set(streamed_paths)
+        self.stream_queue_chunks = stream_queue_chunks
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        """The handler pool, created on first use in each (forked) worker process."""
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="asgi-handler")
+                    self._pid = os.getpid()
+        return self._executor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        headers = [(name.decode("latin-1"), value.decode("latin-1")) for name, value in scope["headers"]]
+        content_length = next((value for name, value in headers if name == "content-length"), None)
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            await self._send_too_large(send)
+            return
+
+        loop = asyncio.get_running_loop()
+        pump = None
+        if scope["path"] in self.streamed_paths:
+            # Unbounded queue for the handler thread; the semaphore bounds it without blocking the loop
+            chunks = queue.Queue()
+            slots = asyncio.Semaphore(self.stream_queue_chunks)
+            body = io.BufferedReader(QueueReader(chunks, on_take=lambda: loop.call_soon_threadsafe(slots.release)))
+            pump = asyncio.ensure_future(self._pump_body(receive, chunks, slots))
+        else:
+            try:
+                body = await self._read_body(receive)
+            except ClientDisconnected:
+                return
+            if body is None:
+                await self._send_too_large(send)
+                return
+            content_length = str(body.seek(0, io.SEEK_END))
+            body.seek(0)
+
+        environ = self._environ(scope, headers, body, content_length)
+        # Flask's context locals are context variables; every step of one request must run in the same context
+        context = contextvars.copy_context()
+        chunks_out = None
+        try:
+            status, response_headers, chunks_out = await loop.run_in_executor(
+                self.executor, context.run, self._start, environ)
+            await send({
+                "type": "http.response.start",
+                "status": int(status.split(" ", 1)[0]),
+                "headers": [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                            for name, value in response_headers]
+            })
+            iterator = iter(chunks_out)
+            while True:
+                # Chunks of a streamed response may do work (NDJSON scoring), so they are produced off the loop
+                chunk = await loop.run_in_executor(self.executor, context.run, next, iterator, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        except ClientDisconnected:
+            # A streaming handler read past a disconnect; there is nobody to answer
+            pass
+        finally:
+            if pump is not None:
+                pump.cancel()
+            if hasattr(chunks_out, "close"):
+                # Runs Flask's request teardown
+                await loop.run_in_executor(self.executor, context.run, chunks_out.close)
+            body.close()
+
+    async def _read_body(self, receive):
+        """
+        The whole request body as a file object, or None once it exceeds
+        max_body_bytes. Raises ClientDisconnected if the client leaves first.
+        """
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                body.close()
+                raise ClientDisconnected("Client disconnected before the request body was complete")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                body.close()
+                return None
+            body.write(chunk)
+            if not message.get("more_body", False):
+                break
+        return body
+
+    async def _pump_body(self, receive, chunks, slots):
+        """
+        Feeds a streaming handler's body queue. Each chunk takes one of the
+        slots, released as the handler takes it, so reading pauses (without
+        polling) while the handler is behind.
+        """
+        try:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    chunks.put(None)
+                    return
+                chunk = message.get("body", b"")
+                done = not message.get("more_body", False)
+                for item in ([chunk] if chunk else []) + ([b""] if done else []):
+                    await slots.acquire()
+                    chunks.put(item)
+                if done:
+                    return
+        except asyncio.CancelledError:
+            # The response is finished or failed; unblock a handler still waiting for input
+            chunks.put(b"")
+            raise
+
+    def _start(self, environ):
+        """Runs the WSGI app up to its response headers (in a handler thread)."""
+        response = {}
+
+        def write(data):
+            raise RuntimeError("The legacy WSGI write() callable is not supported")
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = status
+            response["headers"] = headers
+            return write
+
+        chunks = self.wsgi_app(environ, start_response)
+        return response["status"], response["headers"], chunks
+
+    @staticmethod
+    def _environ(scope, headers, body, content_length):
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope["query_string"].decode("latin-1"),
+            "SERVER_NAME": str(server[0]),
+            "SERVER_PORT": str(server[1] if server[1] is not None else 80),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0],
+            "REMOTE_PORT": str(client[1]),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            # Lets werkzeug read a streamed body without a Content-Length up to its end
+            "wsgi.input_terminated": True,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False
+        }
+        if content_length is not None:
+            environ["CONTENT_LENGTH"] = content_length
+        for name, value in headers:
+            if name == "content-length":
+                continue
+            key = "CONTENT_TYPE" if name == "content-type" else "HTTP_" + name.upper().replace("-", "_")
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    @staticmethod
+    async def _send_too_large(send):
+        body = json.dumps({"error": "Request body too large."}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+app = WSGIBridge(service.app)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve the SkyAcre AI API from an asyncio event loop')
+    parser.add_argument('--bind', default=os.environ.get("SKYACRE_BIND", "0.0.0.0:5000"),
+                        help='Address to listen on (host:port)')
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("asgi_app.py requires uvicorn (pip install uvicorn)")
+
+    host, port = args.bind.rsplit(":", 1)
+    print(f"Serving on {args.bind} from an event loop with {app.max_workers} handler threads")
+    uvicorn.run(app, host=host, port=int(port), log_level="warning")
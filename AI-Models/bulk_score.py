@@ -0,0 +1,246 @@
+"""
+Offline Bulk Scorer for the Crop & Fertilizer Model
+
+Re-scores large survey CSVs shaped like `Data/Processed/Crop and fertilizer dataset.csv`
+without going through the HTTP API. The CSV is read in chunks, each chunk is
+encoded with the saved encoders and scored by a pool of worker processes, and
+predictions are written in input order to CSV or Parquet.
+
+Usage:
+    python bulk_score.py "Data/Processed/Crop and fertilizer dataset.csv" predictions.csv
+    python bulk_score.py surveys.csv predictions.parquet --workers 8 --chunksize 200000
+    python bulk_score.py surveys.csv predictions.csv --start-row 3400000   # resume
+
+Parquet output is a directory with one part file per chunk (readable with
+pandas.read_parquet); CSV output is a single file that a resumed run appends to.
+A resumed run first removes any output for rows from --start-row on, so the
+row printed when a run stops can be passed straight back.
+"""
+
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from fertilizer_tree import (CompiledFertilizerTree, build_code_lookup, build_label_index, decode_labels,
+                             load_lookups)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, "Models")
+
+# Model input order; the dataset calls the district column District_Name
+FEATURE_COLUMNS = ['District', 'Soil_color', 'Nitrogen', 'Phosphorus',
+                   'Potassium', 'pH', 'Rainfall', 'Temperature']
+COLUMN_ALIASES = {'District_Name': 'District'}
+
+# Per-process state, filled by init_worker()
+_worker = {}
+
+
+def load_scoring_artifacts(model_dir=MODEL_DIR, backend='sklearn'):
+    """Loads the model, encoder lookups and label tables from model_dir."""
+    import joblib
+
+    lookups = None
+    if backend == 'compiled':
+        tree_path = os.path.join(model_dir, "skyacre_fertilizer_tree.npz")
+        model = CompiledFertilizerTree.load(tree_path)
+        lookups = load_lookups(tree_path)
+    else:
+        model = joblib.load(os.path.join(model_dir, "skyacre_fertilizer_model.pkl"))
+    if lookups is None:
+        lookups = {name: joblib.load(os.path.join(model_dir, f"{name}.pkl"))
+                   for name in ("encoder_district", "encoder_soil", "map_crops", "map_fertilizers")}
+
+    # Same lookup tables as app.py's FertilizerModels
+    return {
+        "model": model,
+        "district_codes": build_code_lookup(lookups["encoder_district"]),
+        "soil_codes": build_code_lookup(lookups["encoder_soil"]),
+        "crop_labels": build_label_index(lookups["map_crops"]),
+        "fertilizer_labels": build_label_index(lookups["map_fertilizers"]),
+    }
+
+
+def init_worker(model_dir, backend):
+    """Process pool initializer: load everything once per worker."""
+    _worker.update(load_scoring_artifacts(model_dir, backend))
+
+
+def score_chunk(chunk):
+    """
+    Encodes and scores one DataFrame chunk in a worker.
+
+    Returns the chunk with predicted_crop, predicted_fertilizer and error columns added.
+    """
+    features = pd.DataFrame({
+        'District': chunk['District'].map(_worker["district_codes"]),
+        'Soil_color': chunk['Soil_color'].map(_worker["soil_codes"]),
+    })
+    for column in FEATURE_COLUMNS[2:]:
+        features[column] = pd.to_numeric(chunk[column], errors='coerce')
+
+    valid = features.notna().all(axis=1).to_numpy()
+    predicted_crop = np.full(len(chunk), "", dtype=object)
+    predicted_fertilizer = np.full(len(chunk), "", dtype=object)
+    if valid.any():
+        pred_numeric = _worker["model"].predict(features.to_numpy(dtype=np.float64)[valid])
+        # "Unknown (code: n)" for codes missing from the label maps, as the API answers
+        predicted_crop[valid] = decode_labels(_worker["crop_labels"], pred_numeric[:, 0])
+        predicted_fertilizer[valid] = decode_labels(_worker["fertilizer_labels"], pred_numeric[:, 1])
+
+    error = np.full(len(chunk), "", dtype=object)
+    error[~valid & features['District'].isna().to_numpy()] = "Invalid District"
+    error[~valid & (error == "") & features['Soil_color'].isna().to_numpy()] = "Invalid Soil_color"
+    error[~valid & (error == "")] = "Invalid numeric feature"
+
+    result = chunk.copy()
+    # Write back the numbers actually scored so every part has the same float columns
+    for column in FEATURE_COLUMNS[2:]:
+        result[column] = features[column]
+    result['predicted_crop'] = predicted_crop
+    result['predicted_fertilizer'] = predicted_fertilizer
+    result['error'] = error
+    return result
+
+
+def read_chunks(input_path, chunksize, start_row):
+    """Yields DataFrame chunks starting at data row start_row, with a `row` column."""
+    reader = pd.read_csv(
+        input_path,
+        chunksize=chunksize,
+        dtype={'District_Name': str, 'District': str, 'Soil_color': str},
+        skiprows=range(1, start_row + 1) if start_row else None
+    )
+    row = start_row
+    for chunk in reader:
+        chunk = chunk.rename(columns=COLUMN_ALIASES)
+        missing = [c for c in FEATURE_COLUMNS if c not in chunk.columns]
+        if missing:
+            raise ValueError(f"Input is missing columns: {', '.join(missing)}")
+        chunk.insert(0, 'row', np.arange(row, row + len(chunk)))
+        row += len(chunk)
+        yield chunk
+
+
+def truncate_csv_rows(output_path, start_row):
+    """
+    Cuts a CSV written by ChunkWriter back to its rows before start_row.
+
+    Lines are read as bytes so the cut lands on a line boundary; a last line
+    without a newline is a write that never finished and is dropped too.
+    """
+    with open(output_path, 'r+b') as f:
+        offset = len(f.readline())  # header
+        last_row = None
+        for line in iter(f.readline, b''):
+            # Every line starts with its row number (the first column)
+            if not line.endswith(b'\n') or int(line.split(b',', 1)[0]) >= start_row:
+                break
+            offset += len(line)
+            last_row = int(line.split(b',', 1)[0])
+        if last_row is not None and last_row + 1 < start_row:
+            raise ValueError(f"{output_path} ends at row {last_row}; resume with --start-row {last_row + 1}")
+        f.truncate(offset)
+
+
+class ChunkWriter:
+    """
+    Writes scored chunks to a CSV file (appending on resume) or a Parquet directory.
+
+    A fresh run (start_row 0) replaces earlier output. A resumed run first drops
+    whatever was written for rows at or past start_row, such as a chunk that was
+    only half written when the run stopped, so no row ends up in the output twice.
+    """
+
+    def __init__(self, output_path, start_row):
+        self.output_path = output_path
+        self.parquet = output_path.endswith('.parquet')
+        if self.parquet:
+            os.makedirs(output_path, exist_ok=True)
+            for name in os.listdir(output_path):
+                if name.startswith('part-') and name.endswith('.parquet') and \
+                        int(name[len('part-'):-len('.parquet')]) >= start_row:
+                    os.remove(os.path.join(output_path, name))
+        else:
+            if not start_row and os.path.exists(output_path):
+                os.remove(output_path)
+            elif os.path.exists(output_path):
+                truncate_csv_rows(output_path, start_row)
+            self.write_header = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+
+    def write(self, chunk):
+        if self.parquet:
+            first_row = int(chunk['row'].iloc[0])
+            chunk.to_parquet(os.path.join(self.output_path, f"part-{first_row:012d}.parquet"), index=False)
+        else:
+            chunk.to_csv(self.output_path, mode='a', header=self.write_header, index=False)
+            self.write_header = False
+
+
+def bulk_score(input_path, output_path, workers=None, chunksize=100000, start_row=0,
+               model_dir=MODEL_DIR, backend='sklearn'):
+    """
+    Scores input_path into output_path with a process pool, keeping input order.
+
+    Returns the number of rows written.
+    """
+    workers = workers or os.cpu_count() or 1
+    writer = ChunkWriter(output_path, start_row)
+    # Bound the chunks in flight so memory doesn't grow with the input size
+    max_pending = workers * 2
+
+    print(f"Scoring {input_path} -> {output_path} with {workers} workers "
+          f"(chunks of {chunksize} rows, starting at row {start_row})")
+
+    rows_done = 0
+    next_row = start_row
+    started = time.perf_counter()
+    pending = deque()
+
+    def write_oldest():
+        nonlocal rows_done, next_row
+        scored = pending.popleft().result()
+        writer.write(scored)
+        rows_done += len(scored)
+        next_row += len(scored)
+        elapsed = time.perf_counter() - started
+        print(f"  {rows_done} rows scored ({rows_done / elapsed:,.0f} rows/sec), next row {next_row}")
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(model_dir, backend)) as pool:
+            for chunk in read_chunks(input_path, chunksize, start_row):
+                pending.append(pool.submit(score_chunk, chunk))
+                if len(pending) >= max_pending:
+                    write_oldest()
+            while pending:
+                write_oldest()
+    except KeyboardInterrupt:
+        print(f"\nInterrupted. Resume with --start-row {next_row}")
+        raise
+
+    elapsed = time.perf_counter() - started
+    print(f"Done: {rows_done} rows in {elapsed:.1f}s ({rows_done / max(elapsed, 1e-9):,.0f} rows/sec)")
+    return rows_done
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Bulk-score a crop/fertilizer survey CSV')
+    parser.add_argument('input', help='Input CSV (District_Name or District, Soil_color, Nitrogen, ...)')
+    parser.add_argument('output', help='Output .csv file or .parquet directory')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--chunksize', type=int, default=100000, help='Rows per chunk')
+    parser.add_argument('--start-row', type=int, default=0, help='Data row to resume from (0-based)')
+    parser.add_argument('--model-dir', default=MODEL_DIR, help='Directory with the model artifacts')
+    parser.add_argument('--backend', choices=['sklearn', 'compiled'], default='sklearn',
+                        help='Score with the sklearn pickle or the compiled NumPy tree')
+    args = parser.parse_args()
+
+    bulk_score(args.input, args.output, workers=args.workers, chunksize=args.chunksize,
+               start_row=args.start_row, model_dir=args.model_dir, backend=args.backend)
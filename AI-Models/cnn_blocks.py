@@ -0,0 +1,260 @@
+"""
+Shared CNN Building Blocks for the Image Training Scripts
+
+Backbones and classifier heads used by build_cnn_model() in train.py (cow)
+and train_poultry.py (poultry), plus the size/speed report both scripts
+print after training.
+
+Heads: the original head flattens the final 14x14x256 feature map into
+Dense(512), a single layer holding ~25.7M of the model's ~27M parameters;
+the pooled heads replace it:
+
+    flatten    Flatten -> Dense(512) -> Dense(256) -> softmax     (original, ~27M parameters)
+    gap        GlobalAveragePooling -> Dense(256) -> softmax      (~1.2M)
+    conv-gap   Conv2D(256, 3x3, stride 2) -> GAP -> Dense(256)    (~1.8M)
+
+Backbones: "plain" is the builders' own four blocks of 3x3 Conv2D pairs, the
+first at full 224x224 resolution, ~5.2 GFLOPs per image. "mobile" is a
+MobileNetV2-style stack of inverted residual blocks (1x1 expand -> 3x3
+depthwise -> 1x1 linear projection, with a skip connection where the shape
+allows) ending in a 7x7x256 feature map for the same heads, ~0.6 GFLOPs. It
+is built here and trained from scratch; no pretrained weights are downloaded.
+
+Usage:
+    from cnn_blocks import classifier_head, mobile_cnn, print_model_report
+
+    model = keras.Sequential(conv_blocks + classifier_head("gap", num_classes=3))
+    model = mobile_cnn((224, 224, 3), num_classes=3, head="gap")
+    print_model_report(model)
+
+    python cnn_blocks.py            # size, FLOPs, latency and images/sec of each variant of the cow CNN
+    python cnn_blocks.py --backbones mobile --heads gap --classes 4
+"""
+
+import time
+import argparse
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+from tensorflow.keras import layers
+from tensorflow.keras.regularizers import l2
+
+HEADS = ("flatten", "gap", "conv-gap")
+BACKBONES = ("plain", "mobile")
+
+# Inverted residual stages of the mobile backbone (MobileNetV2's): expansion, output channels, blocks, first stride
+MOBILE_STAGES = (
+    (1, 16, 1, 1),     # 112x112
+    (6, 24, 2, 2),     # 56x56
+    (6, 32, 3, 2),     # 28x28
+    (6, 64, 4, 2),     # 14x14
+    (6, 96, 3, 1),
+    (6, 160, 3, 2),    # 7x7
+    (6, 320, 1, 1),
+)
+# Channels of the mobile backbone's last 1x1 conv, i.e. of the feature map the head sees
+MOBILE_FEATURES = 256
+
+
+def classifier_head(head, num_classes, l2_reg=None):
+    """
+    Layers turning the last conv block's feature map into class probabilities.
+
+    Args:
+        head: "flatten", "gap" or "conv-gap" (see the module docstring)
+        num_classes: Output classes
+        l2_reg: Optional L2 coefficient for the conv/dense kernels (train_poultry.py uses 0.001)
+
+    Returns:
+        List of Keras layers, to append to a Sequential model's layers
+    """
+    regularizer = l2(l2_reg) if l2_reg else None
+
+    def dense_block(units, dropout=0.5):
+        return [
+            layers.Dense(units, kernel_regularizer=regularizer),
+            layers.BatchNormalization(),
+            layers.Activation('relu'),
+            layers.Dropout(dropout),
+        ]
+
+    if head == "flatten":
+        pooling = [layers.Flatten()] + dense_block(512)
+    elif head == "gap":
+        pooling = [layers.GlobalAveragePooling2D()]
+    elif head == "conv-gap":
+        # One more strided conv (14x14 -> 7x7) to mix spatial context before averaging it away
+        pooling = [
+            layers.Conv2D(256, (3, 3), strides=2, padding='same', kernel_regularizer=regularizer),
+            layers.BatchNormalization(),
+            layers.Activation('relu'),
+            layers.GlobalAveragePooling2D(),
+        ]
+    else:
+        raise ValueError(f"Unknown head: {head} (use {', '.join(HEADS)})")
+
+    return pooling + dense_block(256) + [layers.Dense(num_classes, activation='softmax')]
+
+
+def inverted_residual(x, expansion, channels, stride, regularizer=None):
+    """
+    One MobileNetV2 block: 1x1 expand -> 3x3 depthwise (the only spatial filter) -> 1x1 linear projection.
+
+    The 3x3 filter runs on each channel separately, so its cost grows with the channel count
+    instead of with its square; the 1x1 convs do the channel mixing.
+    """
+    inputs = x
+    in_channels = x.shape[-1]
+    if expansion != 1:
+        x = layers.Conv2D(in_channels * expansion, 1, use_bias=False, kernel_regularizer=regularizer)(x)
+        x = layers.BatchNormalization()(x)
+        x = layers.ReLU(6.0)(x)
+    x = layers.DepthwiseConv2D(3, strides=stride, padding='same', use_bias=False,
+                               depthwise_regularizer=regularizer)(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.ReLU(6.0)(x)
+    # No activation after the projection: ReLU on the narrow output would discard information
+    x = layers.Conv2D(channels, 1, use_bias=False, kernel_regularizer=regularizer)(x)
+    x = layers.BatchNormalization()(x)
+    if stride == 1 and in_channels == channels:
+        x = layers.Add()([inputs, x])
+    return x
+
+
+def mobile_backbone(inputs, l2_reg=None):
+    """Feature map (7x7xMOBILE_FEATURES for a 224x224 input) of the depthwise-separable backbone."""
+    regularizer = l2(l2_reg) if l2_reg else None
+    x = layers.Conv2D(32, 3, strides=2, padding='same', use_bias=False, kernel_regularizer=regularizer)(inputs)
+    x = layers.BatchNormalization()(x)
+    x = layers.ReLU(6.0)(x)
+    for expansion, channels, blocks, stride in MOBILE_STAGES:
+        for block in range(blocks):
+            x = inverted_residual(x, expansion, channels, stride if block == 0 else 1, regularizer)
+    x = layers.Conv2D(MOBILE_FEATURES, 1, use_bias=False, kernel_regularizer=regularizer)(x)
+    x = layers.BatchNormalization()(x)
+    return layers.ReLU(6.0)(x)
+
+
+def mobile_cnn(input_shape, num_classes, head="gap", l2_reg=None):
+    """
+    Uncompiled model: the mobile backbone followed by classifier_head(head).
+
+    Randomly initialised and trained from scratch; no pretrained weights are downloaded.
+    """
+    inputs = keras.Input(shape=input_shape)
+    x = mobile_backbone(inputs, l2_reg=l2_reg)
+    for layer in classifier_head(head, num_classes, l2_reg=l2_reg):
+        x = layer(x)
+    return keras.Model(inputs, x, name=f"mobile_{head.replace('-', '_')}")
+
+
+def count_flops(model):
+    """
+    FLOPs of one forward pass on one image, counted as 2 per multiply-add of the conv and dense layers.
+
+    Batch norm, activations, pooling and adds are left out; they are a few percent of the total.
+    """
+    multiply_adds = 0
+    for layer in model.layers:
+        if not isinstance(layer, (layers.Conv2D, layers.DepthwiseConv2D, layers.Dense)):
+            continue
+        in_channels = layer.input.shape[-1]
+        out_shape = layer.output.shape
+        if isinstance(layer, layers.Dense):
+            multiply_adds += in_channels * layer.units
+            continue
+        positions = int(np.prod(out_shape[1:-1]))
+        kernel = int(np.prod(layer.kernel_size))
+        if isinstance(layer, layers.DepthwiseConv2D):
+            multiply_adds += positions * kernel * in_channels * layer.depth_multiplier
+        else:
+            multiply_adds += positions * kernel * in_channels * out_shape[-1] // layer.groups
+    return 2 * int(multiply_adds)
+
+
+def _median_seconds(model, batch_size, runs):
+    """Median CPU time of one forward pass at batch_size, through a traced inference function."""
+    images = np.random.default_rng(0).random((batch_size,) + tuple(model.input_shape[1:]), dtype=np.float32)
+    with tf.device('/CPU:0'):
+        serve = tf.function(lambda x: model(x, training=False))
+        serve(images)  # trace once
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            serve(images).numpy()
+            timings.append(time.perf_counter() - started)
+    return float(np.median(timings))
+
+
+def cpu_latency_ms(model, batch_size=1, runs=20):
+    """Median CPU time of one forward pass at batch_size, in milliseconds."""
+    return _median_seconds(model, batch_size, runs) * 1000
+
+
+def images_per_sec(model, batch_size=32, runs=5):
+    """CPU throughput when scoring batches of batch_size, as the micro-batched serving path does."""
+    return batch_size / _median_seconds(model, batch_size, runs)
+
+
+def model_report(model, runs=20):
+    """Parameter count, float32 weight size, FLOPs, single-image CPU latency and batched images/sec."""
+    params = model.count_params()
+    return {
+        "params": int(params),
+        "weights_mb": params * 4 / 2**20,
+        "gflops": count_flops(model) / 1e9,
+        "cpu_latency_ms": cpu_latency_ms(model, runs=runs),
+        "images_per_sec": images_per_sec(model, runs=max(1, runs // 4))
+    }
+
+
+def print_model_report(model, name=None, runs=20):
+    """Prints and returns model_report()."""
+    report = model_report(model, runs=runs)
+    label = f" ({name})" if name else ""
+    print(f"\nModel size and CPU speed{label}:")
+    print(f"   Parameters: {report['params']:,}")
+    print(f"   Weights (float32): {report['weights_mb']:.1f} MB")
+    print(f"   FLOPs (1 image): {report['gflops']:.2f} G")
+    print(f"   CPU latency (1 image): {report['cpu_latency_ms']:.1f} ms")
+    print(f"   CPU throughput (batches of 32): {report['images_per_sec']:.1f} images/sec")
+    return report
+
+
+def compare_models(build_model, variants, runs=20):
+    """
+    Builds one model per (backbone, head) with build_model(backbone, head) and prints their
+    sizes and speeds relative to the first.
+
+    Weights don't affect any of them, so untrained models give the same numbers as trained ones.
+    """
+    rows = []
+    for backbone, head in variants:
+        model = build_model(backbone, head)
+        rows.append((f"{backbone}/{head}", model_report(model, runs=runs)))
+        keras.backend.clear_session()
+
+    baseline = rows[0][1]
+    print(f"\n{'Model':<18}{'Parameters':>12}{'MB':>7}{'GFLOPs':>8}{'CPU ms':>8}{'img/s':>8}"
+          f"{'Smaller':>9}{'Fewer FLOPs':>13}{'Faster':>8}")
+    for name, report in rows:
+        print(f"{name:<18}{report['params']:>12,}{report['weights_mb']:>7.1f}{report['gflops']:>8.2f}"
+              f"{report['cpu_latency_ms']:>8.1f}{report['images_per_sec']:>8.1f}"
+              f"{baseline['params'] / report['params']:>8.1f}x{baseline['gflops'] / report['gflops']:>12.1f}x"
+              f"{report['images_per_sec'] / baseline['images_per_sec']:>7.1f}x")
+    return dict(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare the backbones and classifier heads of the image CNNs')
+    parser.add_argument('--classes', type=int, default=3, help='Output classes (3 cow, 4 poultry)')
+    parser.add_argument('--backbones', nargs='+', choices=BACKBONES, default=list(BACKBONES))
+    parser.add_argument('--heads', nargs='+', choices=HEADS, default=list(HEADS))
+    parser.add_argument('--runs', type=int, default=20, help='Timed single-image passes per model')
+    args = parser.parse_args()
+
+    # Importing train.py is cheap: it only defines the pipeline
+    from train import build_cnn_model
+    compare_models(lambda backbone, head: build_cnn_model(num_classes=args.classes, backbone=backbone, head=head),
+                   [(backbone, head) for backbone in args.backbones for head in args.heads], runs=args.runs)
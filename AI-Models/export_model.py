@@ -0,0 +1,214 @@
+"""
+Export Tool for the Image Classification Models
+
+Converts a trained Keras model (best_model.keras from train.py or
+train_poultry.py) into CPU-friendly serving formats, next to the original:
+
+    best_model_dynamic.tflite   dynamic-range quantization (int8 weights, float activations)
+    best_model_int8.tflite      full-integer int8, calibrated on training images
+    best_model.onnx             float32 ONNX (optional, needs tf2onnx)
+
+Each variant is then benchmarked against the Keras model on the test split:
+file size, single-image latency, accuracy and agreement with the original's
+predictions. The report is printed and saved as export_report.json.
+
+Usage:
+    python export_model.py
+    python export_model.py --model SkyAcre_cow_model/best_model.keras --onnx
+    python export_model.py --model Output/poultry/best_model.keras --data-dir Data/preprocessed_poultry
+
+Serve a variant with SKYACRE_COW_BACKEND=tflite-dynamic|tflite-int8|onnx (see app.py).
+"""
+
+import os
+import json
+import time
+import tempfile
+import argparse
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL_PATH = os.path.join(BASE_DIR, "SkyAcre_cow_model", "best_model.keras")
+DEFAULT_DATA_DIR = os.path.join(BASE_DIR, "Data", "preprocessed")
+
+TFLITE_VARIANTS = ["dynamic", "int8"]
+
+
+def load_split(data_dir, split, samples=None, seed=0):
+    """
+    Loads X_<split>.npy / y_<split>.npy written by preprocess.py (images as float32 in [0, 1]).
+
+    Args:
+        samples: Number of random images to load; the file is memory-mapped, so only
+            those rows are read into memory (None loads them all)
+    """
+    x_path = os.path.join(data_dir, f"X_{split}.npy")
+    if not os.path.exists(x_path):
+        raise FileNotFoundError(f"{x_path} not found; run preprocess.py first")
+    X = np.load(x_path, mmap_mode="r")
+    y = np.load(os.path.join(data_dir, f"y_{split}.npy"), mmap_mode="r")
+    if samples is not None and samples < len(X):
+        # Sorted, so the selected rows are read front to back
+        rows = np.sort(np.random.default_rng(seed).permutation(len(X))[:samples])
+        X, y = X[rows], y[rows]
+    X = np.asarray(X, dtype=np.float32)
+    if X.max() > 1.0:
+        X /= 255.0
+    y = np.asarray(y)
+    if y.ndim > 1:
+        y = np.argmax(y, axis=1)
+    return X, y
+
+
+def convert_tflite(model, variant, calibration_images=None):
+    """
+    Converts a Keras model to TFLite bytes.
+
+    Args:
+        variant: "dynamic" (int8 weights) or "int8" (int8 weights, activations and I/O)
+        calibration_images: Float images used to calibrate activation ranges ("int8" only)
+    """
+    import tensorflow as tf
+
+    with tempfile.TemporaryDirectory() as saved_model_dir:
+        # A SavedModel export freezes the Keras 3 variables into constants the converter can quantize
+        model.export(saved_model_dir, format="tf_saved_model", verbose=False)
+        converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+        if variant == "int8":
+            def representative_dataset():
+                for image in calibration_images:
+                    yield [image[np.newaxis].astype(np.float32)]
+
+            converter.representative_dataset = representative_dataset
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+            converter.inference_input_type = tf.int8
+            converter.inference_output_type = tf.int8
+        elif variant != "dynamic":
+            raise ValueError(f"Unknown TFLite variant: {variant}")
+
+        return converter.convert()
+
+
+def export_onnx(model, output_path):
+    """Writes the model as ONNX with a dynamic batch dimension; needs the optional tf2onnx package."""
+    import tensorflow as tf
+    import tf2onnx
+
+    signature = [tf.TensorSpec(shape=(None,) + tuple(model.input_shape[1:]), dtype=tf.float32, name="images")]
+    function = tf.function(lambda images: model(images, training=False), input_signature=signature)
+    tf2onnx.convert.from_function(function, input_signature=signature, output_path=output_path)
+
+
+def benchmark(model, X_test, y_test, latency_runs=50, batch_size=32):
+    """Accuracy and predictions over the test split, plus median single-image latency in ms."""
+    probabilities = np.concatenate([
+        model.predict(X_test[start:start + batch_size], verbose=0)
+        for start in range(0, len(X_test), batch_size)
+    ])
+    predictions = np.argmax(probabilities, axis=1)
+
+    image = X_test[:1]
+    model.predict(image, verbose=0)
+    timings = []
+    for _ in range(latency_runs):
+        started = time.perf_counter()
+        model.predict(image, verbose=0)
+        timings.append(time.perf_counter() - started)
+
+    return {
+        "accuracy": float(np.mean(predictions == y_test)),
+        "latency_ms": float(np.median(timings) * 1000),
+        "predictions": predictions
+    }
+
+
+def export_model(model_path=DEFAULT_MODEL_PATH, data_dir=DEFAULT_DATA_DIR, output_dir=None,
+                 variants=TFLITE_VARIANTS, onnx=False, calibration_samples=200, latency_runs=50):
+    """Exports the requested variants and returns the comparison report."""
+    import keras
+    from image_inference import TFLiteModel, ONNXModel, serving_model
+
+    output_dir = output_dir or os.path.dirname(os.path.abspath(model_path))
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"Loading {model_path}...")
+    model = keras.saving.load_model(model_path)
+    X_test, y_test = load_split(data_dir, "test")
+
+    reference = benchmark(serving_model(model), X_test, y_test, latency_runs)
+    report = [{
+        "variant": "keras",
+        "path": model_path,
+        "size_bytes": os.path.getsize(model_path),
+        "accuracy": reference["accuracy"],
+        "agreement": 1.0,
+        "latency_ms": reference["latency_ms"]
+    }]
+
+    outputs = {}
+    for variant in variants:
+        print(f"Converting to TFLite ({variant})...")
+        calibration = None
+        if variant == "int8":
+            calibration, _ = load_split(data_dir, "train", samples=calibration_samples)
+        converted = convert_tflite(model, variant, calibration)
+        path = os.path.join(output_dir, f"{stem}_{variant}.tflite")
+        with open(path, "wb") as f:
+            f.write(converted)
+        outputs[f"tflite-{variant}"] = (path, TFLiteModel)
+
+    if onnx:
+        path = os.path.join(output_dir, f"{stem}.onnx")
+        try:
+            print("Converting to ONNX...")
+            export_onnx(model, path)
+            outputs["onnx"] = (path, ONNXModel)
+        except ImportError as e:
+            print(f"Skipping ONNX export ({e}); pip install tf2onnx onnxruntime")
+
+    for variant, (path, model_class) in outputs.items():
+        try:
+            results = benchmark(model_class(path), X_test, y_test, latency_runs)
+        except ImportError as e:
+            print(f"Skipping {variant} benchmark ({e})")
+            continue
+        report.append({
+            "variant": variant,
+            "path": path,
+            "size_bytes": os.path.getsize(path),
+            "accuracy": results["accuracy"],
+            "agreement": float(np.mean(results["predictions"] == reference["predictions"])),
+            "latency_ms": results["latency_ms"]
+        })
+
+    print(f"\n{'Variant':<16}{'Size (MB)':>11}{'Latency (ms)':>14}{'Speedup':>9}{'Accuracy':>10}{'Agreement':>11}")
+    for row in report:
+        print(f"{row['variant']:<16}{row['size_bytes'] / 2**20:>11.2f}{row['latency_ms']:>14.2f}"
+              f"{reference['latency_ms'] / row['latency_ms']:>8.1f}x{row['accuracy']:>10.4f}{row['agreement']:>11.4f}")
+
+    report_path = os.path.join(output_dir, "export_report.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {report_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Export a Keras image model to TFLite/ONNX and compare the variants')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help='Trained .keras model')
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help='preprocess.py output (X_/y_ train and test .npy)')
+    parser.add_argument('--output-dir', default=None, help='Where to write the exports (default: next to the model)')
+    parser.add_argument('--variants', default=",".join(TFLITE_VARIANTS),
+                        help='Comma-separated TFLite variants: dynamic, int8')
+    parser.add_argument('--onnx', action='store_true', help='Also export ONNX (needs tf2onnx and onnxruntime)')
+    parser.add_argument('--calibration-samples', type=int, default=200, help='Training images used to calibrate int8')
+    parser.add_argument('--latency-runs', type=int, default=50, help='Single-image predictions timed per variant')
+    args = parser.parse_args()
+
+    export_model(args.model, args.data_dir, args.output_dir,
+                 variants=[v.strip() for v in args.variants.split(",") if v.strip()],
+                 onnx=args.onnx, calibration_samples=args.calibration_samples, latency_runs=args.latency_runs)
@@ -0,0 +1,224 @@
+"""
+Compiled Fertilizer & Crop Decision Tree
+
+Flattens the fitted DecisionTreeClassifier in Models/skyacre_fertilizer_model.pkl
+into plain NumPy node arrays, and provides a predictor that traverses those
+arrays for many rows at once. The district/soil encoder classes and the
+crop/fertilizer label maps are exported into the same .npz, so with the
+compiled backend a fertilizer-only worker starts without importing or
+unpickling scikit-learn.
+
+Usage:
+    python fertilizer_tree.py
+    python fertilizer_tree.py --model Models/skyacre_fertilizer_model.pkl --output Models/skyacre_fertilizer_tree.npz
+"""
+
+import os
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, "Models")
+MODEL_PATH = os.path.join(MODEL_DIR, "skyacre_fertilizer_model.pkl")
+COMPILED_TREE_PATH = os.path.join(MODEL_DIR, "skyacre_fertilizer_tree.npz")
+
+# sklearn marks leaves with children_left == -1 (TREE_LEAF)
+TREE_LEAF = -1
+# Lookup arrays written by export_tree() when given the encoders and label maps
+LOOKUP_ARRAYS = {"district_classes", "soil_classes", "crop_names", "crop_codes", "fertilizer_names", "fertilizer_codes"}
+TREE_ARRAYS = ("feature", "threshold", "children_left", "children_right", "leaf_values", "max_depth", "n_features")
+# Below this many rows a plain Python walk beats the per-level NumPy passes
+SMALL_BATCH_ROWS = 16
+
+
+def export_tree(model, output_path=COMPILED_TREE_PATH, encoder_district=None, encoder_soil=None,
+                map_crops=None, map_fertilizers=None):
+    """
+    Flattens a fitted two-output DecisionTreeClassifier into an .npz file.
+
+    Args:
+        model: Fitted DecisionTreeClassifier predicting (crop, fertilizer) codes
+        output_path: Where to write the node arrays
+        encoder_district, encoder_soil: Fitted LabelEncoders; their classes_ are stored as strings
+        map_crops, map_fertilizers: [[name, code], ...] label maps, stored as name and code arrays
+
+    Returns:
+        Path of the written file
+    """
+    tree = model.tree_
+    if model.n_outputs_ != 2:
+        raise ValueError(f"Expected a tree with 2 outputs (crop, fertilizer), got {model.n_outputs_}")
+
+    # Class code predicted at each node, per output (only leaf entries are used)
+    leaf_values = np.column_stack([
+        np.asarray(model.classes_[k]).take(np.argmax(tree.value[:, k, :len(model.classes_[k])], axis=1))
+        for k in range(model.n_outputs_)
+    ]).astype(np.int64)
+
+    lookups = {}
+    if encoder_district is not None and encoder_soil is not None:
+        lookups["district_classes"] = np.asarray(encoder_district.classes_).astype(str)
+        lookups["soil_classes"] = np.asarray(encoder_soil.classes_).astype(str)
+    for name, mapping in (("crop", map_crops), ("fertilizer", map_fertilizers)):
+        if mapping is not None:
+            lookups[f"{name}_names"] = np.asarray(mapping)[:, 0].astype(str)
+            lookups[f"{name}_codes"] = np.asarray(mapping)[:, 1].astype(np.int64)
+
+    np.savez(
+        output_path,
+        feature=tree.feature.astype(np.int32),
+        threshold=tree.threshold.astype(np.float64),
+        children_left=tree.children_left.astype(np.int32),
+        children_right=tree.children_right.astype(np.int32),
+        leaf_values=leaf_values,
+        max_depth=np.int32(tree.max_depth),
+        n_features=np.int32(model.n_features_in_),
+        **lookups
+    )
+    print(f"Exported {tree.node_count} nodes (depth {tree.max_depth}) to {output_path}"
+          + (f" with {', '.join(sorted(lookups))}" if lookups else ""))
+    return output_path
+
+
+class ClassLookup:
+    """NumPy stand-in for a fitted LabelEncoder: classes_ and transform()."""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes, dtype=object)
+        self._codes = {label: code for code, label in enumerate(self.classes_)}
+
+    def transform(self, values):
+        """Codes of the given labels; raises ValueError for labels not seen in training, like LabelEncoder."""
+        try:
+            return np.array([self._codes[value] for value in values], dtype=np.int64)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"y contains previously unseen labels: {e}")
+
+
+def load_lookups(path=COMPILED_TREE_PATH):
+    """
+    Encoders and label maps exported next to the tree, as
+    {"encoder_district", "encoder_soil", "map_crops", "map_fertilizers"}
+    (ClassLookups and [[name, code], ...] object arrays, as the pickles hold);
+    None if the file was exported without them.
+    """
+    with np.load(path) as arrays:
+        if not LOOKUP_ARRAYS.issubset(arrays.files):
+            return None
+        return {
+            "encoder_district": ClassLookup(arrays["district_classes"].tolist()),
+            "encoder_soil": ClassLookup(arrays["soil_classes"].tolist()),
+            "map_crops": label_map(arrays["crop_names"], arrays["crop_codes"]),
+            "map_fertilizers": label_map(arrays["fertilizer_names"], arrays["fertilizer_codes"]),
+        }
+
+
+def label_map(names, codes):
+    """[[name, code], ...] object array, the layout of map_crops.pkl/map_fertilizers.pkl."""
+    mapping = np.empty((len(names), 2), dtype=object)
+    mapping[:, 0] = names.tolist()
+    mapping[:, 1] = codes.tolist()
+    return mapping
+
+
+# Label helpers shared by app.py and bulk_score.py, so the HTTP and offline paths decode alike
+
+def build_code_lookup(encoder):
+    """Builds a {label: code} dict equivalent to encoder.transform for single values."""
+    return {label: code for code, label in enumerate(encoder.classes_)}
+
+
+def build_label_index(mapping):
+    """Turns a [[name, code], ...] mapping into an array indexed by code."""
+    codes = mapping[:, 1].astype(int)
+    labels = np.empty(codes.max() + 1, dtype=object)
+    labels[codes] = mapping[:, 0]
+    return labels
+
+
+def decode_labels(label_index, codes):
+    """Maps an array of predicted codes to names, with the same fallback as the single endpoint."""
+    codes = np.asarray(codes).astype(int)
+    in_range = (codes >= 0) & (codes < len(label_index))
+    names = np.full(len(codes), None, dtype=object)
+    names[in_range] = label_index[codes[in_range]]
+    for i in np.flatnonzero(np.equal(names, None)):
+        names[i] = f"Unknown (code: {codes[i]})"
+    return names
+
+
+class CompiledFertilizerTree:
+    """NumPy-only drop-in for the fertilizer DecisionTreeClassifier's predict()."""
+
+    def __init__(self, feature, threshold, children_left, children_right, leaf_values, max_depth, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.leaf_values = leaf_values
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = int(n_features)
+        self.is_leaf = children_left == TREE_LEAF
+        # List copies for the small-batch path, where NumPy call overhead dominates
+        self._nodes = list(zip(
+            feature.tolist(), threshold.tolist(), children_left.tolist(), children_right.tolist()
+        ))
+
+    @classmethod
+    def load(cls, path=COMPILED_TREE_PATH):
+        """Loads node arrays written by export_tree()."""
+        with np.load(path) as arrays:
+            return cls(**{name: arrays[name] for name in TREE_ARRAYS})
+
+    def apply(self, X):
+        """Returns the leaf index reached by each row of X."""
+        # sklearn compares float32 inputs against float64 thresholds; do the same for parity
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected input of shape (n, {self.n_features_in_}), got {X.shape}")
+
+        if len(X) <= SMALL_BATCH_ROWS:
+            return np.array([self._walk(row) for row in X.tolist()], dtype=np.int32)
+
+        node = np.zeros(len(X), dtype=np.int32)
+        # Advance all unfinished rows one level per step, dropping rows that reach a leaf
+        active = np.arange(len(X)) if not self.is_leaf[0] else np.empty(0, dtype=np.intp)
+        while active.size:
+            current = node[active]
+            go_left = X[active, self.feature[current]] <= self.threshold[current]
+            current = np.where(go_left, self.children_left[current], self.children_right[current])
+            node[active] = current
+            active = active[~self.is_leaf[current]]
+        return node
+
+    def _walk(self, row):
+        """Follows one row (a list of floats) from the root to its leaf."""
+        node = 0
+        feature, threshold, left, right = self._nodes[node]
+        while left != TREE_LEAF:
+            node = left if row[feature] <= threshold else right
+            feature, threshold, left, right = self._nodes[node]
+        return node
+
+    def predict(self, X):
+        """Returns an (n, 2) array of (crop code, fertilizer code), like DecisionTreeClassifier.predict."""
+        return self.leaf_values[self.apply(X)]
+
+
+if __name__ == "__main__":
+    import argparse
+    import joblib
+
+    parser = argparse.ArgumentParser(description='Export the fertilizer decision tree to NumPy node arrays')
+    parser.add_argument('--model', default=MODEL_PATH, help='Path to the pickled DecisionTreeClassifier')
+    parser.add_argument('--output', default=COMPILED_TREE_PATH, help='Path of the .npz file to write')
+    args = parser.parse_args()
+
+    # Encoders and label maps are read from the model's directory
+    model_dir = os.path.dirname(os.path.abspath(args.model))
+    export_tree(
+        joblib.load(args.model), args.output,
+        encoder_district=joblib.load(os.path.join(model_dir, "encoder_district.pkl")),
+        encoder_soil=joblib.load(os.path.join(model_dir, "encoder_soil.pkl")),
+        map_crops=joblib.load(os.path.join(model_dir, "map_crops.pkl")),
+        map_fertilizers=joblib.load(os.path.join(model_dir, "map_fertilizers.pkl"))
+    )
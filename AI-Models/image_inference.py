@@ -0,0 +1,324 @@
+"""
+Low-overhead Inference for Keras Image Models
+
+model.predict() sets up a data adapter, a callback list and a batching loop on
+every call, so for the one-image requests the API mostly serves, that setup
+costs more than the forward pass itself. ServingModel traces the forward pass,
+model(x, training=False), once as a tf.function with a fixed float32
+(None, H, W, C) input signature and calls it directly. Any batch size reuses
+the same graph, and a single image costs only the forward pass.
+
+Models exported by export_model.py are served the same way: TFLiteModel
+(float, dynamic-range or full-integer .tflite) and ONNXModel (.onnx through
+onnxruntime) have the same predict() interface, and load_image_model() picks
+the right one from the file extension.
+
+MicroBatcher sits in front of the model for concurrent requests: images
+queued by different request threads within a few milliseconds of each other
+run through one batched forward pass, which costs little more than a batch
+of one.
+
+Usage:
+    from image_inference import MicroBatcher, serving_model
+
+    model = serving_model(keras.saving.load_model("SkyAcre_cow_model/best_model.keras"))
+    probabilities = model.predict(images)   # float32 (N, 224, 224, 3) scaled to [0, 1]
+
+    model = load_image_model("SkyAcre_cow_model/best_model_int8.tflite")
+
+    batcher = MicroBatcher(max_batch_size=32, max_wait_seconds=0.005)
+    probabilities = batcher.predict(model, images)   # same result, batched with other callers
+"""
+
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+# Larger inputs are split into chunks of this many images to bound activation memory
+# (the same batch size model.predict uses by default)
+DEFAULT_MAX_BATCH_SIZE = 32
+
+
+class ServingModel:
+    """Wraps a Keras image model with a traced, fixed-signature serving function.
+
+    predict() is a drop-in replacement for model.predict(); other attributes
+    (count_params, weights, ...) are forwarded to the wrapped model.
+    """
+
+    def __init__(self, model, max_batch_size=DEFAULT_MAX_BATCH_SIZE):
+        """
+        Args:
+            model: Keras model taking a single (None, H, W, C) image batch
+            max_batch_size: Largest batch passed to the model in one call
+        """
+        import tensorflow as tf
+
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.input_shape = tuple(model.input_shape)
+        self._serve = tf.function(
+            lambda images: model(images, training=False),
+            input_signature=[tf.TensorSpec(shape=(None,) + self.input_shape[1:], dtype=tf.float32)]
+        )
+
+    def predict(self, images, verbose=0):
+        """Class probabilities for a (N, H, W, C) batch, as a NumPy array (verbose is ignored)."""
+        images = np.asarray(images, dtype=np.float32)
+        if len(images) <= self.max_batch_size:
+            return np.asarray(self._serve(images))
+        return np.concatenate([
+            np.asarray(self._serve(images[start:start + self.max_batch_size]))
+            for start in range(0, len(images), self.max_batch_size)
+        ])
+
+    def __getattr__(self, name):
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+
+def serving_model(model, max_batch_size=DEFAULT_MAX_BATCH_SIZE):
+    """Wraps a Keras model with a single 4-D image input in ServingModel; returns anything else unchanged."""
+    input_shape = getattr(model, "input_shape", None)
+    if isinstance(input_shape, tuple) and len(input_shape) == 4 and callable(model):
+        return ServingModel(model, max_batch_size)
+    return model
+
+
+def default_num_threads():
+    """Per-worker thread count set by serve.py (TF_NUM_INTRAOP_THREADS), else None for the runtime default."""
+    threads = os.environ.get("TF_NUM_INTRAOP_THREADS")
+    return int(threads) if threads else None
+
+
+class TFLiteModel:
+    """
+    Serves an exported .tflite image model with the ServingModel predict() interface.
+
+    Quantized (int8/uint8) inputs and outputs are converted with the scale and
+    zero point stored in the model, so callers always pass and get float32.
+    A batch runs as one invoke(): the interpreter's input is resized to the
+    batch size (re-allocating its tensors only when that size changes). Models
+    whose graph can't be resized run one image at a time instead.
+    """
+
+    def __init__(self, path, num_threads=None):
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.path = path
+        self._interpreter = Interpreter(model_path=path, num_threads=num_threads or default_num_threads())
+        self._interpreter.allocate_tensors()
+        input_details = self._interpreter.get_input_details()[0]
+        output_details = self._interpreter.get_output_details()[0]
+        self._input_index = input_details["index"]
+        self._output_index = output_details["index"]
+        self._input_dtype = input_details["dtype"]
+        self._output_dtype = output_details["dtype"]
+        self._input_quantization = input_details["quantization"]
+        self._output_quantization = output_details["quantization"]
+        self.input_shape = (None,) + tuple(int(d) for d in input_details["shape"][1:])
+        self._batch_size = int(input_details["shape"][0])
+        self._batchable = True
+        # The interpreter is not thread-safe; request threads and the micro-batcher share it
+        self._lock = threading.Lock()
+
+    def _resize(self, batch_size):
+        """Sizes the interpreter's input for batch_size images; False if the model can't batch."""
+        if batch_size == self._batch_size:
+            return True
+        try:
+            self._interpreter.resize_tensor_input(self._input_index, (batch_size,) + self.input_shape[1:])
+            self._interpreter.allocate_tensors()
+        except (RuntimeError, ValueError) as e:
+            print(f"WARNING: {self.path} can't run batches ({e}); running images one at a time")
+            self._batchable = False
+            self._interpreter.resize_tensor_input(self._input_index, (1,) + self.input_shape[1:])
+            self._interpreter.allocate_tensors()
+            self._batch_size = 1
+            return False
+        self._batch_size = batch_size
+        return True
+
+    def _quantize(self, images):
+        if not np.issubdtype(self._input_dtype, np.integer):
+            return images
+        scale, zero_point = self._input_quantization
+        limits = np.iinfo(self._input_dtype)
+        return np.clip(np.round(images / scale + zero_point), limits.min, limits.max).astype(self._input_dtype)
+
+    def _dequantize(self, outputs):
+        if not np.issubdtype(self._output_dtype, np.integer):
+            return outputs
+        scale, zero_point = self._output_quantization
+        return (outputs.astype(np.float32) - zero_point) * scale
+
+    def predict(self, images, verbose=0):
+        """Class probabilities for a (N, H, W, C) float batch (verbose is ignored)."""
+        images = self._quantize(np.asarray(images, dtype=np.float32))
+        with self._lock:
+            if self._batchable and self._resize(len(images)):
+                self._interpreter.set_tensor(self._input_index, images)
+                self._interpreter.invoke()
+                return self._dequantize(self._interpreter.get_tensor(self._output_index))
+            outputs = []
+            for image in images:
+                self._interpreter.set_tensor(self._input_index, image[np.newaxis])
+                self._interpreter.invoke()
+                outputs.append(self._interpreter.get_tensor(self._output_index)[0])
+        return self._dequantize(np.stack(outputs))
+
+
+class ONNXModel:
+    """Serves an exported .onnx image model through onnxruntime with the ServingModel predict() interface."""
+
+    def __init__(self, path, num_threads=None):
+        import onnxruntime as ort
+
+        self.path = path
+        options = ort.SessionOptions()
+        num_threads = num_threads or default_num_threads()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self._session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        self.input_shape = (None,) + tuple(model_input.shape[1:])
+
+    def predict(self, images, verbose=0):
+        """Class probabilities for a (N, H, W, C) float batch (verbose is ignored)."""
+        return self._session.run(None, {self._input_name: np.asarray(images, dtype=np.float32)})[0]
+
+
+def load_image_model(path):
+    """Loads a .keras/.h5 (wrapped in ServingModel), .tflite or .onnx image model."""
+    if path.endswith(".tflite"):
+        return TFLiteModel(path)
+    if path.endswith(".onnx"):
+        return ONNXModel(path)
+    import keras
+    return serving_model(keras.saving.load_model(path))
+
+
+class MicroBatcher:
+    """
+    Dynamic batching across concurrent callers.
+
+    predict() queues each image and blocks until its result is ready. A
+    background thread takes the first queued image, keeps collecting until
+    max_batch_size images are queued or max_wait_seconds have passed, and runs
+    them through the model in one call. Images queued for different model
+    objects (different models, two versions, or before and after a hot reload)
+    are batched separately, each on the model its request picked.
+    """
+
+    def __init__(self, max_batch_size=32, max_wait_seconds=0.005, on_batch=None):
+        """
+        Args:
+            max_batch_size: Most images run through the model in one call
+            max_wait_seconds: Longest the first image of a batch waits for others
+            on_batch: Optional callable(batch_size, seconds, name) run after every forward pass (for metrics)
+        """
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.on_batch = on_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._buffer = None  # reusable batch input buffer, only touched by the batching thread
+
+    def _running(self):
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def _ensure_running(self):
+        """
+        Starts the batching thread on first use, again in a forked worker
+        (threads don't survive fork), and again if it has died.
+        """
+        if self._running():
+            return
+        with self._lock:
+            if self._running():
+                return
+            if self._pid != os.getpid():
+                # A forked copy of the queue may hold the parent's lock state; a restart in
+                # this process keeps the queue so images already waiting still get run
+                self._queue = queue.Queue()
+            elif self._thread is not None:
+                print("WARNING: micro-batcher thread died; restarting it")
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, args=(self._queue,), name="micro-batcher", daemon=True)
+            self._thread.start()
+
+    @property
+    def queue_depth(self):
+        """Images waiting for a forward pass."""
+        return self._queue.qsize()
+
+    def predict(self, model, images, name=None):
+        """
+        Model outputs for a (N, H, W, C) batch, computed together with other callers' images.
+
+        name labels the model in on_batch calls (one batcher can serve several models).
+        """
+        self._ensure_running()
+        futures = []
+        for image in images:
+            future = Future()
+            self._queue.put((model, name, image, future))
+            futures.append(future)
+        return np.stack([future.result() for future in futures])
+
+    def _collect(self, pending):
+        """Blocks for the first queued image, then gathers more until the batch is full or the wait is over."""
+        items = [pending.get()]
+        deadline = time.perf_counter() + self.max_wait_seconds
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                items.append(pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _stack(self, images):
+        """The group's images as one batch: a view for a single image, else copied into the reusable buffer."""
+        if len(images) == 1:
+            return images[0][np.newaxis]
+        first = images[0]
+        if self._buffer is None or self._buffer.shape[1:] != first.shape or self._buffer.dtype != first.dtype:
+            self._buffer = np.empty((self.max_batch_size,) + first.shape, dtype=first.dtype)
+        return np.stack(images, out=self._buffer[:len(images)])
+
+    def _run(self, pending):
+        while True:
+            items = self._collect(pending)
+            groups = {}
+            for model, name, image, future in items:
+                groups.setdefault(id(model), (model, name, []))[2].append((image, future))
+
+            for model, name, entries in groups.values():
+                started = time.perf_counter()
+                try:
+                    outputs = model.predict(self._stack([image for image, _ in entries]), verbose=0)
+                except Exception as e:
+                    for _, future in entries:
+                        future.set_exception(e)
+                    continue
+                for (_, future), output in zip(entries, outputs):
+                    future.set_result(output)
+                if self.on_batch is not None:
+                    # A failing metrics callback must not take the batching thread down with it
+                    try:
+                        self.on_batch(len(entries), time.perf_counter() - started, name)
+                    except Exception as e:
+                        print(f"ERROR in micro-batcher on_batch callback: {e}")
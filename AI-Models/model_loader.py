@@ -0,0 +1,164 @@
+"""
+Lazy Model Loading
+
+Wraps a model loader so the model (and whatever heavy library it imports,
+e.g. TensorFlow) is only loaded when it is first needed, or ahead of time in
+a background thread when it is preloaded. Concurrent callers share a single
+load, and the load status feeds the service's readiness endpoint.
+
+A failed load is retried by a later get(), after a backoff that doubles with
+each consecutive failure (1s, 2s, 4s ... capped at a minute), so a model whose
+artifact appears after startup is picked up without a restart while a missing
+one doesn't cost every request a load attempt.
+
+A loaded model can be reloaded in place: the new copy is loaded and warmed
+while get() keeps returning the current one, then swapped in with a single
+reference assignment, so requests already holding the old model finish on it.
+"""
+
+import time
+import threading
+
+# Backoff before a failed load is retried: doubles per consecutive failure, up to the maximum
+RETRY_INITIAL_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+
+
+class LazyModel:
+    """Loads a model once, on first use or when preloaded; a failed load is retried after a backoff."""
+
+    def __init__(self, name, loader, retry_seconds=RETRY_INITIAL_SECONDS, max_retry_seconds=RETRY_MAX_SECONDS):
+        """
+        Args:
+            name: Name reported by the readiness endpoint
+            loader: Zero-argument callable returning the loaded model (raises on failure)
+            retry_seconds: Backoff after the first failed load
+            max_retry_seconds: Longest backoff between two load attempts
+        """
+        self.name = name
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._thread = None
+        # (model, error) once a load attempt finished, swapped as one reference
+        self._result = None
+        self.load_seconds = None
+        self.reloads = 0
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self._failures = 0        # consecutive failed loads
+        self._retry_at = 0.0      # time.monotonic() after which a failed load is retried
+
+    def _needs_load(self, result):
+        return result is None or (result[0] is None and time.monotonic() >= self._retry_at)
+
+    def get(self):
+        """Returns the model, loading it first if needed; None if loading failed (retried after a backoff)."""
+        result = self._result
+        if self._needs_load(result):
+            with self._lock:
+                result = self._result
+                if self._needs_load(result):
+                    started = time.perf_counter()
+                    try:
+                        result = (self._loader(), None)
+                        self._failures = 0
+                    except Exception as e:
+                        self._failures += 1
+                        backoff = min(self.retry_seconds * 2 ** (self._failures - 1), self.max_retry_seconds)
+                        self._retry_at = time.monotonic() + backoff
+                        print(f"ERROR loading {self.name} model (retrying after {backoff:g}s): {e}")
+                        result = (None, str(e))
+                    self.load_seconds = time.perf_counter() - started
+                    self._result = result
+        return result[0]
+
+    def preload(self):
+        """Starts loading in a background thread (no-op if already started)."""
+        with self._lock:
+            if self._result is not None or self._thread is not None:
+                return self._thread
+            self._thread = threading.Thread(target=self.get, name=f"load-{self.name}", daemon=True)
+            self._thread.start()
+            return self._thread
+
+    def reload(self, warmup=None):
+        """Loads a fresh copy in the calling thread, warms it, then swaps it in.
+
+        get() keeps serving the current model until the swap. If loading or
+        warming fails, the current model stays in place and False is returned.
+
+        Args:
+            warmup: Optional callable run on the new model before it is swapped in
+        """
+        with self._reload_lock:
+            started = time.perf_counter()
+            try:
+                model = self._loader()
+                if warmup is not None:
+                    warmup(model)
+            except Exception as e:
+                print(f"ERROR reloading {self.name} model, keeping the current one: {e}")
+                return False
+            with self._lock:
+                self._result = (model, None)
+                self._failures = 0
+                self.load_seconds = time.perf_counter() - started
+                self.reloads += 1
+            print(f"Reloaded {self.name} model in {self.load_seconds:.2f}s")
+            return True
+
+    def unload(self):
+        """Forgets the loaded model so the next get() loads it again.
+
+        Callers still holding the model keep a working reference; it is freed
+        once the last of them lets go.
+        """
+        with self._lock:
+            self._result = None
+            self._thread = None
+            self.load_seconds = None
+            self._failures = 0
+            self._retry_at = 0.0
+
+    @property
+    def loaded(self):
+        """True once a load attempt finished (successfully or not)."""
+        return self._result is not None
+
+    @property
+    def failed(self):
+        """True if the last load attempt failed (a later get() retries it)."""
+        result = self._result
+        return result is not None and result[0] is None
+
+    @property
+    def ready(self):
+        """True once the model loaded successfully."""
+        result = self._result
+        return result is not None and result[0] is not None
+
+    @property
+    def error(self):
+        """Error message of the last failed load, if any."""
+        result = self._result
+        return result[1] if result is not None else None
+
+    def status(self):
+        """Load state for the readiness endpoint."""
+        result = self._result
+        if result is not None:
+            state = "ready" if result[0] is not None else "failed"
+        elif self._thread is not None or self._lock.locked():
+            state = "loading"
+        else:
+            state = "not_loaded"
+        failed = result is not None and result[0] is None
+        return {
+            "state": state,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "error": result[1] if result is not None else None,
+            "retry_in_seconds": round(max(self._retry_at - time.monotonic(), 0), 1) if failed else None,
+            "reloading": self._reload_lock.locked(),
+            "reloads": self.reloads
+        }
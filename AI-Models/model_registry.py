@@ -0,0 +1,419 @@
+"""
+Model Registry with a Memory Budget
+
+Keeps every servable model registered by name and version, loads each one on
+demand (through model_loader.LazyModel) and records how much memory it holds.
+When the loaded models exceed the configured budget, the least recently used
+ones are unloaded, so many models can be served from one small worker without
+all of them being resident at once.
+
+Extra models can be registered from a JSON manifest:
+
+    [
+        {"name": "poultry-disease", "version": "2", "path": "Output/poultry/poultry_disease_model.keras"},
+        {"name": "dairy-health", "version": "1", "path": "Models/dairy_health_model.pkl"}
+    ]
+
+Paths are relative to the manifest's directory; .keras/.h5/.tflite/.onnx image
+models load through image_inference.load_image_model, .pkl/.joblib files with
+joblib. Like the built-in models, each one is warmed before it is served, with
+zero inputs shaped like the model's own input (or the entry's "input_shape",
+e.g. [224, 224, 3]); "warmup": false skips that.
+
+Models registered with the files they are loaded from can be hot-reloaded:
+watch() polls those files and, once a changed file has stopped changing,
+reloads the model in the background (see LazyModel.reload), so a new artifact
+is picked up without restarting the service.
+"""
+
+import os
+import gc
+import time
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from model_loader import LazyModel
+
+
+def current_rss_bytes():
+    """Resident set size of this process (psutil if installed, else /proc, else peak RSS)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is in kilobytes on Linux (peak, not current, but better than nothing)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _array_bytes(obj, seen, depth=0):
+    """
+    Sums the nbytes of the NumPy arrays reachable from obj: containers, object
+    attributes and __getstate__ (which is how sklearn's Cython trees expose
+    their node and value arrays, as views, without copying them).
+
+    seen maps id() to every object visited and holds on to them: the state
+    dicts are temporaries, and a freed one's id could be reused by the next.
+    """
+    if id(obj) in seen or depth > 8:
+        return 0
+    seen[id(obj)] = obj
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (bytes, bytearray, str, int, float, bool, type(None))):
+        return 0
+    if isinstance(obj, dict):
+        return sum(_array_bytes(value, seen, depth + 1) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_array_bytes(item, seen, depth + 1) for item in obj)
+    try:
+        state = obj.__getstate__()
+    except Exception:
+        state = getattr(obj, "__dict__", None)
+    if not isinstance(state, (dict, list, tuple)):
+        return 0
+    return _array_bytes(state, seen, depth + 1)
+
+
+def estimate_model_bytes(model):
+    """
+    Memory held by a loaded model: the size of its weights for Keras models,
+    the arrays it holds for anything else (sklearn estimators, NumPy bundles).
+    Returns None if neither finds any (e.g. TFLite/ONNX runtimes), so the
+    caller falls back to the RSS growth seen while loading.
+    """
+    weights = getattr(model, "weights", None)
+    if weights is not None and hasattr(model, "count_params"):
+        return sum(
+            int(np.prod(w.shape)) * np.dtype(getattr(w.dtype, "name", w.dtype)).itemsize
+            for w in weights
+        )
+    return _array_bytes(model, {}) or None
+
+
+# Files loaded through image_inference (TensorFlow, TFLite or ONNX Runtime) rather than joblib
+IMAGE_MODEL_EXTENSIONS = (".keras", ".h5", ".tflite", ".onnx")
+
+
+def load_model_file(path):
+    """Loads a registered model file by extension."""
+    if path.endswith(IMAGE_MODEL_EXTENSIONS):
+        from image_inference import load_image_model
+        return load_image_model(path)
+    import joblib
+    return joblib.load(path)
+
+
+def input_shape_warmup(input_shape=None, batch_sizes=(1,)):
+    """
+    Warmup callable running zero batches of each size through a model. The
+    per-sample shape is input_shape if given, else the model's: input_shape of
+    image models, the feature count of sklearn estimators and of
+    train_livestock.py artifacts. Models with no known shape are left cold.
+    """
+    def warmup(model):
+        estimator = model
+        if isinstance(model, dict) and "model" in model and "features" in model:
+            # train_livestock.py artifact: {"model", "features", "classes"}
+            estimator, shape = model["model"], (len(model["features"]),)
+        elif input_shape is not None:
+            shape = tuple(input_shape)
+        elif getattr(model, "input_shape", None) is not None:
+            shape = tuple(model.input_shape)[1:]
+        elif hasattr(model, "n_features_in_"):
+            shape = (model.n_features_in_,)
+        else:
+            return
+        for batch_size in batch_sizes:
+            estimator.predict(np.zeros((batch_size,) + tuple(int(d) for d in shape), dtype=np.float32))
+
+    return warmup
+
+
+class ModelRegistry:
+    """Loads models on demand by (name, version) and keeps their total memory under a budget."""
+
+    def __init__(self, memory_budget_bytes=0):
+        """
+        Args:
+            memory_budget_bytes: Total bytes loaded models may hold; 0 means no limit
+        """
+        self.memory_budget_bytes = memory_budget_bytes
+        self._entries = {}          # (name, version) -> LazyModel
+        self._default_versions = {}  # name -> version served when none is requested
+        self._memory = {}           # (name, version) -> bytes, for loaded models
+        self._rss_delta = {}        # (name, version) -> RSS growth observed while loading
+        self._load_counts = {}      # (name, version) -> successful loads so far
+        self._lru = OrderedDict()   # loaded (name, version) keys, least recently used first
+        self._warmups = {}          # (name, version) -> callable run on a freshly loaded model before it is served
+        self._warmup_seconds = {}   # (name, version) -> duration of the last warmup
+        self._fingerprints = {}     # (name, version) -> identifies the files the loaded model came from
+        self._pending_fingerprints = {}  # (name, version) -> fingerprint of a reloaded model not swapped in yet
+        self._paths = {}            # (name, version) -> files the model is loaded from
+        self._watch_thread = None
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def register(self, name, loader, version="1", default=True, warmup=None, paths=()):
+        """
+        Registers a loader for name/version.
+
+        Args:
+            default: Make this the version served when none is requested
+            warmup: Callable run on every freshly (re)loaded model before it is served
+            paths: Files the model is loaded from, watched by watch()
+        """
+        key = (name, str(version))
+        with self._lock:
+            self._entries[key] = LazyModel(f"{name}:{version}", lambda: self._load(key, loader))
+            self._warmups[key] = warmup
+            self._paths[key] = list(paths)
+            if default or name not in self._default_versions:
+                self._default_versions[name] = str(version)
+
+    def register_manifest(self, manifest_path, warmup_batch_sizes=(1,)):
+        """
+        Registers every model listed in a JSON manifest (see the module docstring).
+
+        Args:
+            warmup_batch_sizes: Batch sizes each model is warmed with; empty skips warmup
+        """
+        base_dir = os.path.dirname(os.path.abspath(manifest_path))
+        with open(manifest_path) as f:
+            entries = json.load(f)
+        for entry in entries:
+            path = os.path.join(base_dir, entry["path"])
+            warmup = None
+            if warmup_batch_sizes and entry.get("warmup", True):
+                warmup = input_shape_warmup(entry.get("input_shape"), warmup_batch_sizes)
+            self.register(entry["name"], lambda path=path: load_model_file(path),
+                          version=entry.get("version", "1"), default=entry.get("default", True),
+                          warmup=warmup, paths=[path])
+            print(f"  - Registered {entry['name']}:{entry.get('version', '1')} from {path}")
+
+    def names(self):
+        """Names of the registered models."""
+        return sorted(self._default_versions)
+
+    def paths(self, name, version=None):
+        """Files a registered model is loaded from."""
+        return list(self._paths[self._resolve(name, version)])
+
+    def _resolve(self, name, version=None):
+        version = str(version) if version is not None else self._default_versions.get(name)
+        key = (name, version)
+        if key not in self._entries:
+            raise KeyError(f"Unknown model: {name}" + (f" (version {version})" if version else ""))
+        return key
+
+    def _load(self, key, loader):
+        """Runs a loader and the model's warmup, and records the memory the model holds."""
+        rss_before = current_rss_bytes()
+        signature = self._files_signature(key)
+        model = loader()
+        warmup = self._warmups.get(key)
+        if warmup is not None:
+            started = time.perf_counter()
+            warmup(model)
+            self._warmup_seconds[key] = time.perf_counter() - started
+            print(f"Warmed up {key[0]}:{key[1]} in {self._warmup_seconds[key]:.2f}s")
+        rss_delta = max(current_rss_bytes() - rss_before, 0)
+        estimated = estimate_model_bytes(model)
+        fingerprint = hashlib.sha1(repr((key, signature)).encode()).hexdigest()[:16]
+        with self._lock:
+            if self._entries[key].ready:
+                # A reload: the current model is served (and cached under its fingerprint) until the swap
+                self._pending_fingerprints[key] = fingerprint
+            else:
+                self._fingerprints[key] = fingerprint
+            self._memory[key] = estimated if estimated is not None else rss_delta
+            self._rss_delta[key] = rss_delta
+            self._load_counts[key] = self._load_counts.get(key, 0) + 1
+        return model
+
+    def get(self, name, version=None):
+        """
+        Returns the model for name/version (default version if omitted), loading it
+        on demand; None if it failed to load. Raises KeyError for unknown models.
+        """
+        key = self._resolve(name, version)
+        model = self._entries[key].get()
+        if model is None:
+            return None
+        with self._lock:
+            newly_loaded = key not in self._lru
+            self._lru[key] = True
+            self._lru.move_to_end(key)
+        if newly_loaded:
+            self._enforce_budget(keep=key)
+        return model
+
+    def preload(self, name, version=None):
+        """Loads a model in a background thread, counting it against the budget like get() does."""
+        key = self._resolve(name, version)
+        thread = threading.Thread(target=self.get, args=key, name=f"load-{name}:{key[1]}", daemon=True)
+        thread.start()
+        return thread
+
+    def _enforce_budget(self, keep):
+        """Unloads least recently used models until the loaded total fits the budget."""
+        if self.memory_budget_bytes <= 0:
+            return
+        evicted = []
+        with self._lock:
+            total = sum(self._memory.get(key, 0) for key in self._lru)
+            for key in list(self._lru):
+                if total <= self.memory_budget_bytes:
+                    break
+                if key == keep:
+                    continue
+                total -= self._memory.pop(key, 0)
+                del self._lru[key]
+                evicted.append(key)
+                self.evictions += 1
+        # Unload outside the registry lock: a loader holding its model's lock may be waiting on ours
+        for name, version in evicted:
+            self._entries[(name, version)].unload()
+            print(f"Evicted {name}:{version} from memory (budget {self.memory_budget_bytes / 2**20:.0f} MB)")
+        if evicted:
+            gc.collect()
+
+    def unload(self, name, version=None):
+        """Explicitly unloads a model; the next get() loads it again."""
+        key = self._resolve(name, version)
+        with self._lock:
+            self._lru.pop(key, None)
+            self._memory.pop(key, None)
+        self._entries[key].unload()
+
+    def reload(self, name, version=None):
+        """
+        Loads a fresh copy of a loaded model, warms it and swaps it in (blocking
+        the caller, not the requests being served). A model whose last load
+        failed is loaded right away instead of after its retry backoff. Models
+        that are not loaded are left alone: their next get() reads the new
+        files anyway.
+
+        Returns True if a new model was swapped in.
+        """
+        key = self._resolve(name, version)
+        entry = self._entries[key]
+        if not entry.loaded:
+            return False
+        # The entry's loader goes through _load, which warms the new model before the swap
+        reloaded = entry.reload()
+        with self._lock:
+            # Only now that the new model is served does its fingerprint key the caches
+            fingerprint = self._pending_fingerprints.pop(key, None)
+            if not reloaded:
+                return False
+            if fingerprint is not None:
+                self._fingerprints[key] = fingerprint
+            newly_loaded = key not in self._lru
+            self._lru[key] = True
+        if newly_loaded:
+            self._enforce_budget(keep=key)
+        return True
+
+    def _files_signature(self, key):
+        """Modification time and size of each file a model is loaded from (None if missing)."""
+        signature = []
+        for path in self._paths.get(key, ()):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def watch(self, interval=2.0, on_reload=None):
+        """
+        Starts a background thread that reloads a model when its files change.
+
+        A change is acted on once the files have looked the same for one more
+        poll, so a model is never loaded from a half-copied artifact.
+
+        Args:
+            interval: Seconds between two polls of the watched files
+            on_reload: Optional callable(name, version) run after a successful reload
+        """
+        if self._watch_thread is not None:
+            return self._watch_thread
+
+        # Taken now rather than when the thread first runs, so a change made right after watch() is seen
+        signatures = {key: self._files_signature(key) for key in self._paths if self._paths[key]}
+
+        def poll():
+            pending = {}  # key -> signature seen on the previous poll after a change
+            while True:
+                time.sleep(interval)
+                for key in [key for key in self._paths if self._paths[key]]:
+                    signature = self._files_signature(key)
+                    if signature == signatures.get(key):
+                        pending.pop(key, None)
+                        continue
+                    if pending.get(key) != signature:
+                        # Changed since the last poll; wait until it settles
+                        pending[key] = signature
+                        continue
+                    del pending[key]
+                    signatures[key] = signature
+                    print(f"Model files changed for {key[0]}:{key[1]}, reloading...")
+                    if self.reload(*key) and on_reload is not None:
+                        on_reload(*key)
+
+        self._watch_thread = threading.Thread(target=poll, name="model-watcher", daemon=True)
+        self._watch_thread.start()
+        return self._watch_thread
+
+    def fingerprint(self, name, version=None):
+        """
+        Identifier of the model as currently loaded: its name, version and the
+        size/mtime of its files. It changes when a new artifact is loaded and is
+        the same in every worker process, so it can key shared caches.
+        """
+        return self._fingerprints.get(self._resolve(name, version))
+
+    def is_ready(self, name, version=None):
+        """True if the model is currently loaded successfully."""
+        return self._entries[self._resolve(name, version)].ready
+
+    def is_failed(self, name, version=None):
+        """True if the model's last load attempt failed."""
+        return self._entries[self._resolve(name, version)].failed
+
+    def has_loaded(self, name, version=None):
+        """True if the model loaded successfully at least once (it may have been evicted since)."""
+        return self._load_counts.get(self._resolve(name, version), 0) > 0
+
+    def status(self):
+        """Per-model load state and memory, plus the budget, for the /models endpoint."""
+        with self._lock:
+            models = {}
+            for (name, version), entry in self._entries.items():
+                key = (name, version)
+                models[f"{name}:{version}"] = {
+                    **entry.status(),
+                    "default": self._default_versions.get(name) == version,
+                    "memory_bytes": self._memory.get(key),
+                    "rss_delta_bytes": self._rss_delta.get(key),
+                    "loads": self._load_counts.get(key, 0),
+                    "warmup_seconds": round(self._warmup_seconds[key], 3) if key in self._warmup_seconds else None,
+                    "lru_rank": list(self._lru).index(key) if key in self._lru else None
+                }
+            return {
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "memory_used_bytes": sum(self._memory.get(key, 0) for key in self._lru),
+                "process_rss_bytes": current_rss_bytes(),
+                "evictions": self.evictions,
+                "models": models
+            }
@@ -0,0 +1,235 @@
+"""
+In-process LRU Response Cache
+
+A small thread-safe cache for prediction responses, bounded by entry count
+and time-to-live. It can watch the model files it depends on and drops every
+entry as soon as one of them changes on disk, so a retrained model never
+serves stale answers.
+
+A ResponseCache can sit in front of a SQLiteCache: an on-disk tier that every
+worker process on the host shares, so a response computed by one worker is a
+hit in all the others. Values stored in the disk tier must be JSON-serializable.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Bounded LRU cache with TTL, model-file invalidation and hit/miss counters."""
+
+    def __init__(self, max_size=10000, ttl_seconds=3600, watched_paths=(), check_interval=5.0, backing=None):
+        """
+        Args:
+            max_size: Maximum number of entries kept (0 disables the cache)
+            ttl_seconds: Seconds an entry stays valid after it is stored
+            watched_paths: Files whose modification invalidates every entry
+            check_interval: Minimum seconds between two stat() passes over watched_paths
+            backing: Optional second tier (e.g. SQLiteCache) consulted on misses and written on puts
+        """
+        self.backing = backing
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.watched_paths = list(watched_paths)
+        self.check_interval = check_interval
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._signature = self._files_signature()
+        self._last_check = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _files_signature(self):
+        """Modification time and size of each watched file (None if missing)."""
+        signature = []
+        for path in self.watched_paths:
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _check_model_files(self, now):
+        """Clears the cache if a watched file changed. Caller holds the lock."""
+        if not self.watched_paths or now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        signature = self._files_signature()
+        if signature != self._signature:
+            self._signature = signature
+            self._entries.clear()
+            self.invalidations += 1
+
+    def get(self, key):
+        """Returns the cached value for key, or None on a miss."""
+        if self.max_size <= 0:
+            return self.backing.get(key) if self.backing is not None else None
+        now = time.monotonic()
+        with self._lock:
+            self._check_model_files(now)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+
+        if self.backing is not None:
+            value = self.backing.get(key)
+            if value is not None:
+                self._store(key, value)
+            return value
+        return None
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def put(self, key, value):
+        """Stores value under key, evicting the least recently used entries if full."""
+        if self.max_size > 0:
+            self._store(key, value)
+        if self.backing is not None:
+            self.backing.put(key, value)
+
+    def clear(self):
+        """Drops every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._signature = self._files_signature()
+            self.invalidations += 1
+
+    def stats(self):
+        """Current size and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                **({"disk": self.backing.stats()} if self.backing is not None else {})
+            }
+
+
+class SQLiteCache:
+    """
+    On-disk LRU/TTL cache in a SQLite file, shared by every process that opens it.
+
+    Values are stored as JSON. Each thread (and each forked worker) uses its
+    own connection; WAL mode lets readers and the writer work concurrently.
+    """
+
+    def __init__(self, path, max_size=100000, ttl_seconds=86400, trim_every=100):
+        """
+        Args:
+            path: SQLite database file (created if missing)
+            max_size: Maximum number of entries kept; older ones are trimmed least recently used first
+            ttl_seconds: Seconds an entry stays valid after it is stored
+            trim_every: Puts between two size checks
+        """
+        self.path = path
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.trim_every = trim_every
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+        connection.commit()
+
+    def _connection(self):
+        # sqlite3 connections can't be shared across threads, nor survive a fork
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key):
+        """Returns the cached value for key, or None on a miss (or if the database is unavailable)."""
+        now = time.time()
+        try:
+            connection = self._connection()
+            row = connection.execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] >= now:
+                connection.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+                connection.commit()
+                with self._lock:
+                    self.hits += 1
+                return json.loads(row[0])
+        except sqlite3.Error:
+            with self._lock:
+                self.errors += 1
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """Stores value under key; every trim_every puts, trims the table back to max_size."""
+        now = time.time()
+        with self._lock:
+            self._puts += 1
+            trim = self._puts % self.trim_every == 0
+        try:
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl_seconds, now)
+            )
+            if trim:
+                connection.execute("DELETE FROM cache WHERE expires < ?", (now,))
+                connection.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_size,)
+                )
+            connection.commit()
+        except sqlite3.Error:
+            with self._lock:
+                self.errors += 1
+
+    def stats(self):
+        """Entry count and this process's hit/miss counters."""
+        try:
+            size = self._connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        except sqlite3.Error:
+            size = None
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "size": size,
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "errors": self.errors
+            }
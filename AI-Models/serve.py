@@ -0,0 +1,201 @@
+"""
+Production Server for the AI Microservice
+
+Runs the Flask app from app.py under gunicorn with pre-forked workers. The
+fertilizer tree and livestock forests are loaded once in the parent process
+before forking, so every worker shares them copy-on-write instead of loading
+(and holding) its own copy. The image CNNs are loaded and warmed in each
+worker after the fork instead: TensorFlow's runtime threads don't survive a
+fork, so a CNN loaded in the parent would hang in the workers. TensorFlow and
+BLAS thread pools are sized per worker so N workers together use the
+machine's cores without oversubscribing them. The routes are exactly those
+of app.py.
+
+With --asgi the workers run asgi_app.py on uvicorn's event loop instead of
+gthread request threads, so slow uploads no longer hold a worker thread.
+
+Usage:
+    python serve.py                                  # one worker per core on 0.0.0.0:5000
+    python serve.py --workers 4 --threads 2 --bind 0.0.0.0:8000
+    python serve.py --preload fertilizer             # the other models load per worker on first use
+    python serve.py --asgi --workers 4               # event-loop workers (needs uvicorn)
+
+`python app.py` is still the single-process development server.
+
+/metrics is per worker: each scrape is answered by one worker and reports
+that worker's requests, latencies and models only (see metrics.py).
+"""
+
+import os
+import gc
+import argparse
+import threading
+
+
+def configure_threads(workers, intra_op_threads=None, inter_op_threads=None):
+    """
+    Sizes the per-worker thread pools via the environment, before TensorFlow
+    or NumPy's BLAS is initialized.
+
+    Returns the (intra_op, inter_op) thread counts each worker uses.
+    """
+    cores = os.cpu_count() or 1
+    intra_op_threads = intra_op_threads or max(1, cores // workers)
+    inter_op_threads = inter_op_threads or 1
+
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(intra_op_threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = str(inter_op_threads)
+    # BLAS pools used by NumPy/scikit-learn; explicit settings win
+    for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(variable, str(intra_op_threads))
+    return intra_op_threads, inter_op_threads
+
+
+def loads_tensorflow(service, name):
+    """True for image models, whose runtimes (TensorFlow, TFLite, ONNX Runtime) start threads a fork doesn't copy."""
+    from model_registry import IMAGE_MODEL_EXTENSIONS
+    return name in service.IMAGE_MODELS or any(
+        path.endswith(IMAGE_MODEL_EXTENSIONS) for path in service.registry.paths(name))
+
+
+def preload_models(service, names):
+    """Loads the named models in this (parent) process and waits for every load thread."""
+    for name in names:
+        print(f"Preloading {name} before forking workers...")
+        if service.registry.get(name) is None:
+            # Forget the failure so each worker tries again on first use
+            service.registry.unload(name)
+            print(f"WARNING: {name} failed to load; workers will retry on first use")
+
+    # Forking while a loader thread still runs could leave its locks held in the children
+    for thread in threading.enumerate():
+        if thread.name.startswith("load-"):
+            thread.join()
+
+
+def preload_in_worker(service, names):
+    """
+    Loads and warms the image models in a freshly forked worker, in the
+    background. /ready waits for them; one that fails is dropped from the
+    preload list (as in the parent) and retried on first use.
+    """
+    def load():
+        for name in names:
+            if service.registry.get(name) is None:
+                service.PRELOAD_MODELS.remove(name)
+                print(f"WARNING: {name} failed to load in worker {os.getpid()}; it will retry on first use")
+
+    thread = threading.Thread(target=load, name="worker-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+def asgi_worker_class():
+    """gunicorn worker class running an ASGI app on uvicorn (from uvicorn-worker when installed)."""
+    try:
+        import uvicorn_worker  # noqa: F401
+        return "uvicorn_worker.UvicornWorker"
+    except ImportError:
+        pass
+    try:
+        import uvicorn.workers  # noqa: F401
+    except ImportError:
+        raise SystemExit("serve.py --asgi requires uvicorn (pip install uvicorn)")
+    return "uvicorn.workers.UvicornWorker"
+
+
+def run(bind="0.0.0.0:5000", workers=None, threads=1, preload=None, timeout=120,
+        intra_op_threads=None, inter_op_threads=None, asgi=False):
+    """
+    Loads the fork-safe models once, then serves app.py with pre-forked
+    gunicorn workers that each load the image models.
+
+    Args:
+        preload: Models to load up front (default: all registered); image
+            models among them load in every worker, the others in the parent
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit("serve.py requires gunicorn (pip install gunicorn); use `python app.py` for development")
+    worker_class = asgi_worker_class() if asgi else "gthread"
+
+    workers = workers or os.cpu_count() or 1
+    intra, inter = configure_threads(workers, intra_op_threads, inter_op_threads)
+
+    # The parent must not run the file watcher: its thread would not survive the fork
+    watch_models = os.environ.get("SKYACRE_WATCH_MODELS", "1") != "0"
+    os.environ["SKYACRE_WATCH_MODELS"] = "0"
+    # Nor load models on import: which ones load before the fork is decided below
+    if preload is None and "SKYACRE_PRELOAD_MODELS" in os.environ:
+        preload = [name.strip() for name in os.environ["SKYACRE_PRELOAD_MODELS"].split(",") if name.strip()]
+    os.environ["SKYACRE_PRELOAD_MODELS"] = ""
+
+    import app as service
+    if asgi:
+        import asgi_app
+
+    names = service.registry.names() if preload is None else preload
+    unknown = [name for name in names if name not in service.registry.names()]
+    if unknown:
+        raise SystemExit(f"Unknown models in --preload: {', '.join(unknown)}")
+    worker_names = [name for name in names if loads_tensorflow(service, name)]
+    parent_names = [name for name in names if name not in worker_names]
+    preload_models(service, parent_names)
+    # /ready reports on the models preloaded here and on the image models each worker loads itself
+    service.PRELOAD_MODELS[:] = [name for name in parent_names if service.registry.has_loaded(name)] + worker_names
+
+    # Keep the garbage collector from touching (and so copying) the preloaded objects in workers
+    gc.collect()
+    gc.freeze()
+
+    def post_fork(server, worker):
+        if worker_names:
+            preload_in_worker(service, worker_names)
+        if watch_models:
+            service.start_model_watcher()
+
+    class SkyAcreServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", bind)
+            self.cfg.set("workers", workers)
+            self.cfg.set("threads", threads)
+            self.cfg.set("worker_class", worker_class)
+            self.cfg.set("timeout", timeout)
+            self.cfg.set("post_fork", post_fork)
+
+        def load(self):
+            return asgi_app.app if asgi else service.app
+
+    if asgi:
+        print(f"Serving on {bind} with {workers} event-loop workers x {asgi_app.app.max_workers} handler threads "
+              f"(TensorFlow intra-op {intra}, inter-op {inter} per worker)")
+    else:
+        print(f"Serving on {bind} with {workers} workers x {threads} threads "
+              f"(TensorFlow intra-op {intra}, inter-op {inter} per worker)")
+    SkyAcreServer().run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve the SkyAcre AI API with pre-forked workers')
+    parser.add_argument('--bind', default=os.environ.get("SKYACRE_BIND", "0.0.0.0:5000"),
+                        help='Address to listen on (host:port)')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get("SKYACRE_WORKERS", 0)) or None,
+                        help='Worker processes (default: one per core)')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get("SKYACRE_WORKER_THREADS", 1)),
+                        help='Request threads per worker')
+    parser.add_argument('--preload', default=None,
+                        help='Comma-separated models to load up front (default: SKYACRE_PRELOAD_MODELS, else all '
+                             'registered); image models load in each worker, the others before forking')
+    parser.add_argument('--timeout', type=int, default=120, help='Seconds before a stuck worker is restarted')
+    parser.add_argument('--intra-op-threads', type=int, default=None,
+                        help='TensorFlow intra-op threads per worker (default: cores / workers)')
+    parser.add_argument('--inter-op-threads', type=int, default=None,
+                        help='TensorFlow inter-op threads per worker (default: 1)')
+    parser.add_argument('--asgi', action='store_true', default=os.environ.get("SKYACRE_ASGI", "0") == "1",
+                        help='Serve asgi_app.py on uvicorn event-loop workers (--threads is then unused)')
+    args = parser.parse_args()
+
+    preload = None if args.preload is None else [n.strip() for n in args.preload.split(",") if n.strip()]
+    run(bind=args.bind, workers=args.workers, threads=args.threads, preload=preload, timeout=args.timeout,
+        intra_op_threads=args.intra_op_threads, inter_op_threads=args.inter_op_threads, asgi=args.asgi)
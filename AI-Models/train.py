@@ -6,6 +6,8 @@ the preprocessed data from preprocess.py.
 
 Usage:
     python train.py
+    python train.py --head gap      # pooled classifier head, ~20x fewer parameters (see cnn_blocks.py)
+    python train.py --backbone mobile --head gap    # depthwise-separable backbone, ~8x fewer FLOPs
 """
 
 import os
@@ -23,6 +25,8 @@ from sklearn.metrics import (
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from cnn_blocks import BACKBONES, HEADS, classifier_head, mobile_cnn, print_model_report
+
 # Configuration
 IMG_HEIGHT = 224
 IMG_WIDTH = 224
@@ -32,6 +36,8 @@ EPOCHS = 50
 MODEL_OUTPUT_PATH = 'skyacre_cow_disease_model.keras'
 DATA_DIR = 'Data/preprocessed'
 NUM_CLASSES = 3  # foot-and-mouth, lumpy, healthy
+HEAD = 'flatten'  # classifier head: flatten (original), gap or conv-gap
+BACKBONE = 'plain'  # conv blocks: plain (original Conv2D pairs) or mobile (inverted residuals)
 
 # Class labels for reference
 CLASS_LABELS = {
@@ -41,18 +47,38 @@ CLASS_LABELS = {
 }
 
 
-def build_cnn_model(input_shape=(IMG_HEIGHT, IMG_WIDTH, CHANNELS), num_classes=NUM_CLASSES):
+def build_cnn_model(input_shape=(IMG_HEIGHT, IMG_WIDTH, CHANNELS), num_classes=NUM_CLASSES, head=HEAD,
+                    backbone=BACKBONE):
     """
     Build a CNN model for multi-class classification.
     
     Args:
         input_shape: Shape of input images
         num_classes: Number of output classes (3 for foot-and-mouth, lumpy, healthy)
+        head: Classifier head after the conv blocks (see cnn_blocks.classifier_head)
+        backbone: 'plain' for the Conv2D pairs of plain_cnn(), 'mobile' for cnn_blocks.mobile_backbone
     
     Returns:
         Compiled Keras model
     """
-    model = keras.Sequential([
+    if backbone == 'mobile':
+        model = mobile_cnn(input_shape, num_classes, head=head)
+    else:
+        model = plain_cnn(input_shape, num_classes, head=head)
+    
+    # Compile model
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=0.001),
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    
+    return model
+
+
+def plain_cnn(input_shape, num_classes, head=HEAD):
+    """The original four blocks of 3x3 Conv2D pairs, followed by the classifier head (uncompiled)."""
+    return keras.Sequential([
         # First Conv Block
         layers.Conv2D(32, (3, 3), padding='same', input_shape=input_shape),
         layers.BatchNormalization(),
@@ -93,30 +119,9 @@ def build_cnn_model(input_shape=(IMG_HEIGHT, IMG_WIDTH, CHANNELS), num_classes=N
         layers.MaxPooling2D(pool_size=(2, 2)),
         layers.Dropout(0.25),
         
-        # Dense layers
-        layers.Flatten(),
-        layers.Dense(512),
-        layers.BatchNormalization(),
-        layers.Activation('relu'),
-        layers.Dropout(0.5),
-        
-        layers.Dense(256),
-        layers.BatchNormalization(),
-        layers.Activation('relu'),
-        layers.Dropout(0.5),
-        
-        # Output layer
-        layers.Dense(num_classes, activation='softmax')
+        # Dense layers and output layer
+        *classifier_head(head, num_classes)
     ])
-    
-    # Compile model
-    model.compile(
-        optimizer=keras.optimizers.Adam(learning_rate=0.001),
-        loss='sparse_categorical_crossentropy',
-        metrics=['accuracy']
-    )
-    
-    return model
 
 
 def load_preprocessed_data(data_dir=DATA_DIR):
@@ -454,7 +459,7 @@ def detect_overfitting(history):
     return results
 
 
-def cross_validate_model(X_train, y_train, n_splits=5):
+def cross_validate_model(X_train, y_train, n_splits=5, head=HEAD, backbone=BACKBONE):
     """
     Perform k-fold cross-validation to get more robust performance estimates.
     
@@ -462,6 +467,8 @@ def cross_validate_model(X_train, y_train, n_splits=5):
         X_train: Training features
         y_train: Training labels
         n_splits: Number of folds (default: 5)
+        head: Classifier head of the models trained per fold
+        backbone: Backbone of the models trained per fold
     
     Returns:
         Dictionary with cross-validation results
@@ -486,7 +493,7 @@ def cross_validate_model(X_train, y_train, n_splits=5):
         y_fold_train, y_fold_val = y[train_idx], y[val_idx]
         
         # Build fresh model for each fold
-        model = build_cnn_model()
+        model = build_cnn_model(head=head, backbone=backbone)
         
         # Train
         model.fit(
@@ -580,12 +587,14 @@ def save_model_h5(model, output_path=MODEL_OUTPUT_PATH):
     return output_path
 
 
-def main(enable_cross_validation=False, n_folds=5):
+def main(enable_cross_validation=False, n_folds=5, head=HEAD, backbone=BACKBONE):
     """Main training pipeline.
     
     Args:
         enable_cross_validation: Whether to run k-fold cross-validation
         n_folds: Number of folds for cross-validation
+        head: Classifier head (flatten, gap or conv-gap)
+        backbone: Backbone (plain or mobile)
     """
     print("="*60)
     print("COW DISEASE CLASSIFICATION MODEL TRAINING")
@@ -596,13 +605,15 @@ def main(enable_cross_validation=False, n_folds=5):
     
     # Optional: Run cross-validation
     if enable_cross_validation:
-        cv_results = cross_validate_model(X_train, y_train, n_splits=n_folds)
+        cv_results = cross_validate_model(X_train, y_train, n_splits=n_folds, head=head, backbone=backbone)
     
     # Build model
-    print("\nBuilding CNN model...")
+    print(f"\nBuilding CNN model ({backbone} backbone, {head} head)...")
     model = build_cnn_model(
         input_shape=(IMG_HEIGHT, IMG_WIDTH, CHANNELS),
-        num_classes=NUM_CLASSES
+        num_classes=NUM_CLASSES,
+        head=head,
+        backbone=backbone
     )
     model.summary()
     
@@ -621,6 +632,9 @@ def main(enable_cross_validation=False, n_folds=5):
     # Detect overfitting/underfitting
     overfitting_results = detect_overfitting(history)
     
+    # Size and serving cost of this variant
+    eval_results.update(print_model_report(model, name=f"{backbone} backbone, {head} head"))
+    
     # Save final model as .h5
     model_path = save_model_h5(model)
     
@@ -631,6 +645,10 @@ def main(enable_cross_validation=False, n_folds=5):
     print(f"Test Accuracy: {test_accuracy:.4f}")
     print(f"Weighted F1-Score: {eval_results['f1_weighted']:.4f}")
     print(f"ROC-AUC (OvR): {eval_results['roc_auc_ovr']:.4f}")
+    print(f"Parameters: {eval_results['params']:,} ({backbone} backbone, {head} head), "
+          f"FLOPs: {eval_results['gflops']:.2f} G/image")
+    print(f"CPU latency: {eval_results['cpu_latency_ms']:.1f} ms/image, "
+          f"throughput: {eval_results['images_per_sec']:.1f} images/sec")
     print(f"Overfitting Diagnosis: {overfitting_results['diagnosis']}")
     
     return model, history, eval_results, overfitting_results
@@ -642,9 +660,15 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Train Cow Disease Classification Model')
     parser.add_argument('--cv', action='store_true', help='Enable k-fold cross-validation')
     parser.add_argument('--folds', type=int, default=5, help='Number of folds for cross-validation')
+    parser.add_argument('--head', choices=HEADS, default=HEAD,
+                        help='Classifier head: flatten (original), gap or conv-gap')
+    parser.add_argument('--backbone', choices=BACKBONES, default=BACKBONE,
+                        help='Conv blocks: plain (original) or mobile (depthwise-separable, trained from scratch)')
     args = parser.parse_args()
     
     model, history, eval_results, overfitting_results = main(
         enable_cross_validation=args.cv,
-        n_folds=args.folds
+        n_folds=args.folds,
+        head=args.head,
+        backbone=args.backbone
     )
@@ -0,0 +1,143 @@
+"""
+Livestock Health Model Training (Poultry, Dairy, Beef)
+
+Script version of Notebooks/Poultry_ml_model.ipynb, Dairy_ml_model.ipynb and
+Beef_ml_model.ipynb: a class-balanced RandomForest per species, trained on
+daily farm sensor rows and saved for the API's /predict/<species>-health/batch
+endpoints. Each artifact is a joblib dict holding the fitted model, its
+feature order and the condition name of each predict_proba column:
+
+    Models/skyacre_poultry_health_model.pkl
+    Models/skyacre_dairy_health_model.pkl
+    Models/skyacre_beef_health_model.pkl
+
+Usage:
+    python train_livestock.py poultry
+    python train_livestock.py dairy --data Data/Processed/dairy_multi_disease_dataset.csv
+    python train_livestock.py all
+"""
+
+import os
+import argparse
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, "Models")
+DATA_DIR = os.path.join(BASE_DIR, "Data", "Processed")
+
+# Dataset, model inputs, label column and label names for each species (as in the notebooks)
+SPECIES = {
+    "poultry": {
+        "data": os.path.join(DATA_DIR, "poultry_health_large_dataset.csv"),
+        "features": ['ambient_temp', 'feed_intake_g', 'water_intake_ml', 'mortality_rate', 'egg_production_rate'],
+        "label": "disease_label",
+        "classes": {0: "Healthy", 1: "Heat Stress", 2: "Newcastle Disease", 3: "Coccidiosis",
+                    4: "Nutritional Stress"}
+    },
+    "dairy": {
+        "data": os.path.join(DATA_DIR, "dairy_multi_disease_dataset.csv"),
+        "features": ['ambient_temp', 'THI', 'milk_yield_l', 'milk_conductivity'],
+        "label": "disease_label",
+        "classes": {0: "Healthy", 1: "Subclinical Mastitis", 2: "Clinical Mastitis", 3: "Heat Stress"}
+    },
+    "beef": {
+        "data": os.path.join(DATA_DIR, "beef_health_realistic_dataset.csv"),
+        "features": ['ambient_temp', 'feed_intake_kg', 'water_intake_l'],
+        "label": "disease",
+        "classes": {}  # the dataset's labels are already condition names
+    },
+}
+
+
+def model_path(species, model_dir=MODEL_DIR):
+    """Where the species' artifact is saved (and where app.py loads it from)."""
+    return os.path.join(model_dir, f"skyacre_{species}_health_model.pkl")
+
+
+def train_species(species, data_path=None, output_path=None, n_estimators=200, test_size=0.2):
+    """
+    Trains and saves one species' RandomForest.
+
+    Args:
+        species: "poultry", "dairy" or "beef"
+        data_path: CSV with the species' feature and label columns (default: SPECIES[species]["data"])
+        output_path: Where to save the artifact (default: model_path(species))
+        n_estimators: Trees in the forest
+        test_size: Fraction of rows held out for the printed evaluation
+
+    Returns:
+        The saved artifact dict
+    """
+    import joblib
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+    from sklearn.model_selection import train_test_split
+
+    config = SPECIES[species]
+    data_path = data_path or config["data"]
+    output_path = output_path or model_path(species)
+    features = config["features"]
+
+    print(f"Loading {species} data from {data_path}...")
+    df = pd.read_csv(data_path)
+    print(f"Dataset shape: {df.shape}")
+    print(f"\nLabel distribution:\n{df[config['label']].value_counts().sort_index()}")
+
+    # A class with a single row can't be stratified (the dairy notebook drops its lone label 3 row)
+    counts = df[config['label']].value_counts()
+    rare = counts[counts < 2].index.tolist()
+    if rare:
+        print(f"Dropping classes with fewer than 2 rows: {rare}")
+        df = df[~df[config['label']].isin(rare)]
+
+    X = df[features].to_numpy(dtype=np.float32)
+    y = df[config['label']].to_numpy()
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42, stratify=y)
+    print(f"\nTraining samples: {len(X_train)}, test samples: {len(X_test)}")
+
+    # Balanced class weights help with rare diseases
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=42, class_weight='balanced', n_jobs=-1)
+    model.fit(X_train, y_train)
+
+    y_pred = model.predict(X_test)
+    accuracy = accuracy_score(y_test, y_pred)
+    print(f"\nAccuracy: {accuracy:.4f}")
+    print(f"\nClassification Report:\n{classification_report(y_test, y_pred)}")
+    print(f"Confusion Matrix:\n{confusion_matrix(y_test, y_pred)}")
+
+    print("\nFeature Importance:")
+    for importance, feature in sorted(zip(model.feature_importances_, features), reverse=True):
+        print(f"  {feature:<22}{importance:.4f}")
+
+    artifact = {
+        "species": species,
+        "model": model,
+        "features": features,
+        # Condition name of each predict_proba column
+        "classes": [config["classes"].get(label, str(label)) for label in model.classes_],
+        "accuracy": float(accuracy)
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    joblib.dump(artifact, output_path)
+    print(f"\nSaved {species} health model to {output_path}")
+    return artifact
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Train the livestock health RandomForest models')
+    parser.add_argument('species', choices=list(SPECIES) + ['all'], help='Species to train (or all)')
+    parser.add_argument('--data', default=None, help='Training CSV (default: the species dataset in Data/Processed)')
+    parser.add_argument('--output', default=None, help='Artifact path (default: Models/skyacre_<species>_health_model.pkl)')
+    parser.add_argument('--n-estimators', type=int, default=200, help='Trees in the forest')
+    args = parser.parse_args()
+
+    if args.species == 'all':
+        for name in SPECIES:
+            if not os.path.exists(SPECIES[name]["data"]):
+                print(f"Skipping {name}: {SPECIES[name]['data']} not found")
+                continue
+            train_species(name, n_estimators=args.n_estimators)
+    else:
+        train_species(args.species, args.data, args.output, n_estimators=args.n_estimators)
@@ -53,8 +53,14 @@ PIPELINE STEPS
 5. CNN MODEL ARCHITECTURE
    - 4 convolutional blocks (32→64→128→256 filters)
    - Each block: Conv2D → BatchNorm → ReLU → Conv2D → BatchNorm → ReLU → MaxPool → Dropout
-   - Dense layers: 512 → 256 → 4 (output)
+   - Classifier head (Config.HEAD / --head, see cnn_blocks.py):
+       flatten  (default) Flatten → Dense 512 → 256 → 4 (output), ~27M parameters
+       gap      GlobalAveragePooling → Dense 256 → 4, ~1.2M parameters
+       conv-gap strided Conv2D(256) → GlobalAveragePooling → Dense 256 → 4
    - Regularization: L2 weight decay, Dropout, BatchNormalization
+   - Backbone (Config.BACKBONE / --backbone): 'plain' is the blocks above (~5.2 GFLOPs per image);
+     'mobile' replaces them with MobileNetV2-style inverted residual blocks (depthwise-separable
+     convolutions, ~0.6 GFLOPs), trained from scratch with no pretrained weights
 
 6. MODEL TRAINING
    - Optimizer: Adam (lr=0.001)
@@ -66,6 +72,7 @@ PIPELINE STEPS
    - Confusion Matrix
    - ROC-AUC (One-vs-Rest)
    - Overfitting Detection
+   - Parameter count, FLOPs, single-image CPU latency and images/sec
    - Visualizations
 
 8. MODEL SAVING
@@ -76,6 +83,8 @@ USAGE
 ================================================================================
 
     python train_poultry.py
+    python train_poultry.py --head gap
+    python train_poultry.py --backbone mobile --head gap
 
 Requirements:
     - TensorFlow 2.x
@@ -130,6 +139,9 @@ from sklearn.metrics import (
 import cv2                    # OpenCV for image manipulation
 from PIL import Image         # Python Imaging Library
 
+# Classifier heads and the size/latency report shared with train.py
+from cnn_blocks import BACKBONES, HEADS, classifier_head, mobile_cnn, print_model_report
+
 # =============================================================================
 # Set random seeds for reproducibility
 # =============================================================================
@@ -173,6 +185,16 @@ class Config:
     INITIAL_LEARNING_RATE = 0.001  # Starting learning rate for Adam optimizer
     MIN_LEARNING_RATE = 1e-6      # Minimum learning rate (floor)
     
+    # ==========================================================================
+    # Model head - what turns the last 14x14x256 feature map into predictions
+    # ==========================================================================
+    # 'flatten' (original, Dense(512) alone holds ~25.7M weights), 'gap' or 'conv-gap'
+    HEAD = 'flatten'
+    
+    # 'plain' (the Conv2D pairs in build_cnn_model) or 'mobile' (depthwise-separable inverted
+    # residuals: ~9x fewer FLOPs and ~2.5x the CPU images/sec, for some accuracy)
+    BACKBONE = 'plain'
+    
     # ==========================================================================
     # Class labels - mapping between class indices and disease names
     # ==========================================================================
@@ -789,7 +811,9 @@ def save_split_data(X_train, X_val, X_test, y_train, y_val, y_test, output_dir):
 
 def build_cnn_model(input_shape=(Config.IMG_HEIGHT, Config.IMG_WIDTH, Config.CHANNELS),
                     num_classes=Config.NUM_CLASSES,
-                    l2_reg=0.001):
+                    l2_reg=0.001,
+                    head=None,
+                    backbone=None):
     """
     =============================================================================
     CONVOLUTIONAL NEURAL NETWORK (CNN) ARCHITECTURE
@@ -825,7 +849,7 @@ def build_cnn_model(input_shape=(Config.IMG_HEIGHT, Config.IMG_WIDTH, Config.CHA
     │   └─ Same structure with 256 filters
     │   → Extracts high-level features
     │
-    ├─ DENSE LAYERS
+    ├─ DENSE LAYERS (the default 'flatten' head; see `head` below)
     │   ├─ Flatten           → Converts 2D to 1D
     │   ├─ Dense(512)        → Fully connected layer
     │   ├─ BatchNorm
@@ -885,14 +909,28 @@ def build_cnn_model(input_shape=(Config.IMG_HEIGHT, Config.IMG_WIDTH, Config.CHA
         input_shape: Shape of input images (height, width, channels)
         num_classes: Number of output classes (4 for poultry diseases)
         l2_reg: L2 regularization coefficient
+        head: Classifier head - 'flatten', 'gap' or 'conv-gap' (default: Config.HEAD).
+              The pooled heads average each of the 256 feature maps to one value instead
+              of flattening all 50,176, which removes ~95% of the parameters
+        backbone: 'plain' for the blocks below or 'mobile' for cnn_blocks.mobile_backbone
+                  (default: Config.BACKBONE)
         
     Returns:
         Compiled Keras model
     """
+    head = head or Config.HEAD
+    backbone = backbone or Config.BACKBONE
+    
     print("\n" + "=" * 70)
-    print("STEP 5: CNN MODEL ARCHITECTURE")
+    print(f"STEP 5: CNN MODEL ARCHITECTURE ({backbone} backbone, {head} head)")
     print("=" * 70)
     
+    if backbone == 'mobile':
+        # Inverted residual blocks instead of the Conv2D pairs below, same head and regularization
+        model = mobile_cnn(input_shape, num_classes, head=head, l2_reg=l2_reg)
+        print_architecture(model)
+        return model
+    
     # Initialize sequential model
     model = keras.Sequential([
         # ==========================================================================
@@ -963,31 +1001,21 @@ def build_cnn_model(input_shape=(Config.IMG_HEIGHT, Config.IMG_WIDTH, Config.CHA
         layers.Dropout(0.25),
         
         # ==========================================================================
-        # DENSE (FULLY CONNECTED) LAYERS
+        # CLASSIFIER HEAD + OUTPUT LAYER
         # ==========================================================================
-        # Flatten: Convert 2D feature maps to 1D vector
-        layers.Flatten(),  # 14x14x256 = 50,176 features
-        
-        # First dense layer
-        layers.Dense(512, kernel_regularizer=l2(l2_reg)),
-        layers.BatchNormalization(),
-        layers.Activation('relu'),
-        layers.Dropout(0.5),  # Higher dropout in dense layers
-        
-        # Second dense layer
-        layers.Dense(256, kernel_regularizer=l2(l2_reg)),
-        layers.BatchNormalization(),
-        layers.Activation('relu'),
-        layers.Dropout(0.5),
-        
-        # ==========================================================================
-        # OUTPUT LAYER
-        # ==========================================================================
-        # 4 neurons for 4 classes, softmax for probability distribution
-        layers.Dense(num_classes, activation='softmax')
+        # 'flatten': Flatten (14x14x256 = 50,176 features) → Dense(512) → Dense(256)
+        # 'gap'/'conv-gap': average each feature map to one value → Dense(256)
+        # Then 4 neurons for 4 classes, softmax for probability distribution
+        *classifier_head(head, num_classes, l2_reg=l2_reg)
     ])
     
-    # Print model summary
+    print_architecture(model)
+    
+    return model
+
+
+def print_architecture(model):
+    """Prints the layer summary and parameter counts of a built model."""
     print("\nModel Architecture:")
     print("-" * 70)
     model.summary()
@@ -1002,8 +1030,6 @@ def build_cnn_model(input_shape=(Config.IMG_HEIGHT, Config.IMG_WIDTH, Config.CHA
     print(f"Trainable parameters: {trainable_params:,}")
     print(f"Non-trainable parameters: {non_trainable:,}")
     print("-" * 70)
-    
-    return model
 
 
 def compile_model(model, learning_rate=Config.INITIAL_LEARNING_RATE):
@@ -1981,6 +2007,9 @@ def run_pipeline():
     # Overfitting detection
     overfitting_results = detect_overfitting(history, Config.OUTPUT_DIR)
     
+    # Size and serving cost of this backbone/head variant
+    results.update(print_model_report(model, name=f"{Config.BACKBONE} backbone, {Config.HEAD} head"))
+    
     # Feature maps visualization (using a sample)
     visualize_feature_maps(model, X_test[:1], output_dir=Config.OUTPUT_DIR)
     
@@ -2007,6 +2036,10 @@ def run_pipeline():
     print(f"   - Test Loss: {test_loss:.4f}")
     print(f"   - Weighted F1-Score: {results.get('f1_weighted', 'N/A')}")
     print(f"   - ROC-AUC (OvR): {results.get('roc_auc_ovr', 'N/A')}")
+    print(f"   - Parameters: {results['params']:,} ({Config.BACKBONE} backbone, {Config.HEAD} head)")
+    print(f"   - FLOPs: {results['gflops']:.2f} G/image")
+    print(f"   - CPU Latency: {results['cpu_latency_ms']:.1f} ms/image")
+    print(f"   - CPU Throughput: {results['images_per_sec']:.1f} images/sec")
     print(f"\n[INFO] Overfitting Detection:")
     print(f"   - Diagnosis: {overfitting_results.get('diagnosis', 'N/A')}")
     print(f"   - Accuracy Gap: {overfitting_results.get('accuracy_gap', 'N/A'):.4f}")
@@ -2032,5 +2065,16 @@ if __name__ == '__main__':
     
     When this script is run directly (not imported), execute the pipeline.
     """
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Train the poultry disease CNN')
+    parser.add_argument('--head', choices=HEADS, default=Config.HEAD,
+                        help='Classifier head: flatten (original), gap or conv-gap')
+    parser.add_argument('--backbone', choices=BACKBONES, default=Config.BACKBONE,
+                        help='Conv blocks: plain (original) or mobile (depthwise-separable, trained from scratch)')
+    args = parser.parse_args()
+    Config.HEAD = args.head
+    Config.BACKBONE = args.backbone
+    
     # Run the complete pipeline
     model, history, results = run_pipeline()
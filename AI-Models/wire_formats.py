@@ -0,0 +1,204 @@
+"""
+Binary Wire Formats for Bulk Scoring
+
+Content-negotiated request/response encodings used by the prediction
+endpoints next to the default JSON:
+
+    application/x-npy                      a single NumPy array (.npy)
+    application/x-npz                      named NumPy arrays (.npz, no pickles)
+    application/msgpack                    map of name -> packed array
+    application/vnd.apache.arrow.stream    Arrow IPC stream (one column per name)
+
+msgpack and pyarrow are optional; asking for a format whose library is not
+installed raises UnsupportedFormat, which the endpoints turn into a 415.
+
+.npz members and Arrow buffers may be compressed, so a small body can decode
+to far more memory, and np.load allocates an array from the shape its .npy
+header declares before reading it. The decoders take a max_bytes cap and
+raise PayloadTooLarge (a 413): .npy/.npz headers are checked before anything
+is allocated or decompressed, Arrow streams after each record batch.
+"""
+
+import io
+import zipfile
+import numpy as np
+
+JSON_MIME = 'application/json'
+NPY_MIME = 'application/x-npy'
+NPZ_MIME = 'application/x-npz'
+MSGPACK_MIME = 'application/msgpack'
+ARROW_MIME = 'application/vnd.apache.arrow.stream'
+
+# Aliases clients commonly send for the same formats
+MIME_ALIASES = {
+    'application/x-msgpack': MSGPACK_MIME,
+    'application/vnd.msgpack': MSGPACK_MIME,
+    'application/vnd.apache.arrow.file': ARROW_MIME,
+}
+
+COLUMN_FORMATS = [NPZ_MIME, MSGPACK_MIME, ARROW_MIME]
+TENSOR_FORMATS = [NPY_MIME, NPZ_MIME, MSGPACK_MIME]
+
+
+class UnsupportedFormat(ValueError):
+    """Raised for media types we can't decode or encode (HTTP 415)."""
+
+
+class PayloadTooLarge(ValueError):
+    """Raised for payloads that decode to more than the caller allows (HTTP 413)."""
+
+
+def _check_decoded_size(size, max_bytes):
+    if max_bytes is not None and size > max_bytes:
+        raise PayloadTooLarge(f"Payload decodes to more than {max_bytes / (1024*1024):.2f}MB")
+
+
+def _read_npy_header(f):
+    """(shape, dtype) from an .npy header, leaving f at the start of the array data."""
+    version = np.lib.format.read_magic(f)
+    read_header = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                   else np.lib.format.read_array_header_2_0)
+    shape, _, dtype = read_header(f)
+    return shape, dtype
+
+
+def _npz_decoded_size(body):
+    """
+    Bytes an .npz body decodes to, read from its zip directory and .npy headers
+    without decompressing any array. np.load allocates each array from the shape
+    in its header before reading it, so both sizes count.
+    """
+    size = 0
+    try:
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            for member in archive.infolist():
+                with archive.open(member) as f:
+                    shape, dtype = _read_npy_header(f)
+                size += max(member.file_size, int(np.prod(shape, dtype=object)) * dtype.itemsize)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Invalid .npz payload: {e}")
+    return size
+
+
+def normalize_mime(content_type):
+    """Strips parameters and resolves aliases; empty content types mean JSON."""
+    mime = (content_type or JSON_MIME).split(';', 1)[0].strip().lower()
+    return MIME_ALIASES.get(mime, mime)
+
+
+def negotiate(accept_mimetypes, offered):
+    """Picks the response format from the Accept header, defaulting to JSON."""
+    return normalize_mime(accept_mimetypes.best_match([JSON_MIME] + offered, default=JSON_MIME))
+
+
+def _require_msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise UnsupportedFormat(f"{MSGPACK_MIME} requires the 'msgpack' package")
+    return msgpack
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc
+    except ImportError:
+        raise UnsupportedFormat(f"{ARROW_MIME} requires the 'pyarrow' package")
+    return pa
+
+
+def _array_to_msgpack(array):
+    array = np.ascontiguousarray(array)
+    return {"dtype": array.dtype.str, "shape": list(array.shape), "data": array.tobytes()}
+
+
+def _array_from_msgpack(value):
+    # Packed arrays are {"dtype", "shape", "data"}; plain lists are accepted too
+    if isinstance(value, dict):
+        dtype = np.dtype(value["dtype"])
+        if dtype.hasobject:
+            raise ValueError("Object arrays are not accepted")
+        return np.frombuffer(value["data"], dtype=dtype).reshape(value["shape"])
+    return np.asarray(value)
+
+
+def decode_columns(body, mime, max_bytes=None):
+    """
+    Decodes a columnar payload into a {name: 1-D array} dict.
+
+    Args:
+        max_bytes: Largest total size the arrays may decode to (None: no limit)
+    """
+    if mime == NPZ_MIME:
+        if max_bytes is not None:
+            _check_decoded_size(_npz_decoded_size(body), max_bytes)
+        with np.load(io.BytesIO(body), allow_pickle=False) as arrays:
+            return {name: arrays[name] for name in arrays.files}
+    if mime == MSGPACK_MIME:
+        msgpack = _require_msgpack()
+        payload = msgpack.unpackb(body, raw=False)
+        if not isinstance(payload, dict):
+            raise ValueError("msgpack payload must be a map of column name to array")
+        return {name: _array_from_msgpack(value) for name, value in payload.items()}
+    if mime == ARROW_MIME:
+        pa = _require_pyarrow()
+        reader = pa.ipc.open_stream(pa.BufferReader(body))
+        batches, size = [], 0
+        # Batch by batch: a compressed stream is decoded at most one record batch past the cap
+        for batch in reader:
+            size += batch.nbytes
+            _check_decoded_size(size, max_bytes)
+            batches.append(batch)
+        table = pa.Table.from_batches(batches, schema=reader.schema)
+        return {name: table.column(name).to_numpy() for name in table.column_names}
+    raise UnsupportedFormat(f"Unsupported columnar format: {mime}")
+
+
+def encode_columns(columns, mime):
+    """Encodes a {name: 1-D array} dict in the requested format."""
+    if mime == NPZ_MIME:
+        buffer = io.BytesIO()
+        np.savez(buffer, **columns)
+        return buffer.getvalue()
+    if mime == MSGPACK_MIME:
+        msgpack = _require_msgpack()
+        return msgpack.packb({name: _array_to_msgpack(array) for name, array in columns.items()})
+    if mime == ARROW_MIME:
+        pa = _require_pyarrow()
+        table = pa.table({name: np.asarray(array) for name, array in columns.items()})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    raise UnsupportedFormat(f"Unsupported columnar format: {mime}")
+
+
+def decode_tensor(body, mime, name='images', max_bytes=None):
+    """Decodes a single array payload (.npy, or the `name` entry of .npz/msgpack), capped like decode_columns."""
+    if mime == NPY_MIME:
+        # np.load allocates the array from the shape in the header before reading any data,
+        # so the header is checked against the cap and against the bytes actually sent
+        f = io.BytesIO(body)
+        try:
+            shape, dtype = _read_npy_header(f)
+        except ValueError as e:
+            raise ValueError(f"Invalid .npy payload: {e}")
+        size = int(np.prod(shape, dtype=object)) * dtype.itemsize
+        _check_decoded_size(size, max_bytes)
+        if size > len(body) - f.tell():
+            raise ValueError(".npy payload is shorter than the array its header declares")
+        return np.load(io.BytesIO(body), allow_pickle=False)
+    if mime in (NPZ_MIME, MSGPACK_MIME):
+        columns = decode_columns(body, mime, max_bytes=max_bytes)
+        if name not in columns:
+            raise ValueError(f"Payload has no '{name}' array")
+        return columns[name]
+    raise UnsupportedFormat(f"Unsupported tensor format: {mime}")
+
+
+def encode_arrays(arrays, mime):
+    """Encodes named arrays of any shape (.npz or msgpack)."""
+    if mime in (NPZ_MIME, MSGPACK_MIME):
+        return encode_columns(arrays, mime)
+    raise UnsupportedFormat(f"Unsupported tensor format: {mime}")
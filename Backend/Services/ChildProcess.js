@@ -11,3 +11,16 @@ export const predictService = async (request) => {
     throw new Error("Failed to connect to Flask server");
   }
 };
+
+export const predictBatchService = async (records) => {
+  try {
+    const response = await axios.post(
+      "http://127.0.0.1:5000/farmer/predict/batch",
+      { records }
+    );
+    return response.data;
+  } catch (error) {
+    console.error("❌ Flask communication error:", error.message);
+    throw new Error("Failed to connect to Flask server");
+  }
+};
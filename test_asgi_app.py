@@ -0,0 +1,187 @@
+"""
+Tests for the ASGI serving mode (AI-Models/asgi_app.py).
+
+Drives WSGIBridge directly with fake ASGI receive/send callables: request
+bodies sent in several chunks, clients disconnecting mid-body (the handler
+must not run on a partial body), the 413 cap, and the backpressure that
+stops reading a streamed body while its handler is behind.
+
+Usage:
+    python test_asgi_app.py
+    python -m pytest test_asgi_app.py
+"""
+import os
+import sys
+import asyncio
+import threading
+
+AI_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AI-Models')
+sys.path.insert(0, AI_MODELS_DIR)
+# Importing asgi_app imports app.py: no file watcher or background model loads for these tests
+os.environ.setdefault('SKYACRE_WATCH_MODELS', '0')
+os.environ.setdefault('SKYACRE_PRELOAD_MODELS', '')
+
+import asgi_app
+from asgi_app import WSGIBridge
+
+STREAM_PATH = '/farmer/predict/stream'
+
+
+def http_scope(path, headers=()):
+    return {
+        "type": "http", "method": "POST", "path": path, "query_string": b"", "root_path": "",
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+        "http_version": "1.1", "scheme": "http", "server": ("testserver", 80), "client": ("127.0.0.1", 1234)
+    }
+
+
+def body_messages(chunks, disconnect=False):
+    """http.request messages for the chunks, the last one ending the body unless the client disconnects."""
+    messages = [{"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks]
+    if disconnect:
+        messages.append({"type": "http.disconnect"})
+    else:
+        messages[-1]["more_body"] = False
+    return messages
+
+
+class FakeConnection:
+    """receive()/send() for one request: plays the given messages, records what the app sends."""
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.receives = 0
+        self.sent = []
+
+    async def receive(self):
+        self.receives += 1
+        if self.messages:
+            return self.messages.pop(0)
+        # Past the end of the request: a real server only reports the disconnect when it happens
+        await asyncio.Event().wait()
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    @property
+    def status(self):
+        return next((m["status"] for m in self.sent if m["type"] == "http.response.start"), None)
+
+    @property
+    def body(self):
+        return b"".join(m.get("body", b"") for m in self.sent if m["type"] == "http.response.body")
+
+
+def echo_app(calls):
+    """WSGI app answering with the request body it read, and its CONTENT_LENGTH in a header."""
+    def app(environ, start_response):
+        calls.append(environ)
+        body = environ["wsgi.input"].read()
+        start_response("200 OK", [("Content-Type", "application/octet-stream"),
+                                  ("X-Content-Length", environ.get("CONTENT_LENGTH", ""))])
+        return [body]
+    return app
+
+
+def run(bridge, scope, connection):
+    asyncio.run(bridge(scope, connection.receive, connection.send))
+    return connection
+
+
+def test_chunked_body_is_reassembled():
+    calls = []
+    bridge = WSGIBridge(echo_app(calls), max_workers=2)
+    # No Content-Length, and past the in-memory spool size
+    chunks = [bytes([i]) * (asgi_app.SPOOL_BYTES // 2 + 1) for i in range(3)]
+    connection = run(bridge, http_scope('/echo'), FakeConnection(body_messages(chunks)))
+    assert connection.status == 200
+    assert connection.body == b"".join(chunks)
+    assert calls[0]["CONTENT_LENGTH"] == str(sum(len(chunk) for chunk in chunks))
+
+
+def test_disconnect_mid_body_does_not_run_handler():
+    calls = []
+    bridge = WSGIBridge(echo_app(calls), max_workers=2)
+    connection = run(bridge, http_scope('/echo'), FakeConnection(body_messages([b"partial"], disconnect=True)))
+    assert calls == []
+    assert connection.sent == []
+
+
+def test_oversized_chunked_body_is_rejected():
+    calls = []
+    bridge = WSGIBridge(echo_app(calls), max_workers=2, max_body_bytes=1000)
+    connection = run(bridge, http_scope('/echo'), FakeConnection(body_messages([b"x" * 600, b"x" * 600])))
+    assert connection.status == 413
+    assert calls == []
+    # Rejected from the Content-Length alone, before any body is read
+    connection = run(bridge, http_scope('/echo', [("content-length", "5000")]), FakeConnection(body_messages([b"x"])))
+    assert connection.status == 413 and connection.receives == 0
+
+
+def test_streamed_body_applies_backpressure():
+    handler_started, release = threading.Event(), threading.Event()
+
+    def slow_app(environ, start_response):
+        handler_started.set()
+        release.wait(10)
+        body = environ["wsgi.input"].read()
+        start_response("200 OK", [("Content-Type", "application/octet-stream")])
+        return [body]
+
+    bridge = WSGIBridge(slow_app, max_workers=2, stream_queue_chunks=4)
+    chunks = [bytes([i]) * 10 for i in range(20)]
+    connection = FakeConnection(body_messages(chunks))
+
+    async def scenario():
+        request = asyncio.ensure_future(bridge(http_scope(STREAM_PATH), connection.receive, connection.send))
+        while not handler_started.is_set():
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.2)
+        # Four chunks queued, the fifth received and waiting for a free slot
+        receives_while_blocked = connection.receives
+        release.set()
+        await request
+        return receives_while_blocked
+
+    assert asyncio.run(scenario()) == 5
+    assert connection.status == 200
+    assert connection.body == b"".join(chunks)
+    assert connection.receives == len(chunks)
+
+
+def test_streamed_disconnect_aborts_handler():
+    outcome = {}
+
+    def reading_app(environ, start_response):
+        try:
+            environ["wsgi.input"].read()
+        except asgi_app.ClientDisconnected as e:
+            outcome["error"] = e
+            raise
+        outcome["read"] = True
+        start_response("200 OK", [])
+        return [b""]
+
+    bridge = WSGIBridge(reading_app, max_workers=2)
+    connection = run(bridge, http_scope(STREAM_PATH), FakeConnection(body_messages([b'{"a": 1}\n'], disconnect=True)))
+    assert "read" not in outcome and "error" in outcome
+    assert connection.sent == []
+
+
+def test_flask_app_through_bridge():
+    connection = FakeConnection(body_messages([b""]))
+    connection.messages[0]["more_body"] = False
+    scope = dict(http_scope('/'), method="GET")
+    run(asgi_app.app, scope, connection)
+    assert connection.status == 200
+    assert connection.body == b"SkyAcre AI Prediction API is running!"
+
+
+if __name__ == "__main__":
+    test_chunked_body_is_reassembled()
+    test_disconnect_mid_body_does_not_run_handler()
+    test_oversized_chunked_body_is_rejected()
+    test_streamed_body_applies_backpressure()
+    test_streamed_disconnect_aborts_handler()
+    test_flask_app_through_bridge()
+    print("ASGI bridge tests passed.")
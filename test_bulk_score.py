@@ -0,0 +1,90 @@
+"""
+Tests for the offline bulk scorer's output handling (AI-Models/bulk_score.py).
+
+A resumed run must not repeat rows that were already written (including a
+chunk that was only half written when the run stopped), and a fresh run must
+replace earlier output rather than mix with it.
+
+Usage:
+    python test_bulk_score.py
+    python -m pytest test_bulk_score.py
+"""
+import os
+import sys
+import tempfile
+import pandas as pd
+
+AI_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AI-Models')
+sys.path.insert(0, AI_MODELS_DIR)
+
+import bulk_score
+
+DATASET_PATH = os.path.join(AI_MODELS_DIR, 'Data', 'Processed', 'Crop and fertilizer dataset.csv')
+ROWS = 60
+CHUNKSIZE = 20
+
+
+def write_input(tmp_dir):
+    path = os.path.join(tmp_dir, 'surveys.csv')
+    pd.read_csv(DATASET_PATH, nrows=ROWS).to_csv(path, index=False)
+    return path
+
+
+def score(input_path, output_path, start_row=0):
+    return bulk_score.bulk_score(input_path, output_path, workers=1, chunksize=CHUNKSIZE, start_row=start_row)
+
+
+def test_resume_after_interrupted_write_keeps_rows_once():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = write_input(tmp_dir)
+        expected_path = os.path.join(tmp_dir, 'expected.csv')
+        score(input_path, expected_path)
+        expected = open(expected_path, 'rb').read()
+
+        # A run that stopped part way through writing its second chunk (rows 20-39)
+        output_path = os.path.join(tmp_dir, 'predictions.csv')
+        lines = expected.splitlines(keepends=True)
+        with open(output_path, 'wb') as f:
+            f.write(b''.join(lines[:1 + 30]) + lines[31][:10])
+        assert score(input_path, output_path, start_row=20) == ROWS - 20
+        assert open(output_path, 'rb').read() == expected
+
+        # Resuming past the rows actually written would leave a gap
+        with open(output_path, 'wb') as f:
+            f.write(b''.join(lines[:1 + 10]))
+        try:
+            score(input_path, output_path, start_row=20)
+        except ValueError as e:
+            assert '--start-row 10' in str(e)
+        else:
+            raise AssertionError("a resume that skips rows 10-19 was accepted")
+
+
+def test_fresh_run_replaces_earlier_output():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = write_input(tmp_dir)
+        output_path = os.path.join(tmp_dir, 'predictions.parquet')
+        score(input_path, output_path)
+        # Parts left by an earlier run over a longer input
+        stale = pd.read_parquet(os.path.join(output_path, 'part-000000000000.parquet'))
+        for first_row in (60, 80):
+            stale.assign(row=stale['row'] + first_row).to_parquet(
+                os.path.join(output_path, f"part-{first_row:012d}.parquet"), index=False)
+        assert score(input_path, output_path) == ROWS
+        assert sorted(os.listdir(output_path)) == [f"part-{row:012d}.parquet" for row in (0, 20, 40)]
+        assert pd.read_parquet(output_path)['row'].tolist() == list(range(ROWS))
+
+        # Resuming keeps the parts before start_row and rewrites the rest
+        assert score(input_path, output_path, start_row=40) == 20
+        assert pd.read_parquet(output_path)['row'].tolist() == list(range(ROWS))
+
+        csv_path = os.path.join(tmp_dir, 'predictions.csv')
+        score(input_path, csv_path)
+        score(input_path, csv_path)
+        assert pd.read_csv(csv_path)['row'].tolist() == list(range(ROWS))
+
+
+if __name__ == "__main__":
+    test_resume_after_interrupted_write_keeps_rows_once()
+    test_fresh_run_replaces_earlier_output()
+    print("Bulk scorer tests passed.")
@@ -0,0 +1,96 @@
+"""
+Tests for the bulk crop/fertilizer endpoints (AI-Models/app.py):
+/farmer/predict/batch and /farmer/predict/stream.
+
+Both answer per row: a record that can't be scored (missing or non-numeric
+features, NaN or Infinity, unknown labels) gets its own error entry and the
+rest of the request is scored as usual.
+
+Usage:
+    python test_fertilizer_endpoints.py
+    python -m pytest test_fertilizer_endpoints.py
+"""
+import os
+import sys
+import json
+
+AI_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AI-Models')
+sys.path.insert(0, AI_MODELS_DIR)
+# Importing app.py: no file watcher or background model loads for these tests
+os.environ.setdefault('SKYACRE_WATCH_MODELS', '0')
+os.environ.setdefault('SKYACRE_PRELOAD_MODELS', '')
+
+import app
+
+RECORD = {"District": "Kolhapur", "Soil_color": "Black", "Nitrogen": 75, "Phosphorus": 50,
+          "Potassium": 100, "pH": 6.5, "Rainfall": 1000, "Temperature": 20}
+
+
+def post_json_text(client, path, text):
+    """POSTs raw JSON text, so NaN/Infinity literals reach the server as Python's parser reads them."""
+    return client.post(path, data=text, content_type='application/json')
+
+
+def stream_lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_batch_rejects_non_finite_rows_individually():
+    client = app.app.test_client()
+    body = "[" + ", ".join([
+        json.dumps(RECORD),
+        json.dumps(dict(RECORD, Nitrogen="__INF__")).replace('"__INF__"', 'Infinity'),
+        json.dumps(dict(RECORD, pH="__NAN__")).replace('"__NAN__"', 'NaN'),
+        json.dumps(RECORD),
+    ]) + "]"
+    response = post_json_text(client, '/farmer/predict/batch', body)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    results = response.get_json()["predictions"]
+    assert len(results) == 4
+    assert results[1] == {"error": "Features must be finite numbers."}
+    assert results[2] == {"error": "Features must be finite numbers."}
+    assert results[0] == results[3] and "predicted_crop" in results[0]
+
+
+def test_stream_answers_every_line_after_a_bad_one():
+    lines = [json.dumps(RECORD)] * 5
+    lines[1] = json.dumps(dict(RECORD, Nitrogen="__INF__")).replace('"__INF__"', 'Infinity')
+    lines[3] = "{not json"
+    original_chunk_rows = app.STREAM_CHUNK_ROWS
+    app.STREAM_CHUNK_ROWS = 2
+    try:
+        response = app.app.test_client().post('/farmer/predict/stream', data="\n".join(lines) + "\n",
+                                              content_type='application/x-ndjson')
+        results = stream_lines(response)
+    finally:
+        app.STREAM_CHUNK_ROWS = original_chunk_rows
+    assert [result["line"] for result in results] == [1, 2, 3, 4, 5]
+    assert results[1]["error"] == "Features must be finite numbers."
+    assert results[3]["error"] == "Invalid JSON."
+    assert all("predicted_crop" in results[i] for i in (0, 2, 4))
+
+
+def test_stream_chunk_that_fails_to_score_becomes_error_lines():
+    fert = app.registry.get("fertilizer")
+
+    class FailingTree:
+        def predict(self, features):
+            raise RuntimeError("tree unavailable")
+
+    chunk = [(1, RECORD, None), (2, None, "Invalid JSON."), (3, RECORD, None)]
+    original_model = fert.dt_model
+    fert.dt_model = FailingTree()
+    try:
+        results = [json.loads(line) for line in app.score_ndjson_chunk(fert, chunk)]
+    finally:
+        fert.dt_model = original_model
+    assert results == [{"line": 1, "error": "Prediction failed: tree unavailable"},
+                       {"line": 2, "error": "Invalid JSON."},
+                       {"line": 3, "error": "Prediction failed: tree unavailable"}]
+
+
+if __name__ == "__main__":
+    test_batch_rejects_non_finite_rows_individually()
+    test_stream_answers_every_line_after_a_bad_one()
+    test_stream_chunk_that_fails_to_score_becomes_error_lines()
+    print("Fertilizer endpoint tests passed.")
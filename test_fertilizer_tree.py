@@ -0,0 +1,110 @@
+"""
+Parity test for the compiled fertilizer tree (AI-Models/fertilizer_tree.py).
+
+Checks that the NumPy node arrays give exactly the same (crop, fertilizer)
+codes as the pickled DecisionTreeClassifier, on the training dataset and on
+random inputs, for both the single-row and the vectorized traversal, and that
+the encoders and label maps exported with them match the pickles without
+scikit-learn being imported.
+
+Usage:
+    python test_fertilizer_tree.py
+    python -m pytest test_fertilizer_tree.py
+"""
+import os
+import sys
+import tempfile
+import subprocess
+import joblib
+import numpy as np
+import pandas as pd
+
+AI_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AI-Models')
+sys.path.insert(0, AI_MODELS_DIR)
+
+from fertilizer_tree import CompiledFertilizerTree, export_tree, load_lookups
+
+MODEL_DIR = os.path.join(AI_MODELS_DIR, 'Models')
+DATASET_PATH = os.path.join(AI_MODELS_DIR, 'Data', 'Processed', 'Crop and fertilizer dataset.csv')
+
+
+def load_dataset_features():
+    """Encodes the processed dataset exactly like app.py does."""
+    data = pd.read_csv(DATASET_PATH)
+    encoder_district = joblib.load(os.path.join(MODEL_DIR, 'encoder_district.pkl'))
+    encoder_soil = joblib.load(os.path.join(MODEL_DIR, 'encoder_soil.pkl'))
+    return np.column_stack((
+        encoder_district.transform(data['District_Name']),
+        encoder_soil.transform(data['Soil_color']),
+        data[['Nitrogen', 'Phosphorus', 'Potassium', 'pH', 'Rainfall', 'Temperature']].values
+    ))
+
+
+def random_features(n, seed=42):
+    """Random rows covering (and exceeding) the dataset's value ranges."""
+    rng = np.random.default_rng(seed)
+    return np.column_stack((
+        rng.integers(0, 5, n), rng.integers(0, 7, n),
+        rng.uniform(0, 250, (n, 3)), rng.uniform(3, 10, n),
+        rng.uniform(0, 2500, n), rng.uniform(0, 50, n)
+    ))
+
+
+def compiled_from_pickle(model):
+    """Exports the model to a temporary file and loads it back."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'tree.npz')
+        export_tree(model, path)
+        return CompiledFertilizerTree.load(path)
+
+
+def test_compiled_tree_matches_pickle():
+    model = joblib.load(os.path.join(MODEL_DIR, 'skyacre_fertilizer_model.pkl'))
+    compiled = compiled_from_pickle(model)
+
+    for X in (load_dataset_features(), random_features(50000)):
+        expected = model.predict(X)
+        # Vectorized traversal
+        np.testing.assert_array_equal(compiled.predict(X), expected)
+        # Row-by-row traversal used for small batches
+        np.testing.assert_array_equal(np.vstack([compiled.predict(row[None, :]) for row in X[:500]]), expected[:500])
+
+
+def test_shipped_tree_is_up_to_date():
+    model = joblib.load(os.path.join(MODEL_DIR, 'skyacre_fertilizer_model.pkl'))
+    shipped = CompiledFertilizerTree.load(os.path.join(MODEL_DIR, 'skyacre_fertilizer_tree.npz'))
+    X = random_features(20000, seed=7)
+    np.testing.assert_array_equal(shipped.predict(X), model.predict(X))
+
+
+def test_shipped_lookups_match_pickles():
+    lookups = load_lookups(os.path.join(MODEL_DIR, 'skyacre_fertilizer_tree.npz'))
+    assert lookups is not None, "Re-run fertilizer_tree.py to export the encoders and label maps"
+    for name in ('encoder_district', 'encoder_soil'):
+        encoder = joblib.load(os.path.join(MODEL_DIR, f'{name}.pkl'))
+        assert lookups[name].classes_.tolist() == encoder.classes_.tolist()
+        np.testing.assert_array_equal(lookups[name].transform(encoder.classes_), encoder.transform(encoder.classes_))
+    for name in ('map_crops', 'map_fertilizers'):
+        mapping = joblib.load(os.path.join(MODEL_DIR, f'{name}.pkl'))
+        assert lookups[name].tolist() == [[str(label), int(code)] for label, code in mapping]
+
+
+def test_compiled_backend_loads_without_sklearn():
+    # A fresh interpreter, since this test module itself imports sklearn through joblib.load
+    code = (
+        "import sys, app\n"
+        "fert = app.load_fertilizer_models()\n"
+        "assert fert.encoder_district.transform(['Pune']).tolist() == [1]\n"
+        "assert 'sklearn' not in sys.modules, 'sklearn was imported'\n"
+    )
+    env = dict(os.environ, SKYACRE_FERTILIZER_BACKEND='compiled', SKYACRE_WATCH_MODELS='0', SKYACRE_PRELOAD_MODELS='')
+    result = subprocess.run([sys.executable, '-c', code], cwd=AI_MODELS_DIR, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+if __name__ == "__main__":
+    test_compiled_tree_matches_pickle()
+    test_shipped_tree_is_up_to_date()
+    test_shipped_lookups_match_pickles()
+    test_compiled_backend_loads_without_sklearn()
+    print("Compiled fertilizer tree matches the pickled DecisionTreeClassifier.")
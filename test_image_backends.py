@@ -0,0 +1,137 @@
+"""
+Tests for the image model serving backends (AI-Models/image_inference.py) on
+models exported by AI-Models/export_model.py.
+
+A tiny Keras CNN is exported to dynamic-range and full-integer .tflite (and
+.onnx when tf2onnx and onnxruntime are installed) and served through
+load_image_model(). Batches must give the same outputs as one image at a
+time, the TFLite interpreter is resized to each batch size, a graph that
+can't be resized falls back to one image per invoke, and ServingModel chunks
+batches larger than its max_batch_size.
+
+Usage:
+    python test_image_backends.py
+    python -m pytest test_image_backends.py
+"""
+import os
+import sys
+import tempfile
+import numpy as np
+
+AI_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AI-Models')
+sys.path.insert(0, AI_MODELS_DIR)
+
+from image_inference import ServingModel, TFLiteModel, load_image_model
+from export_model import convert_tflite, export_onnx
+
+IMAGE_SHAPE = (16, 16, 3)
+N_CLASSES = 3
+
+_models = {}
+
+
+def tiny_cnn():
+    """A small softmax CNN with fixed weights, built once per test run."""
+    if "keras" not in _models:
+        import keras
+        keras.utils.set_random_seed(0)
+        _models["keras"] = keras.Sequential([
+            keras.Input(IMAGE_SHAPE),
+            keras.layers.Conv2D(4, 3, activation="relu"),
+            keras.layers.GlobalAveragePooling2D(),
+            keras.layers.Dense(N_CLASSES, activation="softmax"),
+        ])
+    return _models["keras"]
+
+
+def images(n, seed=0):
+    return np.random.default_rng(seed).random((n,) + IMAGE_SHAPE, dtype=np.float32)
+
+
+def export_tflite(tmp_dir, variant):
+    path = os.path.join(tmp_dir, f"model_{variant}.tflite")
+    with open(path, "wb") as f:
+        f.write(convert_tflite(tiny_cnn(), variant, calibration_images=images(32, seed=1)))
+    return path
+
+
+def one_at_a_time(model, batch):
+    return np.concatenate([model.predict(image[np.newaxis]) for image in batch])
+
+
+class UnresizableInterpreter:
+    """Forwards to a TFLite interpreter, but refuses any batch size other than 1 (like a fixed-shape graph)."""
+
+    def __init__(self, interpreter):
+        self._interpreter = interpreter
+
+    def resize_tensor_input(self, index, shape, *args, **kwargs):
+        if shape[0] != 1:
+            raise RuntimeError("fixed batch dimension")
+        return self._interpreter.resize_tensor_input(index, shape, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._interpreter, name)
+
+
+def test_tflite_batches_resize_the_interpreter():
+    expected = tiny_cnn().predict(images(7), verbose=0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for variant, tolerance in (("dynamic", 0.02), ("int8", 0.05)):
+            model = load_image_model(export_tflite(tmp_dir, variant))
+            assert isinstance(model, TFLiteModel) and model.input_shape == (None,) + IMAGE_SHAPE
+            batched = model.predict(images(7))
+            assert batched.shape == (7, N_CLASSES) and batched.dtype == np.float32
+            assert model._batch_size == 7
+            np.testing.assert_allclose(batched, one_at_a_time(model, images(7)), atol=1e-6)
+            assert model._batch_size == 1
+            np.testing.assert_allclose(batched, expected, atol=tolerance)
+            # Smaller and larger batches after that resize again
+            np.testing.assert_allclose(model.predict(images(7)[:3]), batched[:3], atol=1e-6)
+            np.testing.assert_allclose(model.predict(np.concatenate([images(7)] * 5)),
+                                       np.concatenate([batched] * 5), atol=1e-6)
+            assert model._batchable
+
+
+def test_tflite_falls_back_to_one_image_per_invoke():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model = TFLiteModel(export_tflite(tmp_dir, "dynamic"))
+        reference = one_at_a_time(model, images(5))
+        model._interpreter = UnresizableInterpreter(model._interpreter)
+        np.testing.assert_allclose(model.predict(images(5)), reference, atol=1e-6)
+        assert not model._batchable and model._batch_size == 1
+        # Later batches skip the resize attempt
+        np.testing.assert_allclose(model.predict(images(5)[:2]), reference[:2], atol=1e-6)
+
+
+def test_onnx_batches_match_keras():
+    try:
+        import onnxruntime  # noqa: F401
+        import tf2onnx  # noqa: F401
+    except ImportError:
+        print("onnxruntime/tf2onnx not installed; skipping the ONNX backend")
+        return
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "model.onnx")
+        export_onnx(tiny_cnn(), path)
+        model = load_image_model(path)
+        assert model.input_shape[1:] == IMAGE_SHAPE
+        batched = model.predict(images(6))
+        np.testing.assert_allclose(batched, one_at_a_time(model, images(6)), atol=1e-5)
+        np.testing.assert_allclose(batched, tiny_cnn().predict(images(6), verbose=0), atol=1e-4)
+
+
+def test_serving_model_chunks_large_batches():
+    model = ServingModel(tiny_cnn(), max_batch_size=4)
+    batch = images(10)
+    np.testing.assert_allclose(model.predict(batch), tiny_cnn().predict(batch, verbose=0), atol=1e-5)
+    # Other attributes are the Keras model's
+    assert model.count_params() == tiny_cnn().count_params()
+
+
+if __name__ == "__main__":
+    test_tflite_batches_resize_the_interpreter()
+    test_tflite_falls_back_to_one_image_per_invoke()
+    test_onnx_batches_match_keras()
+    test_serving_model_chunks_large_batches()
+    print("Image backend tests passed.")
@@ -0,0 +1,180 @@
+"""
+Tests for the image disease endpoints (AI-Models/app.py).
+
+Herd/flock screening (/predict/<model>/batch) is checked with a stand-in
+model registered as an extra version of the real model name, so the routes,
+upload checks, parallel decode and response cache run for real without
+loading TensorFlow: results are keyed by filename, rejected or corrupt files
+get their own error entry, and the valid images go through the model as one
+batch.
+
+The poultry model's wiring is checked end to end with a tiny Keras model
+saved where app.py looks for it: both poultry routes answer with its four
+labels, a missing artifact is a 503, and serve.py loads it after the fork.
+
+Usage:
+    python test_image_endpoints.py
+    python -m pytest test_image_endpoints.py
+"""
+import io
+import os
+import sys
+import tempfile
+import numpy as np
+from PIL import Image
+
+AI_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AI-Models')
+sys.path.insert(0, AI_MODELS_DIR)
+# Importing app.py: no file watcher or background model loads for these tests
+os.environ.setdefault('SKYACRE_WATCH_MODELS', '0')
+os.environ.setdefault('SKYACRE_PRELOAD_MODELS', '')
+
+import app
+import serve
+
+STUB_VERSION = "test-stub"
+
+
+class BrightnessModel:
+    """Predicts class (mean pixel brightness * n_classes), recording every batch size."""
+
+    def __init__(self, n_classes):
+        self.n_classes = n_classes
+        self.batch_sizes = []
+
+    def predict(self, images, verbose=0):
+        self.batch_sizes.append(len(images))
+        classes = np.minimum((images.reshape(len(images), -1).mean(axis=1) * self.n_classes).astype(int),
+                             self.n_classes - 1)
+        return np.eye(self.n_classes, dtype=np.float32)[classes]
+
+
+def stub_model(model_name):
+    """A BrightnessModel registered as ?version=test-stub of model_name (the default version is untouched)."""
+    model = BrightnessModel(len(app.IMAGE_MODELS[model_name]["labels"]))
+    app.registry.register(model_name, lambda: model, version=STUB_VERSION, default=False)
+    return model
+
+
+def png_bytes(gray_level, size=(32, 24)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (gray_level,) * 3).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def post_images(client, model_name, files, version=STUB_VERSION):
+    data = {'images': [(io.BytesIO(content), filename) for filename, content in files]}
+    return client.post(f'/predict/{model_name}/batch?version={version}', data=data,
+                       content_type='multipart/form-data')
+
+
+def test_herd_batch_scores_valid_images_in_one_pass():
+    model = stub_model("cow-disease")
+    client = app.app.test_client()
+    files = [
+        ("cow1.png", png_bytes(10)),               # dark: class 0
+        ("cow2.png", png_bytes(250)),              # bright: class 2
+        ("cow1.png", png_bytes(120)),              # same name: keyed cow1.png#2, class 1
+        ("notes.txt", b"not an image"),            # rejected by extension
+        ("cow3.jpg", b"MZ\x90\x00" * 16),          # rejected by content
+        ("cow4.png", b"\x89PNG\r\n\x1a\n" + b"\x00" * 32),  # PNG signature, undecodable
+    ]
+    response = post_images(client, "cow-disease", files)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    body = response.get_json()
+    predictions = body["predictions"]
+    assert set(predictions) == {"cow1.png", "cow2.png", "cow1.png#2", "notes.txt", "cow3.jpg", "cow4.png"}
+    assert body["count"] == 6 and body["failed"] == 3
+    assert predictions["cow1.png"]["predicted_class"] == "foot-and-mouth"
+    assert predictions["cow1.png#2"]["predicted_class"] == "lumpy"
+    assert predictions["cow2.png"]["predicted_class"] == "healthy"
+    assert predictions["cow2.png"]["confidence"] == 1.0
+    assert "Invalid file type" in predictions["notes.txt"]["error"]
+    assert "not a supported image" in predictions["cow3.jpg"]["error"]
+    assert "Invalid or corrupt image" in predictions["cow4.png"]["error"]
+    # The three decodable images went through the model together
+    assert model.batch_sizes == [3]
+
+    # Sent again: answered from the image cache without running the model
+    response = post_images(client, "cow-disease", files[:3])
+    assert response.status_code == 200
+    assert response.get_json()["predictions"]["cow2.png"]["predicted_class"] == "healthy"
+    assert model.batch_sizes == [3]
+
+
+def test_herd_batch_request_errors():
+    stub_model("cow-disease")
+    client = app.app.test_client()
+    response = client.post(f'/predict/cow-disease/batch?version={STUB_VERSION}', data={},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+
+    original_limit = app.MAX_UPLOAD_IMAGES
+    app.MAX_UPLOAD_IMAGES = 2
+    try:
+        response = post_images(client, "cow-disease", [(f"cow{i}.png", png_bytes(i)) for i in range(3)])
+    finally:
+        app.MAX_UPLOAD_IMAGES = original_limit
+    assert response.status_code == 413
+    assert "Too many images" in response.get_json()["error"]
+
+    response = post_images(client, "cow-disease", [("cow.png", png_bytes(0))], version="no-such-version")
+    assert response.status_code == 404
+    assert "Unknown model" in response.get_json()["error"]
+
+
+def save_tiny_poultry_model(path):
+    """A small untrained 224x224 RGB -> 4-class softmax CNN, saved as .keras."""
+    import keras
+    keras.Sequential([
+        keras.Input((app.IMAGE_SIZE[1], app.IMAGE_SIZE[0], 3)),
+        keras.layers.Conv2D(4, 3, strides=8, activation="relu"),
+        keras.layers.GlobalAveragePooling2D(),
+        keras.layers.Dense(len(app.POULTRY_DISEASE_CLASS_LABELS), activation="softmax"),
+    ]).save(path)
+
+
+def test_poultry_model_is_served_on_its_routes():
+    client = app.app.test_client()
+    labels = set(app.POULTRY_DISEASE_CLASS_LABELS.values())
+    original_paths = app.POULTRY_MODEL_PATHS
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'poultry_disease_model.keras')
+        app.POULTRY_MODEL_PATHS = [path]
+        app.registry.unload("poultry-disease")
+        try:
+            # No artifact yet: the route says the model is unavailable
+            response = client.post('/predict/poultry-disease', data={'image': (io.BytesIO(png_bytes(90)), 'f.png')},
+                                   content_type='multipart/form-data')
+            assert response.status_code == 503
+            assert response.get_json()["error"] == "Poultry disease model is not available."
+
+            save_tiny_poultry_model(path)
+            app.registry.unload("poultry-disease")
+            response = client.post('/predict/poultry-disease', data={'image': (io.BytesIO(png_bytes(90)), 'f.png')},
+                                   content_type='multipart/form-data')
+            assert response.status_code == 200, response.get_data(as_text=True)
+            result = response.get_json()
+            assert set(result["all_predictions"]) == labels
+            assert result["predicted_class"] in labels
+
+            response = post_images(client, "poultry-disease", [("a.png", png_bytes(30)), ("b.png", png_bytes(200))],
+                                   version="1")
+            assert response.status_code == 200
+            predictions = response.get_json()["predictions"]
+            assert all(set(predictions[key]["all_predictions"]) == labels for key in ("a.png", "b.png"))
+            assert app.registry.status()["models"]["poultry-disease:1"]["state"] == "ready"
+        finally:
+            app.POULTRY_MODEL_PATHS = original_paths
+            app.registry.unload("poultry-disease")
+
+    # A CNN: serve.py loads it in each worker after the fork, not in the parent
+    assert serve.loads_tensorflow(app, "poultry-disease")
+    assert not serve.loads_tensorflow(app, "poultry-health")
+
+
+if __name__ == "__main__":
+    test_herd_batch_scores_valid_images_in_one_pass()
+    test_herd_batch_request_errors()
+    test_poultry_model_is_served_on_its_routes()
+    print("Image endpoint tests passed.")
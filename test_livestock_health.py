@@ -0,0 +1,160 @@
+"""
+Tests for the livestock health models (AI-Models/train_livestock.py) and
+their batch endpoints (AI-Models/app.py /predict/<species>-health/...).
+
+A small poultry forest is trained from a sample of the poultry dataset and
+served through the real routes: rows are scored in input order with
+condition names, invalid rows get their own error entry, binary columns come
+back as class codes, and unknown species, unknown versions and missing
+models get JSON errors.
+
+Usage:
+    python test_livestock_health.py
+    python -m pytest test_livestock_health.py
+"""
+import os
+import sys
+import json
+import tempfile
+import pandas as pd
+
+AI_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AI-Models')
+sys.path.insert(0, AI_MODELS_DIR)
+# Importing app.py: no file watcher or background model loads for these tests
+os.environ.setdefault('SKYACRE_WATCH_MODELS', '0')
+os.environ.setdefault('SKYACRE_PRELOAD_MODELS', '')
+
+import app
+import wire_formats
+import train_livestock
+
+FEATURES = train_livestock.SPECIES["poultry"]["features"]
+
+
+def train_sample_forest(tmp_dir, rows=2000):
+    """Trains a 10-tree poultry forest on a sample of the dataset; returns (artifact, path)."""
+    data_path = os.path.join(tmp_dir, 'poultry_sample.csv')
+    pd.read_csv(train_livestock.SPECIES["poultry"]["data"]).sample(rows, random_state=0).to_csv(data_path, index=False)
+    output_path = os.path.join(tmp_dir, 'skyacre_poultry_health_model.pkl')
+    artifact = train_livestock.train_species("poultry", data_path=data_path, output_path=output_path, n_estimators=10)
+    return artifact, output_path
+
+
+class served_poultry_model:
+    """Serves the artifact at path as poultry-health for the duration of a with-block."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self.original_path = app.livestock_model_path
+        app.livestock_model_path = lambda species: self.path
+        app.registry.unload("poultry-health")
+
+    def __exit__(self, *exc_info):
+        app.livestock_model_path = self.original_path
+        app.registry.unload("poultry-health")
+
+
+def record(**values):
+    row = {"ambient_temp": 26.3, "feed_intake_g": 107.1, "water_intake_ml": 241.9,
+           "mortality_rate": 5.88, "egg_production_rate": 77.8}
+    row.update(values)
+    return row
+
+
+def test_training_saves_an_artifact_app_can_load():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        artifact, path = train_sample_forest(tmp_dir)
+        assert artifact["features"] == FEATURES
+        assert "Healthy" in artifact["classes"] and "Coccidiosis" in artifact["classes"]
+        assert len(artifact["classes"]) == len(artifact["model"].classes_)
+        # Saved under the name app.py loads it from
+        assert os.path.basename(app.livestock_model_path("poultry")) == os.path.basename(
+            train_livestock.model_path("poultry"))
+        with served_poultry_model(path):
+            loaded = app.registry.get("poultry-health")
+            assert loaded["features"] == FEATURES
+            assert loaded["classes"].tolist() == artifact["classes"]
+
+
+def test_batch_scores_rows_in_order_with_per_row_errors():
+    client = app.app.test_client()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        artifact, path = train_sample_forest(tmp_dir)
+        with served_poultry_model(path):
+            schema = client.get('/predict/poultry-health/schema').get_json()
+            assert schema == {"features": FEATURES, "classes": artifact["classes"]}
+
+            body = json.dumps({"records": [
+                record(),
+                record(mortality_rate="__NAN__"),
+                {"ambient_temp": 25.0},
+                record(feed_intake_g="lots"),
+                "not a record",
+                record(ambient_temp=35.0),
+            ]}).replace('"__NAN__"', 'NaN')
+            response = client.post('/predict/poultry-health/batch', data=body, content_type='application/json')
+            assert response.status_code == 200, response.get_data(as_text=True)
+            result = response.get_json()
+            assert result["count"] == 6 and result["failed"] == 4
+            predictions = result["predictions"]
+            assert predictions[1] == {"error": "Features must be finite numbers."}
+            assert predictions[2]["error"].startswith("Missing features: feed_intake_g")
+            assert predictions[3]["error"].startswith("Features must be numbers")
+            assert predictions[4] == {"error": "Record must be a JSON object."}
+            expected = artifact["model"].predict_proba(pd.DataFrame([record(), record(ambient_temp=35.0)])[FEATURES]
+                                                       .to_numpy(dtype="float32"))
+            for prediction, probabilities in zip((predictions[0], predictions[5]), expected):
+                assert set(prediction["all_predictions"]) == set(artifact["classes"])
+                assert prediction["predicted_condition"] == artifact["classes"][probabilities.argmax()]
+                assert prediction["confidence"] == round(float(probabilities.max()), 4)
+
+            # Binary columns in, class codes (indexes into the schema's classes) out
+            columns = {name: [record()[name], float("inf")] for name in FEATURES}
+            response = client.post('/predict/poultry-health/batch',
+                                   data=wire_formats.encode_columns(columns, wire_formats.NPZ_MIME),
+                                   content_type=wire_formats.NPZ_MIME, headers={"Accept": wire_formats.NPZ_MIME})
+            assert response.status_code == 200
+            decoded = wire_formats.decode_columns(response.get_data(), wire_formats.NPZ_MIME)
+            assert decoded["valid"].tolist() == [True, False]
+            assert decoded["class_code"][1] == -1
+            assert schema["classes"][decoded["class_code"][0]] == predictions[0]["predicted_condition"]
+
+
+def test_request_errors_are_json():
+    client = app.app.test_client()
+    response = client.post('/predict/goat-health/batch', json=[record()])
+    assert response.status_code == 404 and "Unknown species" in response.get_json()["error"]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _, path = train_sample_forest(tmp_dir, rows=500)
+        with served_poultry_model(path):
+            # An unregistered ?version= is a 404 with a JSON body, not an HTML 500
+            for response in (client.post('/predict/poultry-health/batch?version=7', json=[record()]),
+                             client.get('/predict/poultry-health/schema?version=7')):
+                assert response.status_code == 404
+                assert "Unknown model" in response.get_json()["error"]
+
+            assert client.post('/predict/poultry-health/batch', json=[]).status_code == 400
+            assert client.post('/predict/poultry-health/batch', json={"rows": []}).status_code == 400
+            original_limit = app.MAX_BATCH_RECORDS
+            app.MAX_BATCH_RECORDS = 2
+            try:
+                response = client.post('/predict/poultry-health/batch', json=[record()] * 3)
+            finally:
+                app.MAX_BATCH_RECORDS = original_limit
+            assert response.status_code == 413
+
+        # No artifact: the model is unavailable
+        with served_poultry_model(os.path.join(tmp_dir, 'missing.pkl')):
+            response = client.post('/predict/poultry-health/batch', json=[record()])
+            assert response.status_code == 503
+            assert response.get_json()["error"] == "Poultry health model is not available."
+
+
+if __name__ == "__main__":
+    test_training_saves_an_artifact_app_can_load()
+    test_batch_scores_rows_in_order_with_per_row_errors()
+    test_request_errors_are_json()
+    print("Livestock health tests passed.")
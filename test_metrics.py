@@ -0,0 +1,118 @@
+"""
+Tests for the Prometheus metrics (AI-Models/metrics.py) and the API's /metrics
+endpoint (AI-Models/app.py).
+
+Checks the text format of counters, gauges and histograms, that requests,
+errors and inference calls are counted, and that the per-model gauges use
+the same model label as the inference histogram.
+
+Usage:
+    python test_metrics.py
+    python -m pytest test_metrics.py
+"""
+import os
+import sys
+
+AI_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AI-Models')
+sys.path.insert(0, AI_MODELS_DIR)
+# Importing app.py: no file watcher or background model loads for these tests
+os.environ.setdefault('SKYACRE_WATCH_MODELS', '0')
+os.environ.setdefault('SKYACRE_PRELOAD_MODELS', '')
+
+import app
+import metrics
+
+RECORD = {"District": "Kolhapur", "Soil_color": "Black", "Nitrogen": 75, "Phosphorus": 50,
+          "Potassium": 100, "pH": 6.5, "Rainfall": 1000, "Temperature": 20}
+
+
+def sample(text, name, **labels):
+    """The value of one series in a /metrics body, or None if it isn't there."""
+    for line in text.splitlines():
+        if line.startswith('#'):
+            continue
+        series, value = line.rsplit(' ', 1)
+        series_name, _, label_text = series.partition('{')
+        if series_name != name:
+            continue
+        pairs = dict(pair.split('=', 1) for pair in label_text.rstrip('}').split(',')) if label_text else {}
+        if {key: quoted.strip('"') for key, quoted in pairs.items()} == {key: str(label) for key, label in labels.items()}:
+            return float(value)
+    return None
+
+
+def scrape(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type == metrics.CONTENT_TYPE
+    return response.get_data(as_text=True)
+
+
+def test_metric_types_render():
+    counter = metrics.Counter("test_render_total", "Test counter", ["kind"])
+    counter.inc(kind="a")
+    counter.inc(2, kind="a")
+    metrics.Gauge("test_render_gauge", "Test gauge", ["kind"], function=lambda: {("a",): 1.5, ("b",): None})
+    histogram = metrics.Histogram("test_render_seconds", "Test histogram", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+    text = metrics.render()
+
+    assert "# TYPE test_render_total counter" in text
+    assert sample(text, "test_render_total", kind="a") == 3
+    assert sample(text, "test_render_gauge", kind="a") == 1.5
+    assert sample(text, "test_render_gauge", kind="b") is None  # no value yet: no series
+    assert sample(text, "test_render_seconds_bucket", le="0.1") == 1
+    assert sample(text, "test_render_seconds_bucket", le="1.0") == 2
+    assert sample(text, "test_render_seconds_bucket", le="+Inf") == 3
+    assert sample(text, "test_render_seconds_count") == 3
+    assert sample(text, "test_render_seconds_sum") == 5.55
+    try:
+        counter.inc(other="a")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("a counter accepted labels it doesn't have")
+
+
+def test_requests_errors_and_inference_are_counted():
+    client = app.app.test_client()
+    before = scrape(client)
+    ok = dict(endpoint="/farmer/predict", method="POST", status="200")
+    bad = dict(endpoint="/farmer/predict", method="POST", status="400")
+
+    # Inputs no other test sends, so neither is answered from the response cache
+    for phosphorus in (41.5, 42.5):
+        assert client.post('/farmer/predict', json=dict(RECORD, Phosphorus=phosphorus)).status_code == 200
+    assert client.post('/farmer/predict', json={"District": "Kolhapur"}).status_code == 400
+    after = scrape(client)
+
+    def delta(name, **labels):
+        return (sample(after, name, **labels) or 0) - (sample(before, name, **labels) or 0)
+
+    assert delta("skyacre_requests_total", **ok) == 2
+    assert delta("skyacre_requests_total", **bad) == 1
+    assert delta("skyacre_request_errors_total", endpoint="/farmer/predict", status="400") == 1
+    assert delta("skyacre_request_errors_total", endpoint="/farmer/predict", status="200") == 0
+    assert delta("skyacre_request_seconds_count", endpoint="/farmer/predict") == 3
+    assert delta("skyacre_inference_seconds_count", model="fertilizer") == 2
+    assert sample(after, "process_resident_memory_bytes") > 0
+
+
+def test_model_gauges_share_the_inference_model_label():
+    client = app.app.test_client()
+    assert client.post('/farmer/predict', json=dict(RECORD, Rainfall=1234)).status_code == 200
+    text = scrape(client)
+    assert sample(text, "skyacre_inference_seconds_count", model="fertilizer") >= 1
+    assert sample(text, "skyacre_model_loads", model="fertilizer", version="1") >= 1
+    assert sample(text, "skyacre_model_load_seconds", model="fertilizer", version="1") is not None
+    # Never "fertilizer:1" as a model label
+    assert 'model="fertilizer:1"' not in text
+
+
+if __name__ == "__main__":
+    test_metric_types_render()
+    test_requests_errors_and_inference_are_counted()
+    test_model_gauges_share_the_inference_model_label()
+    print("Metrics tests passed.")
@@ -0,0 +1,162 @@
+"""
+Tests for dynamic micro-batching (AI-Models/image_inference.py MicroBatcher).
+
+Uses a stand-in model that records the batch sizes it is called with, so no
+TensorFlow model is needed: concurrent callers share forward passes and each
+gets its own outputs back, batches stop at max_batch_size, a lone image waits
+at most max_wait_seconds, and different models (or a failing one) are kept
+apart. A failing on_batch callback doesn't stop batching, and a batching
+thread that died is restarted on the next call.
+
+Usage:
+    python test_micro_batcher.py
+    python -m pytest test_micro_batcher.py
+"""
+import os
+import sys
+import time
+import threading
+import numpy as np
+
+AI_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AI-Models')
+sys.path.insert(0, AI_MODELS_DIR)
+
+from image_inference import MicroBatcher
+
+IMAGE_SHAPE = (8, 8, 3)
+
+
+class RecordingModel:
+    """Returns [mean, offset] per image and records every batch size."""
+
+    def __init__(self, offset=0.0, seconds=0.0, error=None):
+        self.offset = offset
+        self.seconds = seconds
+        self.error = error
+        self.batch_sizes = []
+
+    def predict(self, images, verbose=0):
+        self.batch_sizes.append(len(images))
+        time.sleep(self.seconds)
+        if self.error is not None:
+            raise self.error
+        means = images.reshape(len(images), -1).mean(axis=1)
+        return np.column_stack((means, np.full(len(images), self.offset)))
+
+
+def images_of(*values):
+    return np.stack([np.full(IMAGE_SHAPE, value, dtype=np.float32) for value in values])
+
+
+def run_concurrently(calls):
+    """Runs each zero-argument callable in its own thread, all released at once; returns their results."""
+    results = [None] * len(calls)
+    barrier = threading.Barrier(len(calls))
+
+    def worker(index):
+        barrier.wait()
+        try:
+            results[index] = calls[index]()
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(len(calls))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_callers_share_forward_passes():
+    model = RecordingModel(seconds=0.01)
+    batcher = MicroBatcher(max_batch_size=32, max_wait_seconds=0.05)
+    results = run_concurrently([lambda value=value: batcher.predict(model, images_of(value)) for value in range(16)])
+    # Each caller gets the outputs of its own image, however the images were grouped
+    for value, result in enumerate(results):
+        np.testing.assert_allclose(result, [[value, 0.0]])
+    assert sum(model.batch_sizes) == 16
+    assert len(model.batch_sizes) < 16
+
+
+def test_batches_stop_at_max_batch_size():
+    model = RecordingModel()
+    batcher = MicroBatcher(max_batch_size=4, max_wait_seconds=0.05)
+    result = batcher.predict(model, images_of(*range(10)))
+    np.testing.assert_allclose(result[:, 0], np.arange(10))
+    assert model.batch_sizes == [4, 4, 2]
+
+
+def test_lone_image_waits_at_most_max_wait():
+    model = RecordingModel()
+    batcher = MicroBatcher(max_batch_size=32, max_wait_seconds=0.2)
+    batcher.predict(model, images_of(0))  # starts the batching thread
+    started = time.perf_counter()
+    batcher.predict(model, images_of(1))
+    elapsed = time.perf_counter() - started
+    assert 0.15 <= elapsed < 1.0
+    # Without a wait, a lone image runs right away
+    batcher = MicroBatcher(max_batch_size=32, max_wait_seconds=0)
+    batcher.predict(model, images_of(0))
+    started = time.perf_counter()
+    batcher.predict(model, images_of(1))
+    assert time.perf_counter() - started < 0.1
+
+
+def test_models_are_batched_separately():
+    cow, poultry = RecordingModel(offset=1.0, seconds=0.01), RecordingModel(offset=2.0, seconds=0.01)
+    batches = []
+    batcher = MicroBatcher(max_batch_size=32, max_wait_seconds=0.05,
+                           on_batch=lambda size, seconds, name: batches.append((name, size)))
+    calls = [lambda value=value: batcher.predict(cow, images_of(value), name="cow-disease") for value in range(6)]
+    calls += [lambda value=value: batcher.predict(poultry, images_of(value), name="poultry-disease") for value in range(6)]
+    results = run_concurrently(calls)
+    for index, result in enumerate(results):
+        np.testing.assert_allclose(result, [[index % 6, 1.0 if index < 6 else 2.0]])
+    assert sum(cow.batch_sizes) == sum(poultry.batch_sizes) == 6
+    assert {name for name, _ in batches} == {"cow-disease", "poultry-disease"}
+    assert sum(size for _, size in batches) == 12
+
+
+def test_failing_model_only_fails_its_callers():
+    healthy, broken = RecordingModel(seconds=0.01), RecordingModel(error=RuntimeError("inference failed"))
+    batcher = MicroBatcher(max_batch_size=32, max_wait_seconds=0.05)
+    results = run_concurrently([lambda: batcher.predict(broken, images_of(1)),
+                                lambda: batcher.predict(healthy, images_of(2))])
+    assert isinstance(results[0], RuntimeError)
+    np.testing.assert_allclose(results[1], [[2.0, 0.0]])
+    # The batching thread survives the failure
+    np.testing.assert_allclose(batcher.predict(healthy, images_of(3)), [[3.0, 0.0]])
+
+
+def test_failing_callback_and_dead_thread_do_not_block_callers():
+    def on_batch(size, seconds, name):
+        raise RuntimeError("metrics backend down")
+
+    model = RecordingModel()
+    batcher = MicroBatcher(max_batch_size=32, max_wait_seconds=0, on_batch=on_batch)
+    for value in range(3):
+        np.testing.assert_allclose(batcher.predict(model, images_of(value)), [[value, 0.0]])
+    first_thread = batcher._thread
+    assert first_thread.is_alive()
+
+    # SystemExit isn't an Exception: it ends the thread after the results are set
+    def exit_batching(size, seconds, name):
+        raise SystemExit
+    batcher.on_batch = exit_batching
+    np.testing.assert_allclose(batcher.predict(model, images_of(4)), [[4.0, 0.0]])
+    first_thread.join(5)
+    assert not first_thread.is_alive()
+    batcher.on_batch = None
+    np.testing.assert_allclose(batcher.predict(model, images_of(5)), [[5.0, 0.0]])
+    assert batcher._thread is not first_thread and batcher._thread.is_alive()
+
+
+if __name__ == "__main__":
+    test_concurrent_callers_share_forward_passes()
+    test_batches_stop_at_max_batch_size()
+    test_lone_image_waits_at_most_max_wait()
+    test_models_are_batched_separately()
+    test_failing_model_only_fails_its_callers()
+    test_failing_callback_and_dead_thread_do_not_block_callers()
+    print("Micro-batcher tests passed.")
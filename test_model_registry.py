@@ -0,0 +1,246 @@
+"""
+Tests for model loading, the registry and hot reload (AI-Models/model_loader.py,
+AI-Models/model_registry.py).
+
+Covers concurrent first use loading a model once, the memory budget's LRU
+eviction, retrying failed loads after a backoff, reloads that swap a warmed
+model in (or keep the current one when they fail), file watching, and the
+admin reload endpoint for loaded, failed and never-loaded models.
+
+Usage:
+    python test_model_registry.py
+    python -m pytest test_model_registry.py
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+import joblib
+import numpy as np
+
+AI_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AI-Models')
+sys.path.insert(0, AI_MODELS_DIR)
+# Importing app.py: no file watcher or background model loads for these tests
+os.environ.setdefault('SKYACRE_WATCH_MODELS', '0')
+os.environ.setdefault('SKYACRE_PRELOAD_MODELS', '')
+
+from model_loader import LazyModel
+from model_registry import ModelRegistry, estimate_model_bytes
+
+
+def wait_for(condition, timeout=5.0):
+    """Polls condition until it is true; False on timeout."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def write_file(path, content):
+    with open(path, 'w') as f:
+        f.write(content)
+    # A different size as well as mtime, so the change shows on filesystems with coarse timestamps
+    os.utime(path, ns=(time.time_ns(), time.time_ns()))
+
+
+def test_concurrent_first_use_loads_once():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.1)
+        return object()
+
+    registry = ModelRegistry()
+    registry.register("m", loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("m"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert len(results) == 8 and all(result is results[0] for result in results)
+
+
+def test_budget_evicts_least_recently_used():
+    loads = []
+
+    def loader(name):
+        loads.append(name)
+        return np.zeros(2**20, dtype=np.uint8)  # 1 MB
+
+    registry = ModelRegistry(memory_budget_bytes=int(2.5 * 2**20))
+    for name in "abc":
+        registry.register(name, lambda name=name: loader(name))
+    registry.get("a")
+    registry.get("b")
+    registry.get("a")  # "b" is now the least recently used
+    registry.get("c")
+    status = registry.status()
+    assert registry.evictions == 1
+    assert status["models"]["b:1"]["state"] == "not_loaded"
+    assert status["models"]["a:1"]["state"] == status["models"]["c:1"]["state"] == "ready"
+    assert status["memory_used_bytes"] == 2 * 2**20
+    # An evicted model loads again on its next use, evicting the next least recently used one
+    registry.get("b")
+    assert loads == ["a", "b", "c", "b"]
+    assert registry.status()["models"]["a:1"]["state"] == "not_loaded"
+
+
+def test_failed_load_is_retried_after_backoff():
+    attempts = []
+
+    def loader():
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise FileNotFoundError("model.pkl not found")
+        return "model"
+
+    model = LazyModel("m", loader, retry_seconds=0.1, max_retry_seconds=0.15)
+    assert model.get() is None and model.failed
+    assert model.get() is None and len(attempts) == 1  # within the backoff: no new attempt
+    assert model.status()["retry_in_seconds"] is not None
+    time.sleep(0.12)
+    assert model.get() is None and len(attempts) == 2
+    time.sleep(0.08)
+    assert model.get() is None and len(attempts) == 2  # backoff doubled (capped at 0.15s)
+    time.sleep(0.1)
+    assert model.get() == "model" and model.ready and model.error is None
+    assert len(attempts) == 3
+
+
+def test_reload_swaps_in_warmed_model_and_fingerprint():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'model.txt')
+        write_file(path, 'v1')
+        warming = threading.Event()
+        release = threading.Event()
+
+        def warmup(model):
+            if model == 'v2, retrained':
+                warming.set()
+                release.wait(5)
+
+        registry = ModelRegistry()
+        registry.register("m", lambda: open(path).read(), warmup=warmup, paths=[path])
+        assert registry.get("m") == 'v1'
+        fingerprint = registry.fingerprint("m")
+        write_file(path, 'v2, retrained')
+
+        reload = threading.Thread(target=registry.reload, args=("m",))
+        reload.start()
+        assert warming.wait(5)
+        # While the new model warms up, the old one is served under its own fingerprint
+        assert registry.get("m") == 'v1' and registry.fingerprint("m") == fingerprint
+        release.set()
+        reload.join()
+        assert registry.get("m") == 'v2, retrained'
+        assert registry.fingerprint("m") != fingerprint
+        assert registry.status()["models"]["m:1"]["reloads"] == 1
+
+
+def test_failed_reload_keeps_current_model():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'model.txt')
+        write_file(path, 'v1')
+
+        def loader():
+            content = open(path).read()
+            if content == 'corrupt':
+                raise ValueError("unreadable artifact")
+            return content
+
+        registry = ModelRegistry()
+        registry.register("m", loader, paths=[path])
+        registry.get("m")
+        fingerprint = registry.fingerprint("m")
+        write_file(path, 'corrupt')
+        assert registry.reload("m") is False
+        assert registry.get("m") == 'v1' and registry.fingerprint("m") == fingerprint
+
+
+def test_reload_loads_failed_model_and_skips_unloaded():
+    available = []
+    registry = ModelRegistry()
+    registry.register("m", lambda: available[0])
+    registry.register("idle", lambda: "idle")
+    assert registry.get("m") is None and registry.is_failed("m")
+    available.append("model")
+    # No waiting out the retry backoff: the reload loads it now
+    assert registry.reload("m") is True
+    assert registry.is_ready("m") and registry.get("m") == "model"
+    # Never loaded: its next get() reads the current files anyway
+    assert registry.reload("idle") is False
+    assert registry.status()["models"]["idle:1"]["state"] == "not_loaded"
+
+
+def test_watch_reloads_changed_files():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'model.txt')
+        write_file(path, 'v1')
+        reloaded = []
+        registry = ModelRegistry()
+        registry.register("m", lambda: open(path).read(), paths=[path])
+        registry.get("m")
+        registry.watch(interval=0.05, on_reload=lambda name, version: reloaded.append((name, version)))
+        write_file(path, 'v2, retrained')
+        assert wait_for(lambda: registry.get("m") == 'v2, retrained')
+        assert reloaded == [("m", "1")]
+
+
+def test_estimate_model_bytes_counts_arrays():
+    from sklearn.ensemble import RandomForestClassifier
+    X = np.random.default_rng(0).random((200, 4))
+    forest = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, X[:, 0] > 0.5)
+    tree_bytes = sum(tree.tree_.__getstate__()["nodes"].nbytes + tree.tree_.__getstate__()["values"].nbytes
+                     for tree in forest.estimators_)
+    assert estimate_model_bytes(forest) >= tree_bytes
+    artifact = {"model": forest, "features": ["a", "b", "c", "d"], "classes": np.array(["no", "yes"], dtype=object)}
+    assert estimate_model_bytes(artifact) >= tree_bytes
+    assert estimate_model_bytes({"weights": np.zeros(1000, dtype=np.float32)}) == 4000
+    # Nothing array-backed to count: the registry falls back to the RSS growth
+    assert estimate_model_bytes(object()) is None
+
+
+def test_admin_reload_endpoint():
+    import app
+    client = app.app.test_client()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'skyacre_poultry_health_model.pkl')
+        original_path = app.livestock_model_path
+        app.livestock_model_path = lambda species: path
+        try:
+            # The artifact isn't there yet: the load fails and is retried after a backoff
+            assert app.registry.get("poultry-health") is None
+            assert app.registry.is_failed("poultry-health")
+
+            from sklearn.ensemble import RandomForestClassifier
+            X = np.random.default_rng(0).random((100, 3))
+            joblib.dump({"model": RandomForestClassifier(n_estimators=3, random_state=0).fit(X, X[:, 0] > 0.5),
+                         "features": ["a", "b", "c"], "classes": ["healthy", "sick"]}, path)
+            response = client.post('/models/poultry-health/reload')
+            assert response.status_code == 202
+            assert wait_for(lambda: app.registry.is_ready("poultry-health"))
+        finally:
+            app.livestock_model_path = original_path
+            app.registry.unload("poultry-health")
+
+    assert client.post('/models/dairy-health/reload').status_code == 409
+    assert client.post('/models/no-such-model/reload').status_code == 404
+
+
+if __name__ == "__main__":
+    test_concurrent_first_use_loads_once()
+    test_budget_evicts_least_recently_used()
+    test_failed_load_is_retried_after_backoff()
+    test_reload_swaps_in_warmed_model_and_fingerprint()
+    test_failed_reload_keeps_current_model()
+    test_reload_loads_failed_model_and_skips_unloaded()
+    test_watch_reloads_changed_files()
+    test_estimate_model_bytes_counts_arrays()
+    test_admin_reload_endpoint()
+    print("Model registry tests passed.")
@@ -0,0 +1,158 @@
+"""
+Tests for the prediction response caches (AI-Models/response_cache.py).
+
+Covers the in-process ResponseCache (LRU order, size bound, TTL, model-file
+invalidation, the disk tier behind it), the SQLite tier shared by worker
+processes, and the /farmer/predict cache keyed on normalized inputs.
+
+Usage:
+    python test_response_cache.py
+    python -m pytest test_response_cache.py
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+
+AI_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AI-Models')
+sys.path.insert(0, AI_MODELS_DIR)
+# Importing app.py: no file watcher or background model loads for these tests
+os.environ.setdefault('SKYACRE_WATCH_MODELS', '0')
+os.environ.setdefault('SKYACRE_PRELOAD_MODELS', '')
+
+from response_cache import ResponseCache, SQLiteCache
+
+FARMER_PAYLOAD = {"District": "Kolhapur", "Soil_color": "Black", "Nitrogen": 75, "Phosphorus": 50,
+                  "Potassium": 100, "pH": 6.5, "Rainfall": 1000, "Temperature": 20}
+
+
+def test_lru_eviction_order():
+    cache = ResponseCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["size"] == 2
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_ttl_expiry():
+    cache = ResponseCache(max_size=10, ttl_seconds=0.05)
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResponseCache(max_size=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+
+
+def test_model_file_change_invalidates():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'model.pkl')
+        with open(path, 'wb') as f:
+            f.write(b'v1')
+        cache = ResponseCache(max_size=10, watched_paths=[path], check_interval=0)
+        cache.put("a", 1)
+        assert cache.get("a") == 1
+        with open(path, 'wb') as f:
+            f.write(b'v2, retrained')
+        assert cache.get("a") is None
+        assert cache.invalidations == 1
+
+
+def test_concurrent_puts_stay_bounded():
+    cache = ResponseCache(max_size=100)
+
+    def writer(offset):
+        for i in range(1000):
+            cache.put((offset, i), i)
+            cache.get((offset, i // 2))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats()["size"] == 100
+
+
+def test_sqlite_cache_is_shared_and_trimmed():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'cache.sqlite')
+        writer = SQLiteCache(path, max_size=5, trim_every=1)
+        for i in range(10):
+            writer.put(f"key{i}", {"prediction": i})
+        # A second instance stands in for another worker process opening the same file
+        reader = SQLiteCache(path)
+        assert reader.get("key9") == {"prediction": 9}
+        assert reader.get("key0") is None  # trimmed, least recently used first
+        assert reader.stats()["size"] == 5
+
+
+def test_sqlite_cache_expiry_and_threads():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = SQLiteCache(os.path.join(tmp_dir, 'cache.sqlite'), ttl_seconds=0.05)
+        cache.put("a", [1, 2])
+        # Each thread gets its own connection
+        results = []
+        thread = threading.Thread(target=lambda: results.append(cache.get("a")))
+        thread.start()
+        thread.join()
+        assert results == [[1, 2]]
+        time.sleep(0.1)
+        assert cache.get("a") is None
+        assert cache.errors == 0
+
+
+def test_memory_tier_fills_from_disk_tier():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        disk = SQLiteCache(os.path.join(tmp_dir, 'cache.sqlite'))
+        ResponseCache(max_size=10, backing=disk).put("a", {"class": "healthy"})
+        # A fresh in-process tier (another worker) misses in memory, hits on disk, then in memory
+        cache = ResponseCache(max_size=10, backing=disk)
+        assert cache.get("a") == {"class": "healthy"}
+        assert cache.get("a") == {"class": "healthy"}
+        assert (cache.hits, cache.misses, disk.hits) == (1, 1, 1)
+
+
+def test_farmer_predict_cache_key_is_normalized():
+    import app
+    key = app.fertilizer_cache_key(FARMER_PAYLOAD)
+    assert key == app.fertilizer_cache_key(dict(FARMER_PAYLOAD, Nitrogen="75", pH=6.50))
+    assert key != app.fertilizer_cache_key(dict(FARMER_PAYLOAD, Nitrogen=76))
+    assert app.fertilizer_cache_key(dict(FARMER_PAYLOAD, Nitrogen="lots")) is None
+    assert app.fertilizer_cache_key({"District": "Kolhapur"}) is None
+
+
+def test_farmer_predict_serves_repeats_from_cache():
+    import app
+    app.fertilizer_cache.clear()
+    client = app.app.test_client()
+    first = client.post('/farmer/predict', json=FARMER_PAYLOAD)
+    hits = app.fertilizer_cache.hits
+    second = client.post('/farmer/predict', json=dict(FARMER_PAYLOAD, Nitrogen="75.0"))
+    assert first.status_code == second.status_code == 200
+    assert second.get_json() == first.get_json()
+    assert app.fertilizer_cache.hits == hits + 1
+
+
+if __name__ == "__main__":
+    test_lru_eviction_order()
+    test_ttl_expiry()
+    test_disabled_cache_stores_nothing()
+    test_model_file_change_invalidates()
+    test_concurrent_puts_stay_bounded()
+    test_sqlite_cache_is_shared_and_trimmed()
+    test_sqlite_cache_expiry_and_threads()
+    test_memory_tier_fills_from_disk_tier()
+    test_farmer_predict_cache_key_is_normalized()
+    test_farmer_predict_serves_repeats_from_cache()
+    print("Response cache tests passed.")
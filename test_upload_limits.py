@@ -0,0 +1,229 @@
+"""
+Tests for request size limits and the binary wire formats (AI-Models/app.py,
+AI-Models/wire_formats.py).
+
+Checks that oversized bodies get a 413 whether their size is declared up
+front or only found while reading a chunked body, that image uploads are
+refused by size, extension and content before being decoded, that compressed
+.npz / Arrow payloads can't decode past the cap, and that every column
+format round-trips.
+
+Usage:
+    python test_upload_limits.py
+    python -m pytest test_upload_limits.py
+"""
+import io
+import os
+import sys
+import zipfile
+import numpy as np
+
+AI_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AI-Models')
+sys.path.insert(0, AI_MODELS_DIR)
+# Importing app.py: no file watcher or background model loads for these tests
+os.environ.setdefault('SKYACRE_WATCH_MODELS', '0')
+os.environ.setdefault('SKYACRE_PRELOAD_MODELS', '')
+
+import app
+import wire_formats
+from werkzeug.datastructures import FileStorage
+
+BATCH_PATH = '/farmer/predict/batch'
+BATCH_VIEW = 'predict_fertilizer_crop_batch'
+JPEG_HEADER = b"\xff\xd8\xff\xe0" + b"\x00" * 60
+
+
+def batch_columns(n):
+    """n valid /farmer/predict/batch rows as columns (District and Soil_color as encoder codes)."""
+    rng = np.random.default_rng(0)
+    return {
+        'District': rng.integers(0, 5, n), 'Soil_color': rng.integers(0, 7, n),
+        'Nitrogen': rng.uniform(20, 150, n), 'Phosphorus': rng.uniform(10, 100, n),
+        'Potassium': rng.uniform(10, 200, n), 'pH': rng.uniform(5, 8, n),
+        'Rainfall': rng.uniform(300, 1500, n), 'Temperature': rng.uniform(15, 35, n)
+    }
+
+
+class UnsizedStream(io.RawIOBase):
+    """Readable, non-seekable stream: the upload's size is only known once it is read."""
+
+    def __init__(self, content):
+        self._content = io.BytesIO(content)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._content.readinto(buffer)
+
+
+class patched:
+    """Temporarily sets attributes: with patched(obj, name=value): ..."""
+
+    def __init__(self, target, **values):
+        self.target = target
+        self.values = values
+
+    def __enter__(self):
+        self.saved = {name: getattr(self.target, name) for name in self.values}
+        for name, value in self.values.items():
+            setattr(self.target, name, value)
+
+    def __exit__(self, *exc_info):
+        for name, value in self.saved.items():
+            setattr(self.target, name, value)
+
+
+def post_chunked(client, path, body, content_type):
+    """POSTs body without a Content-Length, like a chunked upload (gunicorn and asgi_app.py mark those terminated)."""
+    return client.post(path, input_stream=io.BytesIO(body), content_type=content_type,
+                       headers={"Transfer-Encoding": "chunked"}, environ_overrides={"wsgi.input_terminated": True})
+
+
+def test_declared_size_over_limit_is_refused():
+    client = app.app.test_client()
+    with patched(app.app.view_functions[BATCH_VIEW], max_upload_bytes=1024):
+        response = client.post(BATCH_PATH, data=b"x" * 2048, content_type='application/json')
+    assert response.status_code == 413
+    # Image uploads: one file of at most 10MB plus multipart overhead
+    response = client.post('/predict/cow-disease', data=b"x" * (app.MAX_IMAGE_BYTES + app.UPLOAD_OVERHEAD_BYTES + 1),
+                           content_type='multipart/form-data; boundary=x')
+    assert response.status_code == 413
+
+
+def test_chunked_body_over_limit_is_refused():
+    client = app.app.test_client()
+    body = wire_formats.encode_columns(batch_columns(200), wire_formats.NPZ_MIME)
+    with patched(app.app.view_functions[BATCH_VIEW], max_upload_bytes=len(body) - 1):
+        assert post_chunked(client, BATCH_PATH, body, wire_formats.NPZ_MIME).status_code == 413
+    with patched(app.app.view_functions[BATCH_VIEW], max_upload_bytes=len(body)):
+        response = post_chunked(client, BATCH_PATH, body, wire_formats.NPZ_MIME)
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+
+def test_compressed_npz_cannot_decode_past_cap():
+    client = app.app.test_client()
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **{name: np.zeros(500000, dtype=np.float64) for name in app.FERTILIZER_FEATURES})
+    body = buffer.getvalue()
+    assert len(body) < 100000  # 32MB of zeros
+    with patched(app, MAX_BATCH_BYTES=8 * 1024 * 1024):
+        response = client.post(BATCH_PATH, data=body, content_type=wire_formats.NPZ_MIME)
+    assert response.status_code == 413
+
+
+def test_npz_header_larger_than_data_is_counted():
+    # A member whose .npy header claims far more than it holds: np.load would allocate the claim
+    header = io.BytesIO()
+    np.lib.format.write_array_header_1_0(header, {'descr': '<f8', 'fortran_order': False, 'shape': (10**9,)})
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('Nitrogen.npy', np.lib.format.MAGIC_PREFIX + b'\x01\x00' + header.getvalue()[8:] + b'\x00' * 64)
+    try:
+        wire_formats.decode_columns(buffer.getvalue(), wire_formats.NPZ_MIME, max_bytes=2**20)
+    except wire_formats.PayloadTooLarge:
+        pass
+    else:
+        raise AssertionError("an 8GB header claim was not refused")
+
+
+def test_npy_header_is_checked_before_allocating():
+    def npy(shape, data):
+        buffer = io.BytesIO()
+        np.lib.format.write_array_header_1_0(buffer, {'descr': '<f8', 'fortran_order': False, 'shape': shape})
+        return buffer.getvalue() + data
+
+    def decode(body):
+        return wire_formats.decode_tensor(body, wire_formats.NPY_MIME, max_bytes=2**20)
+
+    # A 100-byte body claiming petabytes: refused from the header, never allocated
+    try:
+        decode(npy((2**47, 3), b'\x00' * 64))
+    except wire_formats.PayloadTooLarge:
+        pass
+    else:
+        raise AssertionError("a petabyte header claim was not refused")
+    # Under the cap but longer than the data sent
+    try:
+        decode(npy((1000,), b'\x00' * 64))
+    except wire_formats.PayloadTooLarge:
+        raise AssertionError("a short body is a bad request, not a large one")
+    except ValueError as e:
+        assert 'shorter' in str(e)
+    else:
+        raise AssertionError("a header claiming more than the body holds was accepted")
+    np.testing.assert_array_equal(decode(npy((8,), b'\x00' * 64)), np.zeros(8))
+
+
+def test_too_many_records_is_refused():
+    client = app.app.test_client()
+    body = wire_formats.encode_columns(batch_columns(50), wire_formats.NPZ_MIME)
+    with patched(app, MAX_BATCH_RECORDS=49):
+        assert client.post(BATCH_PATH, data=body, content_type=wire_formats.NPZ_MIME).status_code == 413
+    assert client.post(BATCH_PATH, data=body, content_type=wire_formats.NPZ_MIME).status_code == 200
+
+
+def test_image_upload_checks():
+    def upload(content, filename='photo.jpg', known_size=True):
+        stream = io.BytesIO(content) if known_size else io.BufferedReader(UnsizedStream(content))
+        return app.read_image_upload(FileStorage(stream=stream, filename=filename))
+
+    image_bytes, error = upload(JPEG_HEADER)
+    assert error is None and image_bytes == JPEG_HEADER
+    assert 'Invalid file type' in upload(JPEG_HEADER, filename='photo.exe')[1]
+    assert 'not a supported image' in upload(b"MZ\x90\x00" * 16)[1]
+    too_large = JPEG_HEADER + b"\x00" * app.MAX_IMAGE_BYTES
+    assert 'File too large' in upload(too_large)[1]
+    assert 'File too large' in upload(too_large, known_size=False)[1]
+
+
+def test_column_formats_round_trip():
+    columns = batch_columns(100)
+    formats = [wire_formats.NPZ_MIME]
+    for module, mime in (('msgpack', wire_formats.MSGPACK_MIME), ('pyarrow', wire_formats.ARROW_MIME)):
+        try:
+            __import__(module)
+            formats.append(mime)
+        except ImportError:
+            print(f"{module} not installed; skipping {mime}")
+    for mime in formats:
+        decoded = wire_formats.decode_columns(wire_formats.encode_columns(columns, mime), mime, max_bytes=2**20)
+        assert sorted(decoded) == sorted(columns), mime
+        for name, column in columns.items():
+            np.testing.assert_array_equal(decoded[name], column)
+        # The cap applies to every format
+        try:
+            wire_formats.decode_columns(wire_formats.encode_columns(columns, mime), mime, max_bytes=1024)
+            assert mime == wire_formats.MSGPACK_MIME, f"{mime} decoded past its cap"
+        except wire_formats.PayloadTooLarge:
+            pass
+
+
+def test_tensor_round_trip_and_batch_response_format():
+    images = np.random.default_rng(0).integers(0, 256, (3, 4, 4, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    np.save(buffer, images)
+    np.testing.assert_array_equal(wire_formats.decode_tensor(buffer.getvalue(), wire_formats.NPY_MIME), images)
+    body = wire_formats.encode_arrays({'images': images}, wire_formats.NPZ_MIME)
+    np.testing.assert_array_equal(wire_formats.decode_tensor(body, wire_formats.NPZ_MIME), images)
+
+    client = app.app.test_client()
+    response = client.post(BATCH_PATH, data=wire_formats.encode_columns(batch_columns(20), wire_formats.NPZ_MIME),
+                           content_type=wire_formats.NPZ_MIME, headers={"Accept": wire_formats.NPZ_MIME})
+    assert response.status_code == 200
+    assert response.mimetype == wire_formats.NPZ_MIME
+    result = wire_formats.decode_columns(response.get_data(), wire_formats.NPZ_MIME)
+    assert all(len(column) == 20 for column in result.values())
+
+
+if __name__ == "__main__":
+    test_declared_size_over_limit_is_refused()
+    test_chunked_body_over_limit_is_refused()
+    test_compressed_npz_cannot_decode_past_cap()
+    test_npz_header_larger_than_data_is_counted()
+    test_npy_header_is_checked_before_allocating()
+    test_too_many_records_is_refused()
+    test_image_upload_checks()
+    test_column_formats_round_trip()
+    test_tensor_round_trip_and_batch_response_format()
+    print("Upload limit and wire format tests passed.")